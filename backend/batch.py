@@ -0,0 +1,103 @@
+"""
+Offline batch runner: process many files / URLs without the HTTP server.
+
+Results are appended to a JSON Lines file as each document finishes (one
+record per line, same shape as POST /api/batch). Re-running with --resume
+skips every id already recorded as "ok", so an interrupted run picks up
+where it stopped.
+
+    cd backend && python batch.py notices/ scan.pdf --url https://example.gov.in/scheme \
+        -o results.jsonl --language hi --resume
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services.logging_config import setup_logging
+
+setup_logging(stream=sys.stderr)
+
+from services import llm_client, render_pool, tts_service, web_service
+from services.batch_service import run_batch, expand_paths, file_item, url_item, BATCH_MAX_IN_FLIGHT
+from services.page_cache import page_cache
+from services.similarity_index import near_duplicates
+
+logger = logging.getLogger("civic.batch")
+
+def completed_ids(path: str) -> set:
+    """Ids recorded as ok in an earlier run; a torn last line is ignored"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+async def run(args) -> int:
+    items = [file_item(path) for path in expand_paths(args.paths)]
+    urls = list(args.url)
+    if args.urls_file:
+        with open(args.urls_file, encoding="utf-8") as f:
+            urls += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    items += [url_item(url) for url in urls]
+
+    if args.resume:
+        done = completed_ids(args.output)
+        items = [item for item in items if item.item_id not in done]
+        logger.info("Resuming: %d already done, %d to go", len(done), len(items))
+    if not items:
+        logger.info("Nothing to do")
+        return 0
+
+    context = {"language": args.language, "occupation": args.occupation, "location": args.location}
+    failed = 0
+    try:
+        with open(args.output, "a" if args.resume else "w", encoding="utf-8") as out:
+            async for record in run_batch(items, context, args.max_in_flight):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                failed += record["status"] != "ok"
+                logger.info("%s %s (%.0fms)", record["status"], record["source"], record["elapsed_ms"])
+    finally:
+        render_pool.shutdown()
+        page_cache.close()
+        near_duplicates.close()
+        await llm_client.aclose()
+        await tts_service.aclose()
+        await web_service.aclose()
+
+    logger.info("Batch finished: %d ok, %d failed -> %s", len(items) - failed, failed, args.output)
+    return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="files or directories (walked for pdf/image/txt)")
+    parser.add_argument("--url", action="append", default=[], help="a URL to process (repeatable)")
+    parser.add_argument("--urls-file", help="file with one URL per line")
+    parser.add_argument("-o", "--output", default="results.jsonl")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--occupation", default="")
+    parser.add_argument("--location", default="")
+    parser.add_argument("--resume", action="store_true", help="append to --output, skipping ids already ok there")
+    parser.add_argument("--max-in-flight", type=int, default=BATCH_MAX_IN_FLIGHT,
+                        help="documents admitted at once (memory bound; stage concurrency is set by STAGE_*_CONCURRENCY)")
+    args = parser.parse_args()
+    if not args.paths and not args.url and not args.urls_file:
+        parser.error("give at least one path, --url or --urls-file")
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+End-to-end load and latency benchmark of the backend as deployed.
+
+Starts benchmarks/fake_providers.py (Groq chat + vision, Murf, a web portal)
+and `uvicorn main:app` as separate processes, then drives
+/api/process-document, /api/ocr-only and /api/speak at each concurrency
+level with a fixture corpus: digital PDFs, scanned PDFs, images and URLs.
+
+Reported per endpoint and concurrency: throughput, error count, client
+latency p50/p95/p99 (time to first byte and to the last byte), and p50/p95/p99
+of every server stage taken from the Server-Timing header; peak RSS of the
+backend (with its render workers) over the whole run.
+
+Results are compared against a stored baseline (benchmarks/baselines/e2e.json);
+the exit status is 1 when throughput, p95 latency, errors or peak RSS
+regress by more than --tolerance. Baselines are machine specific: record one
+with --save-baseline before changing code, then compare after.
+
+    cd backend && python benchmarks/bench_e2e.py [--concurrency 1,8,32] [--requests 30] \\
+        [--chat-ms 300] [--vision-ms 500] [--murf-ms 200] [--error-rate 0] [--rate-limit 0] \\
+        [--llm-rpm 0] [--llm-tpm 0] [--cache] [--save-baseline] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from benchmarks.fixtures import make_digital_pdf, make_image, make_scanned_pdf, percentile
+
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "e2e.json")
+PERCENTILES = (50, 95, 99)
+
+SPEECH_TEXTS = [
+    "The government gives money to build a house.",
+    "Apply at the Gram Panchayat office before the thirty first of March. Take your bank passbook with you.",
+    "Eligible households will receive one lakh twenty thousand rupees in three installments. "
+    "The money is sent directly to your bank account. Call the helpline if you need help.",
+]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def build_corpus(portal_url: str) -> dict:
+    """(filename, bytes, content type) documents by kind"""
+    return {
+        "digital_pdf": ("notice.pdf", make_digital_pdf(pages=3), "application/pdf"),
+        "scanned_pdf": ("scan.pdf", make_scanned_pdf(pages=3), "application/pdf"),
+        "image": ("photo.png", make_image(), "image/png"),
+        # The frontend sends a pasted URL as input.txt
+        "url": ("input.txt", f"{portal_url}/portal/notice".encode(), "text/plain"),
+    }
+
+class RssSampler(threading.Thread):
+    """Peak resident memory of a process and its children, sampled from /proc"""
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_bytes = 0
+        self.supported = os.path.exists(f"/proc/{pid}/status")
+        self._done = threading.Event()
+
+    def _tree(self, pid):
+        pids = [pid]
+        try:
+            for task in os.listdir(f"/proc/{pid}/task"):
+                with open(f"/proc/{pid}/task/{task}/children") as f:
+                    for child in f.read().split():
+                        pids.extend(self._tree(int(child)))
+        except OSError:
+            pass
+        return pids
+
+    @staticmethod
+    def _rss(pid):
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def run(self):
+        while self.supported and not self._done.is_set():
+            self.peak_bytes = max(self.peak_bytes, sum(self._rss(pid) for pid in self._tree(self.pid)))
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+def parse_server_timing(header: str) -> dict:
+    """{stage: ms} from 'ocr_page;dur=812.0;desc="x3", json_parse;dur=1.2'"""
+    stages = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, *params = entry.split(";")
+        for param in params:
+            if param.startswith("dur="):
+                stages[name] = float(param[4:])
+    return stages
+
+async def timed_request(client, method, url, **kwargs) -> dict:
+    start = time.perf_counter()
+    try:
+        async with client.stream(method, url, **kwargs) as response:
+            first_byte = time.perf_counter() - start
+            async for _ in response.aiter_bytes():
+                pass
+            return {
+                "status": response.status_code,
+                "ttfb": first_byte,
+                "total": time.perf_counter() - start,
+                "stages": parse_server_timing(response.headers.get("server-timing", "")),
+            }
+    except httpx.HTTPError as e:
+        return {"status": 0, "ttfb": 0.0, "total": time.perf_counter() - start, "stages": {}, "error": str(e)}
+
+def make_requests(endpoint: str, corpus: dict, count: int):
+    """(kind, request kwargs) for count requests of one endpoint, cycling through the corpus"""
+    context = json.dumps({"language": "en", "occupation": "Farmer", "location": "Odisha"})
+    if endpoint == "process-document":
+        kinds = list(corpus)
+    elif endpoint == "ocr-only":
+        kinds = [kind for kind in corpus if kind != "url"]
+    else:
+        return [
+            ("speech", {"json": {"text": f"{SPEECH_TEXTS[i % len(SPEECH_TEXTS)]} Notice {i}.", "language": "en"}})
+            for i in range(count)
+        ]
+    requests = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        name, data, content_type = corpus[kind]
+        kwargs = {"files": {"file": (name, data, content_type)}}
+        if endpoint == "process-document":
+            kwargs["data"] = {"user_context": context}
+        requests.append((kind, kwargs))
+    return requests
+
+async def run_scenario(base_url: str, endpoint: str, concurrency: int, corpus: dict, count: int) -> dict:
+    queue = asyncio.Queue()
+    for item in make_requests(endpoint, corpus, count):
+        queue.put_nowait(item)
+    records = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+
+        async def worker():
+            while not queue.empty():
+                kind, kwargs = queue.get_nowait()
+                record = await timed_request(client, "POST", f"/api/{endpoint}", **kwargs)
+                record["kind"] = kind
+                records.append(record)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return summarise(records, elapsed)
+
+def _percentiles_ms(values) -> dict:
+    return {f"p{pct}": round(percentile(values, pct) * 1000, 1) for pct in PERCENTILES}
+
+def summarise(records: list, elapsed: float) -> dict:
+    ok = [r for r in records if r["status"] == 200]
+    stage_values = {}
+    for record in ok:
+        for name, ms in record["stages"].items():
+            stage_values.setdefault(name, []).append(ms / 1000)
+    return {
+        "requests": len(records),
+        "errors": len(records) - len(ok),
+        "throughput": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "ttfb_ms": _percentiles_ms([r["ttfb"] for r in ok]),
+        "latency_ms": _percentiles_ms([r["total"] for r in ok]),
+        "by_kind_p95_ms": {
+            kind: round(percentile([r["total"] for r in ok if r["kind"] == kind], 95) * 1000, 1)
+            for kind in sorted({r["kind"] for r in ok})
+        },
+        "stages_ms": {name: _percentiles_ms(values) for name, values in sorted(stage_values.items())},
+    }
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def start_servers(args, workdir: str):
+    fake_port, backend_port = free_port(), free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    fake_cmd = [
+        sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "fake_providers.py"), "--port", str(fake_port),
+        "--chat-ms", str(args.chat_ms), "--vision-ms", str(args.vision_ms), "--murf-ms", str(args.murf_ms),
+        "--jitter", str(args.jitter), "--error-rate", str(args.error_rate), "--rate-limit", str(args.rate_limit),
+    ]
+    env = {
+        **os.environ,
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_BASE_URL": fake_url,
+        "MURF_API_KEY": "benchmark",
+        "MURF_API_URL": f"{fake_url}/v1/speech/generate",
+        # The client-side rate limiter would otherwise dominate; set them to measure its effect
+        "LLM_RPM": str(args.llm_rpm),
+        "LLM_TPM": str(args.llm_tpm),
+        "CACHE_ENABLED": "1" if args.cache else "0",
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "LOG_LEVEL": "WARNING",
+        "APP_ENV": "production",
+    }
+    backend_cmd = [
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(backend_port),
+        "--log-level", "warning", "--no-access-log",
+    ]
+    log = open(os.path.join(workdir, "servers.log"), "wb")
+    fake = subprocess.Popen(fake_cmd, cwd=BACKEND_DIR, stdout=log, stderr=subprocess.STDOUT)
+    backend = subprocess.Popen(backend_cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_until_up(f"{fake_url}/stats", fake)
+        wait_until_up(f"http://127.0.0.1:{backend_port}/metrics", backend)
+    except Exception:
+        stop_servers(fake, backend)
+        raise
+    return fake, backend, fake_url, f"http://127.0.0.1:{backend_port}"
+
+def stop_servers(*processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Human readable regressions of results against baseline"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        if current["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']} -> {current['throughput']} req/s")
+        if current["latency_ms"]["p95"] > before["latency_ms"]["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['latency_ms']['p95']} -> {current['latency_ms']['p95']} ms")
+        if current["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {current['errors']}")
+    if before_rss := baseline.get("peak_rss_mb"):
+        if results["peak_rss_mb"] and results["peak_rss_mb"] > before_rss * (1 + tolerance):
+            regressions.append(f"peak RSS {before_rss} -> {results['peak_rss_mb']} MB")
+    return regressions
+
+def print_report(results: dict):
+    print(f"\n{'scenario':<24}{'req/s':>8}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'ttfb p95':>10}  (ms)")
+    for name, s in results["scenarios"].items():
+        lat = s["latency_ms"]
+        print(f"{name:<24}{s['throughput']:>8}{s['errors']:>5}{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}{s['ttfb_ms']['p95']:>10}")
+    print(f"\n{'stage (server)':<36}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for name, s in results["scenarios"].items():
+        for stage_name, pct in s["stages_ms"].items():
+            print(f"{name + ' ' + stage_name:<36}{pct['p50']:>9}{pct['p95']:>9}{pct['p99']:>9}")
+    print(f"\npeak RSS (backend + workers): {results['peak_rss_mb']} MB")
+    print(f"provider calls: {json.dumps(results['providers'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--endpoints", default="process-document,ocr-only,speak")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=30, help="requests per endpoint and level")
+    parser.add_argument("--chat-ms", type=float, default=300)
+    parser.add_argument("--vision-ms", type=float, default=500)
+    parser.add_argument("--murf-ms", type=float, default=200)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of provider calls failing with 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="provider requests per second before 429s (0 = none)")
+    parser.add_argument("--llm-rpm", type=int, default=0, help="backend LLM_RPM (0 = client-side limiter off)")
+    parser.add_argument("--llm-tpm", type=int, default=0, help="backend LLM_TPM (0 = client-side limiter off)")
+    parser.add_argument("--cache", action="store_true", help="leave the backend caches on (warm-cache numbers)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--output", help="also write the results JSON here")
+    args = parser.parse_args()
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        fake, backend, fake_url, backend_url = start_servers(args, workdir)
+        sampler = RssSampler(backend.pid)
+        sampler.start()
+        try:
+            corpus = build_corpus(fake_url)
+            scenarios = {}
+            for endpoint in endpoints:
+                for concurrency in levels:
+                    name = f"{endpoint}@{concurrency}"
+                    scenarios[name] = asyncio.run(run_scenario(backend_url, endpoint, concurrency, corpus, args.requests))
+                    print(f"{name}: {scenarios[name]['throughput']} req/s, p95 {scenarios[name]['latency_ms']['p95']} ms", flush=True)
+            providers = httpx.get(f"{fake_url}/stats").json()
+        finally:
+            sampler.stop()
+            stop_servers(backend, fake)
+
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline", "output", "tolerance")},
+        "scenarios": scenarios,
+        "peak_rss_mb": round(sampler.peak_bytes / 2**20, 1) if sampler.supported else None,
+        "providers": providers,
+    }
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nbaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("\nno baseline to compare against (run with --save-baseline)")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != results["config"]:
+        print("\nwarning: baseline was recorded with different settings; comparing anyway")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSIONS (> {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nno regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
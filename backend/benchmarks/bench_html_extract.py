@@ -0,0 +1,60 @@
+"""
+Page text extraction for URL ingestion.
+
+Compares the previous BeautifulSoup(html.parser) + decompose() + get_text()
+path with the single-pass extractor in services/web_service.py on the saved
+portal pages in benchmarks/html_fixtures/ (or any directory of .html files),
+and checks that both produce identical text.
+
+    cd backend && python benchmarks/bench_html_extract.py [--dir path/to/pages] [--repeat 20]
+"""
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from services.web_service import extract_text
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_fixtures")
+
+def legacy_extract(markup):
+    # What fetch_url_content did before
+    soup = BeautifulSoup(markup, 'html.parser')
+    for script in soup(["script", "style", "nav", "footer", "header", "noscript"]):
+        script.decompose()
+    text = soup.get_text(separator=' ')
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=FIXTURE_DIR)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.dir, "*.html")))
+    if not paths:
+        sys.exit(f"No .html files in {args.dir}")
+
+    print(f"{'page':<28} {'KB':>6} {'bs4 ms':>8} {'new ms':>8} {'speedup':>8}  same")
+    mismatches = 0
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            markup = f.read()
+        same = legacy_extract(markup) == extract_text(markup)
+        mismatches += not same
+        legacy = timeit.timeit(lambda: legacy_extract(markup), number=args.repeat) / args.repeat
+        new = timeit.timeit(lambda: extract_text(markup), number=args.repeat) / args.repeat
+        print(f"{os.path.basename(path):<28} {len(markup.encode()) / 1024:>6.0f} {legacy * 1000:>8.2f} {new * 1000:>8.2f} {legacy / new:>7.1f}x  {'yes' if same else 'NO'}")
+
+    if mismatches:
+        sys.exit(f"{mismatches} page(s) produced different text")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Identity/scam screening on large inputs.
+
+Compares the previous approach (text.lower() + substring scan per keyword)
+with the single-pass compiled matcher in services/keyword_matcher.py on
+100k-character documents: plain English, mixed Hindi/English, and a
+worst case with many near-miss prefixes.
+
+    cd backend && python benchmarks/bench_keyword_matcher.py [--chars 100000] [--repeat 50]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import NOTICE_LINES
+from services.keyword_matcher import screening_matcher, load_matcher, KEYWORDS_PATH
+
+HINDI_LINES = [
+    "प्रधानमंत्री आवास योजना के अंतर्गत पात्र परिवारों को सहायता दी जाएगी।",
+    "आवेदन ग्राम पंचायत कार्यालय में जमा करें। चयन पात्रता के आधार पर होगा।",
+    "Beneficiary list ki jaankari ke liye helpline par sampark karein.",
+]
+
+def legacy_screen(text, identity_keywords, scam_keywords):
+    # What detect_identity_document + detect_scam did before: one lower() and one scan per keyword
+    identity = any(keyword in text.lower() for keyword in identity_keywords)
+    scam = sum(1 for keyword in scam_keywords if keyword in text.lower())
+    return identity, scam >= 2
+
+def make_text(lines, chars, seed=0):
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < chars:
+        line = rng.choice(lines)
+        parts.append(line)
+        size += len(line) + 1
+    return "\n".join(parts)[:chars]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    import json
+    with open(KEYWORDS_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    identity_keywords, scam_keywords = data["identity"]["keywords"], data["scam"]["keywords"]
+
+    corpora = {
+        "english notice": make_text(NOTICE_LINES, args.chars),
+        "hindi/english": make_text(NOTICE_LINES + HINDI_LINES, args.chars),
+        "near misses": make_text(["pan cart aadha voter i urgent act share ot send mone"], args.chars),
+    }
+    build = timeit.timeit(load_matcher, number=10) / 10
+    print(f"matcher build: {build * 1000:.2f}ms ({len(screening_matcher.keywords)} keywords)")
+    print(f"{'corpus':>16} | {'legacy (per keyword)':>20} | {'single pass':>12} | speedup")
+    for name, text in corpora.items():
+        legacy = timeit.timeit(lambda: legacy_screen(text, identity_keywords, scam_keywords), number=args.repeat) / args.repeat
+        single = timeit.timeit(lambda: screening_matcher.scan(text), number=args.repeat) / args.repeat
+        print(f"{name:>16} | {legacy * 1000:17.2f} ms | {single * 1000:9.2f} ms | {legacy / single:6.1f}x")
+
+if __name__ == "__main__":
+    main()
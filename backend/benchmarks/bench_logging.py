@@ -0,0 +1,134 @@
+"""
+Request throughput with verbose vs production logging.
+
+Runs /api/process-document in-process on a digital PDF (text layer, no
+vision calls; the analysis LLM is a fixed 20ms fake) with caching off, and
+compares three logging setups writing to a slow sink that stands in for a
+congested stdout pipe (container log driver, terminal):
+
+  sync verbose   DEBUG records written and flushed on the event loop (what print(..., flush=True) did)
+  queue verbose  DEBUG records through the queue + background writer thread
+  queue prod     APP_ENV=production, INFO, payload debug off
+
+    cd backend && python benchmarks/bench_logging.py [--requests 200] [--concurrency 20] [--write-ms 0.2]
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ["CACHE_ENABLED"] = "0"
+os.environ["RENDER_POOL_WORKERS"] = "0"
+
+import httpx
+
+from benchmarks.fixtures import make_digital_pdf, percentile
+from services import analysis_service, logging_config
+
+FAKE_ANALYSIS = json.dumps({
+    "type": "scheme", "title": "Housing scheme", "summary": "Support for eligible families.",
+    "targetAudience": "Rural families", "personalImpact": "You may qualify.",
+    "actionItems": ["Apply at the block office"], "benefits": ["Grant"], "deadlines": [],
+    "trustNote": "Official notice", "voice_script": "Housing scheme.",
+})
+
+async def fake_chat_completion(timeout=None, **request_kwargs):
+    await asyncio.sleep(0.02)
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=FAKE_ANALYSIS))])
+
+class SlowSink(io.TextIOBase):
+    """A stdout whose flush blocks for a fixed time, like a full pipe"""
+
+    def __init__(self, flush_ms):
+        self.flush_seconds = flush_ms / 1000
+        self.lines = 0
+
+    def write(self, text):
+        self.lines += text.count("\n")
+        return len(text)
+
+    def flush(self):
+        time.sleep(self.flush_seconds)
+
+def configure(mode, sink):
+    if mode == "sync verbose":
+        logging_config.shutdown_logging()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handler = logging.StreamHandler(sink)
+        handler.addFilter(logging_config.RequestContextFilter())
+        handler.setFormatter(logging_config.JsonFormatter())
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+        logging.getLogger(logging_config.PAYLOAD_LOGGER).setLevel(logging.NOTSET)
+    elif mode == "queue verbose":
+        logging.getLogger(logging_config.PAYLOAD_LOGGER).setLevel(logging.NOTSET)
+        logging_config.setup_logging(level="DEBUG", levels="", stream=sink, app_env="development")
+    else:
+        logging_config.setup_logging(level="INFO", levels="", stream=sink, app_env="production")
+
+async def loop_lag(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append((time.perf_counter() - start - 0.005) * 1000)
+
+async def run_mode(app, mode, pdf_bytes, requests, concurrency, write_ms):
+    sink = SlowSink(write_ms)
+    configure(mode, sink)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, lags = [], []
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/process-document",
+                    files={"file": ("notice.pdf", pdf_bytes, "application/pdf")},
+                    data={"user_context": json.dumps({"language": "en", "occupation": str(i)})},
+                )
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        lag_task = asyncio.create_task(loop_lag(stop, lags))
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await lag_task
+
+    logging_config.shutdown_logging()  # drain the queue before counting
+    print(
+        f"{mode:>14}: {requests / elapsed:7.1f} req/s | p50={percentile(latencies, 50):6.1f}ms "
+        f"p99={percentile(latencies, 99):6.1f}ms | loop lag max={max(lags):6.1f}ms | {sink.lines / requests:5.1f} lines/request",
+        flush=True,
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--write-ms", type=float, default=0.2, help="blocking time per flush of the log sink")
+    parser.add_argument("--pages", type=int, default=3)
+    args = parser.parse_args()
+
+    import main as backend_main
+    analysis_service.chat_completion = fake_chat_completion
+    pdf_bytes = make_digital_pdf(args.pages)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.pages}-page digital PDF, sink flush {args.write_ms}ms", flush=True)
+    for mode in ("sync verbose", "queue verbose", "queue prod"):
+        await run_mode(backend_main.app, mode, pdf_bytes, args.requests, args.concurrency, args.write_ms)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Vision payload size and time per page for scanned PDFs, with and without
+the page pre-pass (blank skip, duplicate pages, adaptive DPI / quality).
+
+The vision call is a fake whose latency grows with the payload: a fixed
+--vision-ms plus upload time at --uplink-mbps, like a real request from a
+constrained server link. Two fixtures:
+
+  mixed    10-page scanned bundle: cover, blank separators, repeated cover,
+           sparse large-type pages, dense body pages
+  uniform  10 dense scanned pages (nothing to skip; adaptive settings only)
+
+    cd backend && python benchmarks/bench_page_prepass.py [--vision-ms 400] [--uplink-mbps 20] [--runs 3]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+# Fake OCR text must never reach (or be served from) the shared page / result caches
+os.environ["CACHE_ENABLED"] = "0"
+
+from benchmarks.fixtures import make_mixed_scanned_pdf, make_scanned_pdf
+from services import ocr_service, render_pool
+
+class FakeVision:
+    def __init__(self, vision_ms, uplink_mbps):
+        self.vision_seconds = vision_ms / 1000
+        self.bytes_per_second = uplink_mbps * 1e6 / 8
+        self.calls = 0
+        self.bytes = 0
+
+    async def __call__(self, image_bytes):
+        payload = len(ocr_service.encode_image(image_bytes))
+        self.calls += 1
+        self.bytes += payload
+        await asyncio.sleep(self.vision_seconds + payload / self.bytes_per_second)
+        return f"ocr text ({len(image_bytes)} bytes)"
+
+async def run_mode(pdf_path, pages, prepass, args):
+    ocr_service.PDF_PAGE_PREPASS = prepass
+    vision = FakeVision(args.vision_ms, args.uplink_mbps)
+    ocr_service.perform_groq_ocr = vision
+    elapsed = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        result = await ocr_service.extract_text_from_pdf(pdf_path)
+        elapsed.append(time.perf_counter() - start)
+        assert result["success"], result
+
+    # Local CPU cost only (survey + rendering, inline), vision answering instantly
+    ocr_service.perform_groq_ocr = FakeVision(0, float("inf"))
+    render_pool.RENDER_POOL_WORKERS = 0
+    start = time.perf_counter()
+    await ocr_service.extract_text_from_pdf(pdf_path)
+    local = time.perf_counter() - start
+    render_pool.RENDER_POOL_WORKERS = args.workers
+
+    calls = vision.calls / args.runs
+    sent = vision.bytes / args.runs
+    best = min(elapsed)
+    label = "pre-pass" if prepass else "fixed 150dpi/q85"
+    print(
+        f"  {label:>17}: {calls:4.0f}/{pages} pages sent | {sent / 1024:7.0f} KB base64 "
+        f"({sent / 1024 / max(calls, 1):5.0f} KB/page) | document {best:5.2f}s, {best / pages * 1000:5.0f}ms/page "
+        f"| local CPU {local / pages * 1000:5.1f}ms/page",
+        flush=True,
+    )
+    return sent, best
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vision-ms", type=float, default=400, help="fixed vision latency per page")
+    parser.add_argument("--uplink-mbps", type=float, default=20, help="upload bandwidth to the vision API")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="render pool size")
+    args = parser.parse_args()
+
+    render_pool.RENDER_POOL_WORKERS = args.workers
+    # Pool recycling would land at a different point in each mode; keep one pool throughout
+    render_pool.RENDER_POOL_MAX_TASKS_PER_CHILD = 0
+    if args.workers:
+        # Warm the pool so process start-up isn't counted
+        await asyncio.gather(*(render_pool.run(abs, 0) for _ in range(args.workers)))
+    mixed, _ = make_mixed_scanned_pdf()
+    fixtures = {"mixed": (mixed, 10), "uniform": (make_scanned_pdf(10), 10)}
+    print(f"vision {args.vision_ms:.0f}ms + upload at {args.uplink_mbps:.0f} Mbit/s, concurrency {ocr_service.OCR_PAGE_CONCURRENCY}", flush=True)
+    for name, (pdf_bytes, pages) in fixtures.items():
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            pdf_file.write(pdf_bytes)
+            pdf_file.flush()
+            print(f"{name} ({pages} pages, {len(pdf_bytes) / 1024:.0f} KB):", flush=True)
+            old_bytes, old_time = await run_mode(pdf_file.name, pages, False, args)
+            new_bytes, new_time = await run_mode(pdf_file.name, pages, True, args)
+            print(f"  bytes sent {(new_bytes / old_bytes - 1) * 100:+.0f}%, document time {(new_time / old_time - 1) * 100:+.0f}%", flush=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+"""
+Input tokens, reserved tokens and LLM latency of the analysis call with and
+without prompt compaction (services/compaction.py + the input-sized
+max_tokens), on a fixture corpus:
+
+  letter      5-page scanned letter as OCR returns it (letterhead/footer on every
+              page, page numbers, leader dots, stray symbols, annexure tables)
+  digital     3-page digital PDF through extract_text_from_pdf
+  web/*       saved portal pages (benchmarks/html_fixtures) through the URL extractor
+  short       one-page notice (little to remove)
+
+The LLM is a fake whose latency grows with the prompt (--base-ms plus
+--prefill-ms per 1k input tokens) and which "extracts" fields from the prompt
+it is given: dates as deadlines, amount lines as benefits, the subject line as
+title. Fields must come out identical with and without compaction, and every
+number, date, amount, phone number and URL of the raw text must survive.
+
+    cd backend && python benchmarks/bench_prompt_compaction.py [--base-ms 300] [--prefill-ms 40] [--tpm 20000]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+# Fake OCR text must never reach (or be served from) the shared page / result caches
+os.environ["CACHE_ENABLED"] = "0"
+os.environ["RENDER_POOL_WORKERS"] = "0"
+
+from types import SimpleNamespace
+
+from benchmarks.fixtures import make_digital_pdf, make_ocr_letter_text, make_short_notice_text
+from services import analysis_service, compaction, llm_scheduler, ocr_service
+from services.chunking import PAGE_MARKER
+from services.web_service import extract_text
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_fixtures")
+
+# What must never be lost: numbers (amounts, dates, ids, phones), URLs and e-mail addresses
+FACT = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|\b[\w-]+(?:\.[\w-]+)+\.(?:in|com|org|gov)\b|\d[\d,./:-]*\d|\d")
+DATE = re.compile(r"\b\d{2}/\d{2}/\d{4}\b")
+SUBJECT = re.compile(r"^\s*(?:subject|sub)\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+
+def facts(text: str) -> set:
+    """FACT matches outside page markers and page-number lines (which compaction drops on purpose)"""
+    lines = PAGE_MARKER.sub("", text).splitlines()
+    return set(FACT.findall("\n".join(line for line in lines if not compaction._PAGE_NUMBER.match(line.strip()))))
+
+class FakeLLM:
+    """Latency from the prompt size; fields read off the prompt like a (very literal) model would"""
+
+    def __init__(self, base_ms, prefill_ms):
+        self.base = base_ms / 1000
+        self.prefill = prefill_ms / 1000
+        self.calls = []
+
+    async def __call__(self, timeout=None, **request_kwargs):
+        reserved = llm_scheduler.estimate_tokens(request_kwargs)
+        input_tokens = reserved - request_kwargs["max_tokens"]
+        self.calls.append({"input": input_tokens, "reserved": reserved})
+        await asyncio.sleep(self.base + self.prefill * input_tokens / 1000)
+
+        prompt = request_kwargs["messages"][-1]["content"]
+        text = prompt.split("Analyze this document text:", 1)[-1].split("User Context:", 1)[0]
+        # Page markers carry no content for a model either
+        lines = [line.strip() for line in PAGE_MARKER.sub("", text).splitlines() if line.strip()]
+        subject = SUBJECT.search(text)
+        result = {
+            "type": "notice",
+            "title": subject.group(1).strip() if subject else (lines[0] if lines else ""),
+            "summary": " ".join(list(dict.fromkeys(lines))[:2]),
+            "targetAudience": "",
+            "personalImpact": "",
+            "actionItems": sorted({l for l in lines if re.search(r"\b(must|required|apply|submit)\b", l, re.I)}),
+            "benefits": sorted({l for l in lines if re.search(r"\bRs\.?\s?\d", l)}),
+            "deadlines": sorted(set(DATE.findall(text))),
+            "trustNote": "",
+            "voice_script": "",
+        }
+        message = SimpleNamespace(content=json.dumps(result))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def canonical(result: dict) -> dict:
+    """Field values with whitespace normalised (compaction collapses spacing runs)"""
+    def norm(value):
+        if isinstance(value, list):
+            return sorted(norm(v) for v in value)
+        return " ".join(str(value).split())
+    return {key: norm(value) for key, value in result.items() if key != "chunks"}
+
+async def build_corpus() -> dict:
+    corpus = {"letter": make_ocr_letter_text(pages=5), "short": make_short_notice_text()}
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(make_digital_pdf(pages=3))
+    try:
+        corpus["digital"] = (await ocr_service.extract_text_from_pdf(f.name))["text"]
+    finally:
+        os.remove(f.name)
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            corpus["web/" + os.path.basename(path)[:-5]] = extract_text(f.read())
+    return corpus
+
+async def run(text: str, compact: bool, args) -> dict:
+    compaction.COMPACTION_ENABLED = compact
+    # Before: the fixed completion budget of 2000
+    analysis_service.ANALYSIS_MIN_OUTPUT_TOKENS = args.min_output if compact else 2000
+    analysis_service.ANALYSIS_MAX_OUTPUT_TOKENS = args.max_output if compact else 2000
+    llm = FakeLLM(args.base_ms, args.prefill_ms)
+    analysis_service.chat_completion = llm
+    start = time.perf_counter()
+    result = await analysis_service.extract_document(text, {"language": "en", "occupation": "Farmer", "location": "Odisha"})
+    return {
+        "elapsed": time.perf_counter() - start,
+        "calls": len(llm.calls),
+        "input": sum(c["input"] for c in llm.calls),
+        "reserved": sum(c["reserved"] for c in llm.calls),
+        "result": result,
+    }
+
+async def main_async(args):
+    corpus = await build_corpus()
+    print(f"{'fixture':<24}{'input tok':>18}{'reserved tok':>18}{'latency ms':>16}{'docs/min @TPM':>16}  fields  facts")
+    totals = {"raw": [0, 0, 0.0], "compact": [0, 0, 0.0]}
+    ok = True
+    for name, text in corpus.items():
+        raw = await run(text, False, args)
+        compact = await run(text, True, args)
+        if raw["result"].get("type") in analysis_service.UNTRANSLATED_TYPES:
+            print(f"{name:<24}screened as {raw['result']['type']}, no LLM call")
+            continue
+        same_fields = canonical(raw["result"]) == canonical(compact["result"])
+        lost = facts(text) - facts(compaction.compact_text(text))
+        ok = ok and same_fields and not lost
+        for key, measured in (("raw", raw), ("compact", compact)):
+            totals[key][0] += measured["input"]
+            totals[key][1] += measured["reserved"]
+            totals[key][2] += measured["elapsed"]
+        print(
+            f"{name:<24}{raw['input']:>8} -> {compact['input']:<7}{raw['reserved']:>8} -> {compact['reserved']:<7}"
+            f"{raw['elapsed'] * 1000:>6.0f} -> {compact['elapsed'] * 1000:<6.0f}"
+            f"{args.tpm / raw['reserved']:>6.1f} -> {args.tpm / compact['reserved']:<6.1f}"
+            f"  {'same' if same_fields else 'DIFF'}    {'all' if not lost else 'LOST ' + ', '.join(sorted(lost)[:5])}"
+        )
+    (raw_in, raw_res, raw_t), (c_in, c_res, c_t) = totals["raw"], totals["compact"]
+    print(
+        f"\ntotal: input tokens {raw_in} -> {c_in} ({(c_in - raw_in) / raw_in:+.0%}), "
+        f"reserved {raw_res} -> {c_res} ({(c_res - raw_res) / raw_res:+.0%}), "
+        f"latency {raw_t * 1000:.0f} -> {c_t * 1000:.0f} ms ({(c_t - raw_t) / raw_t:+.0%})"
+    )
+    print("fields and facts preserved" if ok else "FIELDS OR FACTS CHANGED")
+    return 0 if ok else 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-ms", type=float, default=300, help="fixed LLM latency")
+    parser.add_argument("--prefill-ms", type=float, default=40, help="extra LLM latency per 1k input tokens")
+    parser.add_argument("--tpm", type=int, default=20000, help="tokens-per-minute limit for the docs/min column")
+    parser.add_argument("--min-output", type=int, default=analysis_service.ANALYSIS_MIN_OUTPUT_TOKENS)
+    parser.add_argument("--max-output", type=int, default=analysis_service.ANALYSIS_MAX_OUTPUT_TOKENS)
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Event-loop responsiveness while large scanned PDFs are rasterised.
+
+Runs the FastAPI app in-process and fires small /api/ocr-only requests
+(plain text, no CPU work) while several 10-page scanned PDFs go through
+extract_text_from_pdf. The vision call is replaced by a fixed sleep so
+only rasterisation/encoding competes with the small requests.
+
+Compares RENDER_POOL_WORKERS=0 (inline, old behaviour) with the pool.
+
+    cd backend && python benchmarks/bench_render_pool.py [--pdfs 4] [--pages 10]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+# Fake OCR text must never reach (or be served from) the shared page / result caches
+os.environ["CACHE_ENABLED"] = "0"
+
+import httpx
+
+from benchmarks.fixtures import make_scanned_pdf, percentile
+from services import ocr_service, render_pool
+
+async def fake_vision(image_bytes):
+    await asyncio.sleep(0.2)
+    return f"ocr text ({len(image_bytes)} bytes)"
+
+async def small_requests(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.post("/api/ocr-only", files={"file": ("note.txt", b"hello civic assist")})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+async def run_mode(app, workers, pdf_path, pdfs, small_clients):
+    render_pool.RENDER_POOL_WORKERS = workers
+    render_pool.shutdown()
+    if workers:
+        # Warm the pool so process start-up isn't counted
+        await asyncio.gather(*(render_pool.run(render_pool.pdf_text_layer, pdf_path, 1) for _ in range(workers)))
+
+    latencies = []
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        pollers = [asyncio.create_task(small_requests(client, stop, latencies)) for _ in range(small_clients)]
+        start = time.perf_counter()
+        await asyncio.gather(*(ocr_service.extract_text_from_pdf(pdf_path) for _ in range(pdfs)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*pollers)
+
+    label = "inline" if workers == 0 else f"pool({workers})"
+    print(
+        f"{label:>10}: pdf batch {elapsed:6.2f}s | small requests n={len(latencies):4d} "
+        f"p50={percentile(latencies, 50):7.1f}ms p99={percentile(latencies, 99):7.1f}ms max={max(latencies):7.1f}ms",
+        flush=True,
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdfs", type=int, default=4, help="concurrent large PDFs")
+    parser.add_argument("--pages", type=int, default=10, help="scanned pages per PDF")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent small-request clients")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="render pool size to compare against inline")
+    args = parser.parse_args()
+
+    import main as backend_main
+    ocr_service.perform_groq_ocr = fake_vision
+
+    pdf_bytes = make_scanned_pdf(args.pages)
+    print(f"Fixture: {args.pages}-page scanned PDF ({len(pdf_bytes) / 1024:.0f} KB) x {args.pdfs}", flush=True)
+    # Uploads are spooled to disk, so the pipeline works from a path like production does
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        pdf_file.write(pdf_bytes)
+        pdf_file.flush()
+        for workers in (0, args.workers):
+            await run_mode(backend_main.app, workers, pdf_file.name, args.pdfs, args.clients)
+    render_pool.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+"""
+Cold-start cost of the backend: import time per module and time to first request.
+
+1. `python -X importtime -c "import main"` in a fresh interpreter: total import
+   time of main, cumulative time of every services.* module and of the largest
+   third-party packages, and whether the heavy libraries (PyMuPDF, PIL, numpy,
+   groq, httpx) are loaded at startup at all.
+2. `uvicorn main:app` started --runs times against benchmarks/fake_providers.py,
+   in the default lazy mode and with WARMUP=1: time until /status answers
+   (ready), then the latency of the first and the second /api/process-document
+   request (a digital PDF, result caches off). With WARMUP=1 the requests are
+   sent once /status reports the warm-up as done, and the warm-up time is shown.
+
+    cd backend && python benchmarks/bench_startup.py [--runs 3] [--chat-ms 50] [--top 15]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from benchmarks.bench_e2e import free_port, stop_servers
+from benchmarks.fixtures import make_digital_pdf
+
+HEAVY_MODULES = {"fitz": "PyMuPDF", "PIL": "Pillow", "numpy": "numpy", "groq": "groq", "httpx": "httpx"}
+IMPORT_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| *(\S+)$")
+
+def measure_imports(env: dict) -> dict:
+    """module -> cumulative import time in µs, from -X importtime"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in process.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules[match.group(2)] = int(match.group(1))
+    return modules
+
+def print_imports(modules: dict, top: int):
+    print(f"import main: {modules['main'] / 1000:.0f} ms\n")
+    print("services (cumulative ms)")
+    for name, micros in sorted(modules.items(), key=lambda item: -item[1]):
+        if name.startswith("services."):
+            print(f"  {name:<32}{micros / 1000:>8.1f}")
+    print("\nlargest third-party packages (cumulative ms)")
+    packages = [
+        (name, micros) for name, micros in modules.items()
+        if "." not in name and not name.startswith("_") and name not in sys.stdlib_module_names
+        and name not in ("main", "services", "site")
+    ]
+    for name, micros in sorted(packages, key=lambda item: -item[1])[:top]:
+        print(f"  {name:<32}{micros / 1000:>8.1f}")
+    print("\nheavy libraries at startup")
+    for module, label in HEAVY_MODULES.items():
+        loaded = modules.get(module)
+        print(f"  {label:<32}{f'{loaded / 1000:>8.1f} ms' if loaded else '  not imported (lazy)'}")
+
+def post_document(client: httpx.Client, base_url: str, pdf: bytes) -> float:
+    start = time.perf_counter()
+    response = client.post(
+        f"{base_url}/api/process-document",
+        files={"file": ("notice.pdf", pdf, "application/pdf")},
+        data={"user_context": json.dumps({"language": "en"})},
+    )
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200 or response.json().get("type") == "error":
+        raise RuntimeError(f"process-document failed: {response.status_code} {response.text[:200]}")
+    return elapsed
+
+def cold_start(env: dict, warmup: bool, pdfs: list) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env={**env, "WARMUP": "1" if warmup else "0"},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=60) as client:
+            while True:
+                if backend.poll() is not None:
+                    raise RuntimeError(f"backend exited with status {backend.returncode}")
+                try:
+                    status = client.get(f"{base_url}/status").json()
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.005)
+            measured = {"ready": time.perf_counter() - start}
+            if warmup:
+                while not status["warmup"]["done"]:
+                    time.sleep(0.01)
+                    status = client.get(f"{base_url}/status").json()
+                measured["warm"] = time.perf_counter() - start
+            measured["first"] = post_document(client, base_url, pdfs[0])
+            measured["second"] = post_document(client, base_url, pdfs[1])
+        return measured
+    finally:
+        stop_servers(backend)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per mode (medians are reported)")
+    parser.add_argument("--chat-ms", type=float, default=50, help="fake LLM latency")
+    parser.add_argument("--top", type=int, default=15, help="third-party packages listed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        fake_port = free_port()
+        fake_url = f"http://127.0.0.1:{fake_port}"
+        env = {
+            **os.environ,
+            "GROQ_API_KEY": "benchmark",
+            "GROQ_BASE_URL": fake_url,
+            "LLM_RPM": "0",
+            "LLM_TPM": "0",
+            "CACHE_ENABLED": "0",
+            "CACHE_DIR": os.path.join(workdir, "cache"),
+            "LOG_LEVEL": "WARNING",
+            "APP_ENV": "production",
+        }
+        print_imports(measure_imports(env), args.top)
+
+        fake = subprocess.Popen(
+            [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "fake_providers.py"),
+             "--port", str(fake_port), "--chat-ms", str(args.chat_ms), "--jitter", "0"],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    httpx.get(f"{fake_url}/stats", timeout=1)
+                    break
+                except httpx.HTTPError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.1)
+            pdfs = [make_digital_pdf(pages=2, seed=seed) for seed in range(2)]
+            print(f"\n{'mode':<10}{'ready ms':>10}{'warm ms':>10}{'1st req ms':>12}{'2nd req ms':>12}   (median of {args.runs})")
+            for warmup in (False, True):
+                runs = [cold_start(env, warmup, pdfs) for _ in range(args.runs)]
+                median = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+                warm = f"{median['warm']:>10.0f}" if warmup else f"{'-':>10}"
+                print(f"{'WARMUP=1' if warmup else 'lazy':<10}{median['ready']:>10.0f}{warm}{median['first']:>12.0f}{median['second']:>12.0f}")
+        finally:
+            stop_servers(fake)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Local stand-ins for the external providers, for the end-to-end benchmark
+(bench_e2e.py) and manual load tests. One server plays all of them:
+
+  Groq chat    POST /openai/v1/chat/completions  (text messages; streaming too)
+  Groq vision  POST /openai/v1/chat/completions  (messages with an image part)
+  Murf         POST /v1/speech/generate          -> {"audioFile": ".../audio/<n>.mp3"}
+               GET  /audio/<n>.mp3
+  Web portal   GET  /portal/<name>               (HTML notice page for URL inputs)
+  Stats        GET  /stats                       (calls, injected errors, 429s per provider)
+
+Each provider has its own latency (mean, +-jitter), error rate (HTTP 500)
+and rate limit (token bucket, 429 with Retry-After), set with FAKE_* env
+vars or the command line:
+
+    cd backend && python benchmarks/fake_providers.py --port 8930 --chat-ms 800 --vision-ms 1500 --rate-limit 30
+
+Point the backend at it with GROQ_BASE_URL=http://127.0.0.1:8930 and
+MURF_API_URL=http://127.0.0.1:8930/v1/speech/generate.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+
+PROVIDERS = ("chat", "vision", "murf")
+
+def _setting(provider, name, default):
+    return float(os.getenv(f"FAKE_{provider.upper()}_{name}", os.getenv(f"FAKE_{name}", default)))
+
+class Provider:
+    """Latency, error and rate-limit behaviour of one fake provider"""
+
+    def __init__(self, name, latency_ms, jitter, error_rate, rate_limit, rng):
+        self.name = name
+        self.latency = latency_ms / 1000
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit  # requests per second, 0 = unlimited
+        self.rng = rng
+        self.tokens = rate_limit
+        self.refilled = time.monotonic()
+        self.stats = {"calls": 0, "errors": 0, "rate_limited": 0}
+
+    @classmethod
+    def from_env(cls, name, rng):
+        defaults = {"chat": "600", "vision": "1200", "murf": "400"}
+        return cls(
+            name,
+            _setting(name, "MS", defaults[name]),
+            _setting(name, "JITTER", "0.3"),
+            _setting(name, "ERROR_RATE", "0"),
+            _setting(name, "RATE_LIMIT", "0"),
+            rng,
+        )
+
+    def admit(self):
+        """None when the call goes ahead, else an error response to return"""
+        self.stats["calls"] += 1
+        if self.rate_limit:
+            now = time.monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.refilled) * self.rate_limit)
+            self.refilled = now
+            if self.tokens < 1:
+                self.stats["rate_limited"] += 1
+                retry_after = max(1, round((1 - self.tokens) / self.rate_limit))
+                return JSONResponse(
+                    status_code=429,
+                    content={"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                    headers={"retry-after": str(retry_after)},
+                )
+            self.tokens -= 1
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Injected failure", "type": "server_error"}})
+        return None
+
+    async def delay(self, scale=1.0):
+        spread = self.latency * self.jitter
+        await asyncio.sleep(max(0.0, scale * (self.latency + self.rng.uniform(-spread, spread))))
+
+ANALYSIS = {
+    "type": "scheme",
+    "title": "Housing support for rural families",
+    "summary": "The government gives money to build a house. You must apply at the Gram Panchayat office.",
+    "targetAudience": "Rural families without a permanent house",
+    "personalImpact": "If your family has no permanent house, you may get Rs. 1,20,000.",
+    "actionItems": ["Visit the Gram Panchayat office", "Link your bank account", "Apply before 31/03/2025"],
+    "benefits": ["Rs. 1,20,000 in three installments"],
+    "deadlines": ["31/03/2025 - last date to apply"],
+    "trustNote": "Official notice from the Ministry of Rural Development.",
+    "voice_script": "The government gives money to build a house. Apply at the Gram Panchayat office before the thirty first of March.",
+}
+
+VISION_TEXT = "\n".join([
+    "GOVERNMENT OF INDIA - MINISTRY OF RURAL DEVELOPMENT",
+    "Pradhan Mantri Awas Yojana (Gramin) - Notice to Beneficiaries",
+    "Eligible households will receive Rs. 1,20,000 in three installments.",
+    "Applications must be submitted at the Gram Panchayat office before 31/03/2025.",
+])
+
+PORTAL_PAGE = """<html><head><title>Notice {name}</title></head><body>
+<nav>Home | Schemes | Contact</nav>
+<main><h1>PMAY-G notice {name}</h1>
+<p>Eligible households will receive Rs. 1,20,000 in three installments for building a pucca house.</p>
+<p>Applications must be submitted at the Gram Panchayat office before 31/03/2025 with a bank passbook copy.</p>
+<p>For assistance contact the Block Development Officer or call the helpline 1800-11-6446.</p>
+</main><footer>Ministry of Rural Development</footer></body></html>"""
+
+# A few silent MPEG frames' worth of bytes; the backend only concatenates and forwards them
+FAKE_MP3 = b"\xff\xfb\x90\x64" + bytes(413) * 8
+
+def create_app(seed=0):
+    rng = random.Random(seed)
+    providers = {name: Provider.from_env(name, rng) for name in PROVIDERS}
+    app = FastAPI(title="Fake providers")
+    app.state.providers = providers
+
+    def completion(body, content):
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(json.dumps(body)) // 4, "completion_tokens": len(content) // 4, "total_tokens": 0},
+        }
+
+    def stream(body, content, provider):
+        async def chunks():
+            # First token after half the latency, the rest spread over the other half
+            await provider.delay(0.5)
+            pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+            for piece in pieces:
+                delta = {
+                    "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(delta)}\n\n"
+                await asyncio.sleep(provider.latency * 0.5 / len(pieces))
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        last = body["messages"][-1]["content"]
+        provider = providers["vision" if isinstance(last, list) else "chat"]
+        rejected = provider.admit()
+        if rejected:
+            return rejected
+        if provider.name == "vision":
+            content = VISION_TEXT
+        elif body["messages"][0]["content"].startswith("You translate"):
+            # Translation call: echo the source JSON back
+            content = last[last.index("{"):]
+        else:
+            content = json.dumps(ANALYSIS, ensure_ascii=False)
+        if body.get("stream"):
+            return stream(body, content, provider)
+        await provider.delay()
+        return completion(body, content)
+
+    @app.post("/v1/speech/generate")
+    async def murf_generate(request: Request):
+        body = await request.json()
+        provider = providers["murf"]
+        rejected = provider.admit()
+        if rejected:
+            return rejected
+        # Murf's latency grows with the text; the default is for a ~200 character sentence
+        await provider.delay(max(0.25, len(body.get("text", "")) / 200))
+        return {"audioFile": f"{request.base_url}audio/{provider.stats['calls']}.mp3", "audioLengthInSeconds": 3}
+
+    @app.get("/audio/{name}")
+    async def murf_audio(name: str):
+        return Response(FAKE_MP3, media_type="audio/mpeg")
+
+    @app.get("/portal/{name}")
+    async def portal(name: str):
+        return HTMLResponse(PORTAL_PAGE.format(name=name))
+
+    @app.get("/stats")
+    async def stats():
+        return {name: provider.stats for name, provider in providers.items()}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8930)
+    parser.add_argument("--seed", type=int, default=0)
+    for name in PROVIDERS:
+        parser.add_argument(f"--{name}-ms", type=float, help=f"mean {name} latency")
+        parser.add_argument(f"--{name}-error-rate", type=float, help=f"fraction of {name} calls failing with 500")
+        parser.add_argument(f"--{name}-rate-limit", type=float, help=f"{name} requests per second before 429s")
+    parser.add_argument("--jitter", type=float, help="latency spread as a fraction of the mean")
+    parser.add_argument("--error-rate", type=float, help="default error rate for every provider")
+    parser.add_argument("--rate-limit", type=float, help="default rate limit for every provider")
+    args = parser.parse_args()
+
+    # Command line settings go through the same env variables the app reads
+    for key, value in vars(args).items():
+        if value is not None and key not in ("host", "port", "seed"):
+            os.environ[f"FAKE_{key.upper()}"] = str(value)
+
+    import uvicorn
+    uvicorn.run(create_app(args.seed), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Synthetic fixture documents for the benchmarks.
+Generated on the fly so no binary fixtures need to live in the repo.
+"""
+import io
+import random
+
+NOTICE_LINES = [
+    "GOVERNMENT OF INDIA - MINISTRY OF RURAL DEVELOPMENT",
+    "Pradhan Mantri Awas Yojana (Gramin) - Notice to Beneficiaries",
+    "Eligible households will receive Rs. 1,20,000 in three installments.",
+    "Applications must be submitted at the Gram Panchayat office before 31/03/2025.",
+    "Beneficiaries must link their bank account for direct benefit transfer.",
+    "For assistance contact the Block Development Officer or call the helpline.",
+]
+
+def _page_image(page_num, width=1240, height=1754, seed=0):
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed + page_num)
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    y = 80
+    while y < height - 80:
+        draw.text((80, y), f"{rng.choice(NOTICE_LINES)} (page {page_num + 1})", fill="black")
+        y += 28
+    # Scanner noise so JPEG encoding has realistic work to do
+    for _ in range(4000):
+        draw.point((rng.randrange(width), rng.randrange(height)), fill=(rng.randrange(160, 255),) * 3)
+    return img
+
+def _text_page(lines, width=1240, height=1754, font_px=26, line_px=40, seed=0):
+    """A page with real-size type: font_px=26 at 150 DPI is ~12pt body text"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=font_px)
+    y = 120
+    for line in lines:
+        if y > height - 120:
+            break
+        draw.text((100, y), line, fill="black", font=font)
+        y += line_px
+    for _ in range(3000):
+        draw.point((rng.randrange(width), rng.randrange(height)), fill=(rng.randrange(200, 255),) * 3)
+    return img
+
+def _blank_page(width=1240, height=1754, seed=0):
+    """Separator sheet: off-white paper with faint scanner dust"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height), (246, 245, 240))
+    draw = ImageDraw.Draw(img)
+    for _ in range(1500):
+        draw.point((rng.randrange(width), rng.randrange(height)), fill=(rng.randrange(150, 230),) * 3)
+    return img
+
+def make_mixed_scanned_pdf(seed=0):
+    """
+    Image-only PDF shaped like a real scanned bundle: a cover sheet, blank
+    separators, the cover repeated before the annex, sparse large-type pages
+    and dense body pages. Returns (pdf bytes, page kinds).
+    """
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    cover = _text_page(["GOVERNMENT OF INDIA", "Ministry of Rural Development", "", "PMAY-G BENEFICIARY NOTICE"], font_px=64, line_px=110, seed=seed)
+    pages = [
+        ("cover", cover),
+        ("blank", _blank_page(seed=seed + 1)),
+        ("dense", _text_page([rng.choice(NOTICE_LINES) for _ in range(80)], font_px=24, line_px=34, seed=seed + 2)),
+        ("dense", _text_page([rng.choice(NOTICE_LINES) for _ in range(80)], font_px=24, line_px=34, seed=seed + 3)),
+        ("blank", _blank_page(seed=seed + 4)),
+        ("cover", cover),
+        ("sparse", _text_page(["ANNEXURE A", "", "List of documents required"] + NOTICE_LINES[3:5], font_px=40, line_px=70, seed=seed + 5)),
+        ("dense", _text_page([rng.choice(NOTICE_LINES) for _ in range(80)], font_px=22, line_px=32, seed=seed + 6)),
+        ("blank", _blank_page(seed=seed + 7)),
+        ("sparse", _text_page(["Signature of the Block Development Officer", "", "Seal"], font_px=36, line_px=60, seed=seed + 8)),
+    ]
+    doc = fitz.open()
+    for _, image in pages:
+        buf = io.BytesIO()
+        image.save(buf, format="JPEG", quality=80)
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, stream=buf.getvalue())
+    data = doc.tobytes()
+    doc.close()
+    return data, [kind for kind, _ in pages]
+
+def make_image(width=1240, height=1754, fmt="PNG", seed=0):
+    buf = io.BytesIO()
+    _page_image(0, width, height, seed).save(buf, format=fmt)
+    return buf.getvalue()
+
+def make_scanned_pdf(pages=10, seed=0):
+    """Image-only PDF: every page needs rasterisation + vision OCR"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for page_num in range(pages):
+        buf = io.BytesIO()
+        _page_image(page_num, seed=seed).save(buf, format="JPEG", quality=80)
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(page.rect, stream=buf.getvalue())
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def make_digital_pdf(pages=3, seed=0):
+    """Text-layer PDF: direct extraction, no vision calls"""
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=595, height=842)
+        text = "\n".join(rng.choice(NOTICE_LINES) for _ in range(40))
+        page.insert_textbox(fitz.Rect(40, 40, 555, 800), text, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+LETTER_BODY = [
+    "Subject: Sanction of housing assistance under PMAY-G for the year 2024-25",
+    "With reference to your application dated 04/11/2024, this is to inform you that your household",
+    "has been found eligible for assistance of Rs. 1,20,000 for construction of a pucca house.",
+    "The amount will be released in three installments of Rs. 40,000 each to your bank account",
+    "(A/c No. XXXXXX4521, IFSC SBIN0001234) after geo-tagged inspection of each stage of construction.",
+    "You must start construction within 30 days and complete the house before 31/03/2025.",
+    "An additional Rs. 12,000 is available under SBM-G for building a toilet.",
+    "You are also entitled to 90 days of unskilled work under MGNREGA at Rs. 254 per day.",
+    "Documents required: bank passbook, job card, land record (ROR) and two photographs.",
+    "For grievances call the toll free helpline 1800-11-6446 or visit pmayg.nic.in.",
+    "Failure to start construction within the stipulated period will lead to cancellation of sanction.",
+]
+
+def make_ocr_letter_text(pages=5, seed=0):
+    """
+    OCR output of a multi-page scanned letter as extract_text_from_pdf returns it:
+    page markers, the letterhead and footer on every page, page numbers, leader
+    dots, uneven spacing and scanner specks read as stray symbols.
+    """
+    rng = random.Random(seed)
+    letterhead = [
+        "GOVERNMENT OF ODISHA",
+        "OFFICE OF THE BLOCK DEVELOPMENT OFFICER, KUJANG, JAGATSINGHPUR",
+        "Letter No. 2231 / PMAY-G          Date: 12/01/2025",
+    ]
+    footer = ["Block Development Officer, Kujang", "Phone: 06724-220134   Email: bdo.kujang@odisha.gov.in"]
+    names = ["Ramesh Behera", "Sabita Nayak", "Pradeep Swain", "Jharana Das", "Bijay Sahoo", "Minati Jena"]
+    villages = ["Paradeep Garh", "Kujang", "Taladanda", "Bhutmundai", "Gadakujang"]
+    out = []
+    for page in range(pages):
+        lines = letterhead + [""]
+        if page == 0:
+            lines += ["To,", "Shri Ramesh Chandra Behera", "Village ........................ Paradeep Garh", "GP .......................... Kujang", ""]
+            body = list(LETTER_BODY)
+        else:
+            # Annexure: list of sanctioned beneficiaries, one row per household
+            lines += [f"Annexure {page}: Beneficiaries sanctioned in phase {page}", "Sl. Name Village Amount Released on"]
+            body = [
+                f"{page * 20 + row}. {rng.choice(names)} {rng.choice(villages)} Rs. {rng.choice([40000, 80000, 120000])} "
+                f"{rng.randrange(1, 28):02d}/{rng.randrange(1, 13):02d}/2025"
+                for row in range(20)
+            ]
+        for line in body:
+            # Uneven word spacing from column detection
+            lines.append(line.replace(" ", "   ", rng.randrange(3)))
+            if rng.random() < 0.25:
+                lines.append(rng.choice(["|", "~ .", "• •", "'", "_ _ _"]))
+        lines += ["", "Signature ____________________", *footer, f"Page {page + 1} of {pages}"]
+        out.append(f"--- Page {page + 1} (OCR) ---\n" + "\n".join(lines))
+    return "\n\n".join(out)
+
+def make_short_notice_text():
+    """A one-page digital notice: little for compaction to remove"""
+    return "--- Page 1 ---\n" + "\n".join(NOTICE_LINES)
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
@@ -1,16 +1,31 @@
 from fastapi import FastAPI, UploadFile, File, Form, Request
+from typing import List
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+import logging
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
-from services.ocr_service import extract_text_from_file
-from services.analysis_service import analyze_document
+
+# Structured JSON logs, written from a background thread (LOG_LEVEL, LOG_LEVELS, LOG_DEBUG_SAMPLE_RATE, APP_ENV)
+from services.logging_config import setup_logging
+setup_logging()
+logger = logging.getLogger("civic.api")
+from services.ocr_service import extract_text_from_file, estimate_ocr_memory
+from services.pipeline_service import admit, lookup_result, run_pipeline, PipelineError
+from services.upload_service import spool_upload, UploadTooLarge, MaxBodySizeMiddleware, MAX_UPLOAD_BYTES, MULTIPART_OVERHEAD_BYTES
+from services.metrics import RequestTraceMiddleware, current_request_id, render_metrics, ERRORS
+from services.job_service import job_manager
+from services.batch_service import run_batch, upload_item, url_item, BATCH_MAX_ITEMS
+from services.stage_scheduler import Overloaded, stage_scheduler, memory_budget
+from services.tts_service import lookup_speech, stream_speech, cached_audio_path, audio_id_for, is_audio_id
+from services import warmup
 import json
+import orjson
 
 app = FastAPI(title="Civic Translator Backend")
 
@@ -23,119 +38,293 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads while the body is still arriving (Content-Length or streamed byte count)
+BATCH_MAX_UPLOAD_BYTES = int(os.getenv("BATCH_MAX_UPLOAD_MB", "200")) * 1024 * 1024
+app.add_middleware(MaxBodySizeMiddleware, overrides={"/api/batch": BATCH_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES})
+
+# Request id, per-route latency and Server-Timing for every /api request (outermost, so 413s are counted too)
+app.add_middleware(RequestTraceMiddleware)
+
+_warmup_task = None
+
+@app.on_event("startup")
+async def start_job_workers():
+    global _warmup_task
+    await job_manager.start()
+    # Optional (WARMUP=1): load libraries, clients and render workers in the background
+    if warmup.WARMUP_ENABLED:
+        _warmup_task = asyncio.create_task(warmup.warm_up())
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    from services import render_pool, llm_client, tts_service, web_service
+    from services.page_cache import page_cache
+    from services.similarity_index import near_duplicates
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+    await job_manager.stop()
+    render_pool.shutdown()
+    page_cache.close()
+    near_duplicates.close()
+    await llm_client.aclose()
+    await tts_service.aclose()
+    await web_service.aclose()
+
 # Removed simple root route to allow static file serving or catch-all
 # @app.get("/")
 # async def root():
 #     return {"status": "Civic Translator Backend Running", "version": "1.0.0"}
 
+import asyncio
 import time
-import uuid
-import traceback
+
+NO_STORE_HEADERS = {"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"}
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson: several times faster than json.dumps on multi-language results"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def file_too_large_response():
+    return JSONResponse(
+        status_code=413,
+        content={"error": "File too large", "details": f"Please upload a document smaller than {MAX_UPLOAD_BYTES // (1024 * 1024)}MB."}
+    )
+
+def overloaded_response(e: Overloaded):
+    """Load shedding: answer at once and tell the client when to come back"""
+    return JSONResponse(
+        status_code=e.status_code,
+        content=e.to_dict(),
+        headers={"Retry-After": str(e.retry_after), **NO_STORE_HEADERS},
+    )
 
 @app.post("/api/process-document")
 async def process_document(
     file: UploadFile = File(...),
     user_context: str = Form(...)
 ):
-    request_id = str(uuid.uuid4())[:8]
-    print(f"\n{'='*60}", flush=True)
-    print(f"[{request_id}] ⚡ REQUEST RECEIVED", flush=True)
-    print(f"[{request_id}] File: {file.filename}", flush=True)
-    print(f"[{request_id}] Content-Type: {file.content_type}", flush=True)
-    print(f"{'='*60}\n", flush=True)
+    request_id = current_request_id()
+    logger.info("⚡ REQUEST RECEIVED", extra={"upload_filename": file.filename, "content_type": file.content_type})
     """
     Complete pipeline with memory protection
     """
-    # Memory Safety: Reject files larger than 10MB
-    MAX_FILE_SIZE = 10 * 1024 * 1024 # 10MB
-    
+    upload = None
     try:
-        # Check size without loading entire file into memory
-        file.file.seek(0, os.SEEK_END)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
-        print(f"[{request_id}] File Size Check: {file_size} bytes", flush=True)
+        # Memory Safety: stream the upload to a temp file, rejecting it as soon as it crosses MAX_UPLOAD_BYTES
+        try:
+            upload = await spool_upload(file)
+        except UploadTooLarge:
+            return file_too_large_response()
         
-        if file_size > MAX_FILE_SIZE:
-            return JSONResponse(
-                status_code=413,
-                content={"error": "File too large", "details": "Please upload a document smaller than 10MB."}
-            )
+        logger.debug("File Size Check: %d bytes", upload.size)
 
         # Parse user context
         context = json.loads(user_context)
         
-        print(f"[{request_id}] STEP 1: Starting OCR...", flush=True)
-        
-        # TEMPORARY BYPASS: Skip OCR and use mock text for testing
-        USE_MOCK_OCR = False  # Set to False to use real OCR
-        
-        if USE_MOCK_OCR:
-            print(f"[{request_id}] ⚠️ USING MOCK OCR (BYPASS MODE)", flush=True)
-            extracted_text = "This is a government scheme notification about PM Awas Yojana housing benefits for eligible citizens."
-            confidence = 95.0
-            print(f"[{request_id}] Mock OCR complete. Text length: {len(extracted_text)}", flush=True)
-        else:
-            # Step 1: File/Content Processing
-            file_bytes = await file.read()
-            file_extension = file.filename.split('.')[-1].lower()
-            
-            # Check for URL in text file (Frontend sends URL as input.txt)
-            is_url = False
-            if file_extension == 'txt':
-                content = file_bytes.decode('utf-8').strip()
-                if content.startswith(('http://', 'https://')) and len(content.split()) == 1:
-                    is_url = True
-                    print(f"[{request_id}] 🔗 URL DETECTED: {content}", flush=True)
-                    
-            if is_url:
-                from services.web_service import fetch_url_content
-                url_content = await fetch_url_content(content)
-                if url_content["success"]:
-                     extracted_text = url_content["text"]
-                     confidence = 100.0
-                     print(f"[{request_id}] URL FETCH SUCCESS. Length: {len(extracted_text)}", flush=True)
-                else:
-                     return JSONResponse(status_code=400, content={"error": "URL processing failed", "details": url_content["error"]})
-            else:
-                # Normal File Processing
-                ocr_result = await extract_text_from_file(file_bytes, file_extension)
-                
-                if not ocr_result["success"]:
-                    print(f"[{request_id}] OCR FAILED: {ocr_result.get('error')}", flush=True)
-                    return JSONResponse(
-                        status_code=400,
-                        content={"error": "OCR failed", "details": ocr_result.get("error")}
-                    )
-                
-                extracted_text = ocr_result["text"]
-                confidence = ocr_result.get("confidence", 0)
-                
-                print(f"[{request_id}] OCR SUCCESS. Text Length: {len(extracted_text)}", flush=True)
-                if len(extracted_text) < 10:
-                     print(f"[{request_id}] WARNING: Very short text extracted: '{extracted_text}'", flush=True)
-             
-        # Step 2-6: Analysis pipeline (Classification, Extraction, Translation)
-        print(f"[{request_id}] CALLING AI ANALYSIS...", flush=True)
-        analysis_result = await analyze_document(extracted_text, context)
-        print(f"[{request_id}] AI ANALYSIS COMPLETE. Result Type: {analysis_result.get('type')}", flush=True)
-        
-        # Add OCR metadata
-        analysis_result["ocr_confidence"] = confidence
-        analysis_result["extracted_text_length"] = len(extracted_text)
-        analysis_result["request_id"] = request_id
-        
-        headers = {"Cache-Control": "no-store, no-cache, must-revalidate, max-age=0"}
-        return JSONResponse(content=analysis_result, headers=headers)
+        analysis_result = await run_pipeline(upload, context, request_id)
+        return FastJSONResponse(content=analysis_result, headers=NO_STORE_HEADERS)
         
+    except Overloaded as e:
+        return overloaded_response(e)
+    except PipelineError as e:
+        return JSONResponse(status_code=e.status_code, content=e.to_dict())
     except Exception as e:
-        print(f"[{request_id}] CRITICAL ERROR: {str(e)}", flush=True)
-        traceback.print_exc()
+        logger.exception("CRITICAL ERROR: %s", e)
+        ERRORS.labels("request").inc()
         return JSONResponse(
             status_code=500,
             content={"error": "Processing failed", "details": str(e), "request_id": request_id}
         )
+    finally:
+        if upload:
+            upload.cleanup()
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/process-document/stream")
+async def process_document_stream(
+    file: UploadFile = File(...),
+    user_context: str = Form(...)
+):
+    """
+    Same pipeline as /api/process-document, streamed as Server-Sent Events:
+    accepted -> ocr_started / ocr_page* / ocr_done (or fetch_*) -> analysis_started
+    -> partial* (fields as the model writes them; for a language other than English
+    the English extraction comes first, marked "preview") -> fields -> done | error.
+    A full OCR / fetch stage is answered with 503 + Retry-After before the stream starts.
+    """
+    request_id = current_request_id()
+    logger.info("⚡ STREAM REQUEST RECEIVED", extra={"upload_filename": file.filename})
+
+    # Spool before the response starts so the stream never depends on the request body
+    try:
+        upload = await spool_upload(file)
+    except UploadTooLarge:
+        return file_too_large_response()
+    try:
+        context = json.loads(user_context)
+    except ValueError as e:
+        upload.cleanup()
+        return JSONResponse(status_code=400, content={"error": "Invalid user_context", "details": str(e)})
+
+    headers = {**NO_STORE_HEADERS, "X-Accel-Buffering": "no"}
+
+    # Cache hits need no stage, so they are served even when the server is full
+    cached_result = await lookup_result(upload, context, request_id)
+    if cached_result is not None:
+        upload.cleanup()
+
+        async def cached_events():
+            yield sse_event("accepted", {"request_id": request_id, "filename": file.filename, "size": upload.size})
+            yield sse_event("done", cached_result)
+
+        return StreamingResponse(cached_events(), media_type="text/event-stream", headers=headers)
+
+    # Admission before the 200 goes out: a full OCR / fetch queue or memory budget is a 503 + Retry-After
+    try:
+        reserved = await admit(upload)
+    except Overloaded as e:
+        upload.cleanup()
+        return overloaded_response(e)
+
+    queue = asyncio.Queue()
+
+    async def emit(event, data):
+        await queue.put((event, data))
+
+    async def run():
+        try:
+            result = await run_pipeline(upload, context, request_id, emit, reserved, check_cache=False)
+            await emit("done", result)
+        except Overloaded as e:
+            await emit("error", {**e.to_dict(), "status": e.status_code, "request_id": request_id})
+        except PipelineError as e:
+            await emit("error", {**e.to_dict(), "status": e.status_code, "request_id": request_id})
+        except Exception as e:
+            logger.exception("CRITICAL ERROR: %s", e)
+            ERRORS.labels("request").inc()
+            await emit("error", {"error": "Processing failed", "details": str(e), "status": 500, "request_id": request_id})
+        finally:
+            upload.cleanup()
+            await queue.put(None)
+
+    # Started before the response is returned: if the client leaves before the body is
+    # read, events() never runs, and the task still releases the reservation and the upload
+    task = asyncio.create_task(run())
+
+    async def events():
+        try:
+            yield sse_event("accepted", {"request_id": request_id, "filename": file.filename, "size": upload.size})
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield sse_event(*item)
+        finally:
+            # Client went away: stop paying for OCR / LLM calls nobody will read
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    user_context: str = Form(...)
+):
+    """
+    Job mode for long documents: returns a job id immediately; poll
+    GET /api/jobs/{job_id} or subscribe to /api/jobs/{job_id}/events.
+    Jobs are persisted, so queued work survives a restart.
+    """
+    try:
+        upload = await spool_upload(file)
+    except UploadTooLarge:
+        return file_too_large_response()
+    try:
+        context = json.loads(user_context)
+        job_id = await job_manager.submit(upload, context)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": "Invalid user_context", "details": str(e)})
+    finally:
+        upload.cleanup()  # no-op once the job has taken the file
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}", "events_url": f"/api/jobs/{job_id}/events"},
+        headers={"Location": f"/api/jobs/{job_id}"},
+    )
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return FastJSONResponse(content=job, headers=NO_STORE_HEADERS)
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events for one job: status, the pipeline's progress events, then done | error"""
+    if await job_manager.get(job_id) is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+
+    async def events():
+        async for event, data in job_manager.subscribe(job_id):
+            yield sse_event(event, data)
+
+    headers = {**NO_STORE_HEADERS, "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+@app.post("/api/batch")
+async def process_batch(
+    files: List[UploadFile] = File(default=[]),
+    urls: str = Form(""),
+    user_context: str = Form(...),
+    skip: str = Form("")
+):
+    """
+    Many documents in one call, streamed back as JSON Lines in completion order:
+    {"id", "source", "index", "status": "ok" | "error", "result" | "error", "elapsed_ms"}.
+    urls: newline-separated. skip: JSON list of ids from an interrupted run to leave out
+    (re-sent files are also result-cache hits).
+    """
+    uploads = []
+    try:
+        context = json.loads(user_context)
+        skip_ids = set(json.loads(skip)) if skip else set()
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": "Invalid user_context or skip", "details": str(e)})
+
+    # Counted before anything is spooled, so an oversized batch is never written to disk
+    url_list = [url.strip() for url in urls.splitlines() if url.strip()]
+    if len(files) + len(url_list) > BATCH_MAX_ITEMS:
+        return JSONResponse(status_code=400, content={"error": "Batch too large", "details": f"At most {BATCH_MAX_ITEMS} documents per batch."})
+
+    try:
+        for file in files:
+            uploads.append(await spool_upload(file))
+    except UploadTooLarge:
+        for upload in uploads:
+            upload.cleanup()
+        return file_too_large_response()
+
+    items = [upload_item(upload) for upload in uploads]
+    items += [url_item(url) for url in url_list]
+    items = [item for item in items if item.item_id not in skip_ids]
+    logger.info("Batch accepted: %d document(s)", len(items))
+
+    async def lines():
+        try:
+            async for record in run_batch(items, context):
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        finally:
+            for upload in uploads:
+                upload.cleanup()
+
+    headers = {**NO_STORE_HEADERS, "X-Accel-Buffering": "no"}
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
 
 @app.post("/api/ocr-only")
 async def ocr_only(file: UploadFile = File(...)):
@@ -143,38 +332,103 @@ async def ocr_only(file: UploadFile = File(...)):
     OCR endpoint for testing
     """
     try:
-        file_bytes = await file.read()
-        file_extension = file.filename.split('.')[-1].lower()
-        
-        result = await extract_text_from_file(file_bytes, file_extension)
+        with await spool_upload(file) as upload:
+            memory = await asyncio.to_thread(estimate_ocr_memory, upload.path, upload.extension, upload.size)
+            async with stage_scheduler.slot("ocr"), memory_budget.reserve(memory, "ocr"):
+                result = await extract_text_from_file(upload.path, upload.extension)
         return JSONResponse(content=result)
         
+    except UploadTooLarge:
+        return file_too_large_response()
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return JSONResponse(
             status_code=500,
             content={"error": "OCR failed", "details": str(e)}
         )
 # TTS Endpoint
-from services.tts_service import generate_speech
-from fastapi.responses import Response
-
 class SpeakRequest(BaseModel):
     text: str
     language: str = 'en'
 
+AUDIO_CACHE_HEADERS = {"Cache-Control": "private, max-age=86400, immutable"}
+
+async def audio_response(request: Request, audio_id: str):
+    """
+    Serve a cached clip. The id is the content address, so it doubles as a
+    strong ETag; FileResponse handles Range/If-Range for seeking.
+    """
+    etag = f'"{audio_id}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, **AUDIO_CACHE_HEADERS})
+    path = await asyncio.to_thread(cached_audio_path, audio_id)
+    if path is None:
+        return JSONResponse(status_code=404, content={"error": "Audio not found"})
+    return FileResponse(
+        path,
+        media_type="audio/mpeg",
+        headers={"ETag": etag, "Content-Location": f"/api/speak/{audio_id}", "X-Audio-Id": audio_id, **AUDIO_CACHE_HEADERS},
+    )
+
 @app.post("/api/speak")
-async def speak(request: SpeakRequest):
+async def speak(request: SpeakRequest, http_request: Request):
     try:
         if not request.text:
             return JSONResponse(status_code=400, content={"error": "Text is required"})
             
-        audio_content = await generate_speech(request.text, request.language)
-        
-        return Response(content=audio_content, media_type="audio/mpeg")
+        audio_id = await lookup_speech(request.text, request.language)
+        if audio_id:
+            return await audio_response(http_request, audio_id)
+
+        # Wait for the first sentence so a Murf failure is still a clean error response
+        audio_stream = stream_speech(request.text, request.language)
+        first_chunk = await audio_stream.__anext__()
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
-        print(f"TTS Error: {str(e)}", flush=True)
+        logger.error("TTS Error: %s", e)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+    async def audio_chunks():
+        yield first_chunk
+        try:
+            async for chunk in audio_stream:
+                yield chunk
+        except Exception as e:
+            # Headers are gone; the client just gets shorter audio
+            logger.error("TTS Error mid-stream: %s", e)
+
+    # The joined clip is stored under this id once it is complete: replays and seeks go to the cached URL
+    audio_id = audio_id_for(request.text, request.language)
+    headers = {"Content-Location": f"/api/speak/{audio_id}", "X-Audio-Id": audio_id, **NO_STORE_HEADERS}
+    return StreamingResponse(audio_chunks(), media_type="audio/mpeg", headers=headers)
+
+@app.get("/api/speak/{audio_id}")
+async def speak_cached(audio_id: str, request: Request):
+    """Replays and seeks of an already synthesised clip; never calls Murf"""
+    if not is_audio_id(audio_id):
+        return JSONResponse(status_code=404, content={"error": "Audio not found"})
+    return await audio_response(request, audio_id)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (per-process; run one scrape target per worker)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/status")
+async def status():
+    """Admission state of this worker: stage queues, memory budget, page cache, warm-up"""
+    from services.page_cache import page_cache
+    return JSONResponse(
+        content={
+            "stages": stage_scheduler.snapshot(), "memory": memory_budget.snapshot(),
+            "page_cache": page_cache.snapshot(), "warmup": warmup.snapshot(),
+        },
+        headers=NO_STORE_HEADERS,
+    )
+
 # Serve Static Files (Frontend)
 frontend_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "out")
 
@@ -187,19 +441,23 @@ if os.path.exists(frontend_path):
     async def catch_all_spa(request: Request, call_next):
         # Only log API requests to reduce noise
         if request.url.path.startswith("/api"):
-            print(f"🌐 API REQUEST: {request.method} {request.url.path}", flush=True)
+            logger.debug("🌐 API REQUEST: %s %s", request.method, request.url.path)
         
+        start = time.perf_counter()
         response = await call_next(request)
         
         if request.url.path.startswith("/api"):
-            process_time = time.time() - time.time()  # Will be calculated properly by uvicorn
-            print(f"✅ API RESPONSE: {request.method} {request.url.path} - Status {response.status_code}", flush=True)
+            process_time = time.perf_counter() - start
+            logger.info(
+                "✅ API RESPONSE: %s %s - Status %d in %.0fms", request.method, request.url.path, response.status_code, process_time * 1000,
+                extra={"response_request_id": response.headers.get('x-request-id', '-')},
+            )
         
         if response.status_code == 404 and not request.url.path.startswith("/api"):
             return FileResponse(os.path.join(frontend_path, "index.html"))
         return response
 else:
-    print(f"Warning: Frontend path {frontend_path} not found. UI will not be served.")
+    logger.warning("Frontend path %s not found. UI will not be served.", frontend_path)
 
 if __name__ == "__main__":
     import uvicorn
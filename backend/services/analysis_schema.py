@@ -0,0 +1,244 @@
+import json
+import re
+from typing import List
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+# Fields of AnalysisResult in src/types/index.ts. The frontend's documentType
+# arrives as "type" (use-civic-analysis.ts maps it).
+TEXT_FIELDS = ("title", "summary", "targetAudience", "personalImpact", "trustNote", "voice_script")
+LIST_FIELDS = ("actionItems", "benefits", "deadlines")
+RESULT_FIELDS = ("type",) + TEXT_FIELDS + LIST_FIELDS
+# Without these there is nothing to show; the others can be asked for again or left empty
+ESSENTIAL_FIELDS = ("title", "summary")
+# Fields the model must return (voice_script is optional in the frontend type)
+REQUIRED_FIELDS = tuple(field for field in RESULT_FIELDS if field != "voice_script")
+
+def _as_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return "; ".join(filter(None, (_as_text(v) for v in value)))
+    if isinstance(value, dict):
+        return "; ".join(f"{k}: {_as_text(v)}" for k, v in value.items() if _as_text(v))
+    return str(value)
+
+class AnalysisResult(BaseModel):
+    """
+    One document explanation as the model returns it. Values of the wrong
+    shape are coerced (a string where a list belongs, a list of objects, a
+    number) instead of failing the request.
+    """
+
+    model_config = ConfigDict(extra="ignore")
+
+    type: str = "unknown"
+    title: str
+    summary: str
+    targetAudience: str = ""
+    personalImpact: str = ""
+    actionItems: List[str] = []
+    benefits: List[str] = []
+    deadlines: List[str] = []
+    trustNote: str = ""
+    voice_script: str = ""
+
+    @field_validator("type", mode="before")
+    @classmethod
+    def _type(cls, value):
+        return _as_text(value).lower() or "unknown"
+
+    @field_validator(*TEXT_FIELDS, mode="before")
+    @classmethod
+    def _text(cls, value):
+        return _as_text(value)
+
+    @field_validator(*LIST_FIELDS, mode="before")
+    @classmethod
+    def _list(cls, value):
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            value = [value]
+        return [text for text in (_as_text(item) for item in value) if text]
+
+def missing_fields(fields: dict) -> list:
+    """Required fields the model did not return (empty title / summary count as missing)"""
+    return [
+        field for field in REQUIRED_FIELDS
+        if fields.get(field) is None or (field in ESSENTIAL_FIELDS and not _as_text(fields[field]))
+    ]
+
+_decoder = json.JSONDecoder(strict=False)  # models put raw newlines inside strings
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SEPARATORS = " \t\r\n,"
+
+def _decode_partial_string(raw: str) -> str:
+    """The text of a string value that is still being written (no closing quote yet)"""
+    # Drop a trailing half-written escape sequence before decoding
+    raw = re.sub(r'\\(u[0-9a-fA-F]{0,3})?$', '', raw)
+    try:
+        return _decoder.decode(f'"{raw}"')
+    except ValueError:
+        return raw.replace('\\"', '"')
+
+class IncrementalObjectParser:
+    """
+    Top-level fields of a JSON object read while it is still being generated.
+    A key/value pair lands in .fields as soon as its value is complete; a string
+    value still being written is available through partial(). Malformed stretches
+    (an unescaped quote inside a string, a trailing comma, a missing comma) are
+    repaired or skipped up to the next known key, so one bad value does not
+    lose the rest of the object.
+    """
+
+    def __init__(self, known_keys=RESULT_FIELDS):
+        self.buffer = ""
+        self.fields = {}
+        self.repaired = False
+        self._pos = None  # next unparsed index inside the object, None until "{" arrives
+        self._pending = None  # (key, text so far) of an unterminated string value
+        self._final = False
+        self._next_key = re.compile(r'[{,]\s*"(?:%s)"\s*:' % "|".join(map(re.escape, known_keys)))
+
+    def feed(self, text: str):
+        self.buffer += text
+        self._advance()
+        return self
+
+    def finish(self) -> dict:
+        """Parse what is left as a complete (possibly malformed or cut off) object"""
+        self._final = True
+        self._advance()
+        return self.fields
+
+    def partial(self, fields) -> dict:
+        """Complete fields plus the text so far of any of `fields` still being written"""
+        partial = dict(self.fields)
+        if self._pending and self._pending[0] in fields and self._pending[1]:
+            partial[self._pending[0]] = self._pending[1]
+        return partial
+
+    def _skip(self, i: int) -> int:
+        while i < len(self.buffer) and self.buffer[i] in _SEPARATORS:
+            i += 1
+        return i
+
+    def _resync(self, start: int) -> bool:
+        """Continue at the next known key after start; False when there is none (yet)"""
+        match = self._next_key.search(self.buffer, start)
+        if not match:
+            if self._final:
+                self._pos = len(self.buffer)
+            return False
+        self._pos = match.start() + 1
+        self.repaired = True
+        return True
+
+    def _advance(self):
+        buf = self.buffer
+        if self._pos is None:
+            start = buf.find("{")
+            if start < 0:
+                return
+            self._pos = start + 1
+        while True:
+            self._pending = None
+            i = self._skip(self._pos)
+            if i >= len(buf) or buf[i] == "}":
+                return
+            key_match = _STRING.match(buf, i) if buf[i] == '"' else None
+            if key_match is None:
+                if buf[i] == '"' and not self._final:
+                    return  # key still being written
+                if not self._resync(i):
+                    return
+                continue
+            key = _decoder.decode(key_match.group())
+            j = self._skip(key_match.end())
+            if j >= len(buf):
+                return
+            if buf[j] != ":":
+                if not self._resync(i):
+                    return
+                continue
+            v = self._skip(j + 1)
+            if v >= len(buf):
+                return
+            if buf[v] == '"':
+                parsed = self._string_value(key, v)
+            else:
+                parsed = self._other_value(v)
+            if parsed is None:
+                return
+            value, end = parsed
+            if end is None:
+                continue  # skipped a malformed value, _pos already moved to the next key
+            self.fields[key] = value
+            self._pos = end
+
+    def _string_value(self, key: str, v: int):
+        buf = self.buffer
+        match = _STRING.match(buf, v)
+        if match:
+            after = self._skip(match.end())
+            # A well-formed value is followed by the next pair or the end of the object
+            if after >= len(buf) and not self._final:
+                self._pending = (key, _decode_partial_string(buf[v + 1:match.end() - 1]))
+                return None
+            if after >= len(buf) or buf[after] == "}" or buf[match.end():after].strip() == "," or buf[after] == '"':
+                return _decoder.decode(match.group()), match.end()
+        elif not self._final:
+            self._pending = (key, _decode_partial_string(buf[v + 1:]))
+            return None
+        # Unescaped quote(s) inside the value: it runs up to the last quote before the next key
+        next_key = self._next_key.search(buf, v + 1)
+        if next_key is None and not self._final:
+            self._pending = (key, _decode_partial_string(buf[v + 1:]))
+            return None
+        self.repaired = True
+        if next_key is None:
+            # Last value, possibly cut off: everything up to the closing quote / brace if any
+            raw, end = re.sub(r'"?\s*}?\s*$', '', buf[v + 1:]), len(buf)
+        else:
+            end = buf.rfind('"', v + 1, next_key.start())
+            if end <= v:
+                return self._skip_value(v)
+            raw, end = buf[v + 1:end], end + 1
+        return _decode_partial_string(re.sub(r'(?<!\\)"', '\\"', raw)), end
+
+    def _other_value(self, v: int):
+        try:
+            value, end = _decoder.raw_decode(self.buffer, v)
+            return value, end
+        except ValueError:
+            if not self._final:
+                return None  # array / number / literal still being written
+        if self.buffer[v] == "[":
+            return self._salvage_list(v)
+        return self._skip_value(v)
+
+    def _salvage_list(self, v: int):
+        """Items of a malformed list (trailing comma, cut off) up to the first bad one"""
+        items, i = [], v + 1
+        while True:
+            i = self._skip(i)
+            if i >= len(self.buffer) or self.buffer[i] == "]":
+                break
+            try:
+                item, i = _decoder.raw_decode(self.buffer, i)
+            except ValueError:
+                break
+            items.append(item)
+        self.repaired = True
+        end = self.buffer.find("]", i)
+        if end < 0 or self._next_key.search(self.buffer, v, end):
+            self._resync(v)
+            return items, self._pos
+        return items, end + 1
+
+    def _skip_value(self, v: int):
+        self._resync(v)
+        return None, None
@@ -1,65 +1,63 @@
-from groq import Groq
+import asyncio
+import json
+import logging
 import os
+from services.chunking import chunk_text, estimate_tokens
+from services.analysis_schema import (
+    ESSENTIAL_FIELDS, RESULT_FIELDS, AnalysisResult, IncrementalObjectParser, missing_fields,
+)
+from services.compaction import compact_text
+from services.keyword_matcher import screen_text, ScreeningResult
+from services.llm_scheduler import chat_completion, stream_chat_completion
+from services.metrics import ANALYSIS_REPAIRS, ERRORS, IDENTITY_BLOCKED, SCAMS_DETECTED, stage
+from services.logging_config import PAYLOAD_LOGGER
 
-# Use Groq API (free tier, no credit issues)
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+logger = logging.getLogger(__name__)
+payload_logger = logging.getLogger(PAYLOAD_LOGGER)
 
-def detect_identity_document(text: str) -> bool:
+# Groq API (free tier, no credit issues) via the shared async client
+ANALYSIS_TIMEOUT = 30.0  # per attempt (passed to the client)
+# The whole call: rate-limit queueing, provider Retry-After pauses and every retry with backoff
+ANALYSIS_DEADLINE = float(os.getenv("ANALYSIS_DEADLINE", "120"))
+
+def detect_identity_document(text: str, screening: ScreeningResult = None) -> bool:
     """Check for identity documents including Aadhar, PAN, and Voter ID"""
-    keywords = [
-        'aadhaar', 'aadhar', 'uidai',  # Aadhar
-        'pan card', 'permanent account number',  # PAN (Removed 'income tax department' as it appears on notices)
-        'voter id', 'elector photo identity card', 'epic no'  # Voter ID (Removed 'election commission' as it appears on press notes)
-    ]
-    return any(keyword in text.lower() for keyword in keywords)
-
-def detect_scam(text: str) -> bool:
-    """Check for scam indicators"""
-    scam_keywords = ['urgent action', 'share otp', 'send money', 'lottery winner', 'click immediately']
-    count = sum(1 for keyword in scam_keywords if keyword in text.lower())
-    return count >= 2
-
-async def analyze_document(text: str, user_context: dict):
+    return (screening or screen_text(text)).triggered("identity")
+
+def detect_scam(text: str, screening: ScreeningResult = None) -> bool:
+    """Check for scam indicators (at least two distinct scam phrases)"""
+    return (screening or screen_text(text)).triggered("scam")
+
+# String fields forwarded to the client while they are still being written
+PARTIAL_FIELDS = ("title", "summary")
+
+async def _stream_completion(request_kwargs: dict, on_partial) -> str:
     """
-    Complete analysis pipeline using Groq AI
+    Stream a chat completion through the incremental parser, calling on_partial
+    whenever a field completes or a tracked string field grows
     """
-    # ... (Low quality check skipped for brevity in this replace block, handled by original code)
+    parser = IncrementalObjectParser()
+    sent = {}
+    async for delta in stream_chat_completion(timeout=ANALYSIS_TIMEOUT, **request_kwargs):
+        partial = parser.feed(delta).partial(PARTIAL_FIELDS)
+        if partial and partial != sent:
+            sent = partial
+            await on_partial(partial)
+    return parser.buffer
 
-    try:
-        # Priority 1: Block identity documents (Aadhar, PAN, Voter ID)
-        if detect_identity_document(text):
-            return {
-                "type": "identity_block",
-                "title": "Private Document Detected",
-                "summary": "private messages cannot be summarized",  # User requested exact message
-                "targetAudience": "N/A",
-                "personalImpact": "This document contains sensitive personal information.",
-                "actionItems": ["We do not process Aadhar, PAN, or Voter Cards for privacy reasons."],
-                "benefits": [],
-                "deadlines": [],
-                "trustNote": "🔒 Privacy Protection Active",
-                "voice_script": "This is a private identity document. Depending on privacy rules, private messages cannot be summarized."
-            }
-        
-        # Priority 2: Detect scams
-        if detect_scam(text):
-            return {
-                "type": "scam",
-                "title": "⚠️ Potential Scam Detected",
-                "summary": "This document shows fraud characteristics.",
-                "targetAudience": "Anyone who received this",
-                "personalImpact": "DO NOT share personal information.",
-                "actionItems": ["Do not respond", "Report to cybercrime.gov.in"],
-                "benefits": [],
-                "deadlines": [],
-                "trustNote": "⚠️ FRAUD WARNING",
-                "voice_script": "Warning. This document shows signs of being a scam or fraud. Do not share your personal information. Do not send money."
-            }
-        
-        # Priority 3: Groq AI Analysis
-        print(f"[ANALYSIS] Starting Groq AI analysis...", flush=True)
-        
-        system_prompt = """You are a Civic Document Analyzer.
+# Texts above this estimate are split on page/section boundaries and analysed in parallel (map-reduce)
+ANALYSIS_CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "6000"))
+# Upper bound on parallel chunk calls; chunks grow instead once this is reached
+ANALYSIS_MAX_CHUNKS = int(os.getenv("ANALYSIS_MAX_CHUNKS", "8"))
+# Completion budget picked from the (compacted) input size instead of a fixed 2000: the
+# scheduler reserves max_tokens against the TPM limit on every call, and short notices
+# produce ~500-900 output tokens
+ANALYSIS_MIN_OUTPUT_TOKENS = int(os.getenv("ANALYSIS_MIN_OUTPUT_TOKENS", "1024"))
+ANALYSIS_MAX_OUTPUT_TOKENS = int(os.getenv("ANALYSIS_MAX_OUTPUT_TOKENS", "2000"))
+# List fields that are concatenated (de-duplicated) across chunks
+LIST_FIELDS = ("actionItems", "benefits", "deadlines")
+
+SYSTEM_PROMPT = """You are a Civic Document Analyzer.
 
 STEP 1 — DOCUMENT READING (MANDATORY)
 Extract ALL readable text from the uploaded document using OCR.
@@ -115,11 +113,10 @@ For Websites/Portals:
 
 Map these detailed points to the "benefits" field in the JSON.
 
-STEP 7 — LANGUAGE & VOICE
-1. Translate the ENTIRE explanation (Title, Summary, Important Points, Actions) into the user's selected language ({user_context.get('language', 'en')}).
-2. Generate a voice script in that language.
-3. The script MUST read the Title, then the Summary, and then clearly read out each Important Point.
-4. Voice Script Structure: "Title... Summary... Here are the important points: Point 1... Point 2... Point 3..."
+STEP 7 — VOICE
+Write everything in English (it is translated separately) and generate a voice script.
+The script MUST read the Title, then the Summary, and then clearly read out each Important Point.
+Voice Script Structure: "Title... Summary... Here are the important points: Point 1... Point 2... Point 3..."
 
 FINAL RULE
 If something is missing, unreadable, or unclear, clearly say so.
@@ -137,65 +134,368 @@ You must output a single valid JSON object. Do not include any markdown formatti
   "benefits": ["Important Point 1", "Important Point 2", "Important Point 3"], 
   "deadlines": ["Deadline 1", "Deadline 2"],
   "trustNote": "Verification note",
-  "voice_script": "The full translated script including title, summary, and important points"
+  "voice_script": "The full script including title, summary, and important points"
 }"""
 
-        target_lang = user_context.get('language', 'en')
-        print(f"[ANALYSIS] Requested Language: {target_lang}", flush=True)
+REDUCE_SYSTEM_PROMPT = """You are a Civic Document Analyzer.
+You are given partial analyses of consecutive parts of ONE long document.
+Combine them into a single explanation of the whole document.
+Use ONLY the information provided. Never guess. Never auto-fill.
+Write in very simple words (10th-grade level), in the requested language.
+The voice script MUST read the Title, then the Summary, and then each Important Point:
+"Title... Summary... Here are the important points: Point 1... Point 2... Point 3..."
+
+OUTPUT FORMAT (STRICT JSON ONLY, no markdown):
+{
+  "type": "scheme" | "notice" | "certificate" | "identity" | "unknown",
+  "title": "Exact document title",
+  "summary": "Simple explanation of the whole document",
+  "targetAudience": "Who this is for",
+  "personalImpact": "What this means for the user",
+  "trustNote": "Verification note",
+  "voice_script": "The full script including title, summary, and important points"
+}"""
+
+TRANSLATE_SYSTEM_PROMPT = """You translate civic document explanations for citizens.
+You are given an explanation as JSON. Translate every string value into the requested language.
+Keep the same keys and the same number of list items. Do not add, drop or change information.
+Keep numbers, dates, amounts, phone numbers, URLs and scheme names exactly as they are.
+Use very simple words (10th-grade level) and short sentences.
+"voice_script" must read naturally aloud in the requested language.
+
+OUTPUT FORMAT (STRICT JSON ONLY, no markdown): the same JSON object, translated."""
+
+REPAIR_SYSTEM_PROMPT = """You are a Civic Document Analyzer.
+An analysis of the document below left out some fields. Return ONLY those fields.
+Use ONLY the document text. Never guess. Never auto-fill: use "" or [] when the document has nothing for a field.
+Write in very simple English (10th-grade level).
+
+OUTPUT FORMAT (STRICT JSON ONLY, no markdown): a JSON object with exactly the missing fields."""
+# The re-ask answers a handful of fields, not a whole analysis
+REPAIR_MAX_TOKENS = int(os.getenv("ANALYSIS_REPAIR_MAX_TOKENS", "512"))
+
+# The extraction step is always written in English; translations are made from it
+EXTRACTION_LANGUAGE = "en"
+# Fields of an analysis that are shown to the user and get translated
+TRANSLATED_FIELDS = ("title", "summary", "targetAudience", "personalImpact", "actionItems", "benefits", "deadlines", "trustNote", "voice_script")
+# Results with fixed wording (screening blocks, failures) are returned as they are
+UNTRANSLATED_TYPES = ("identity_block", "scam", "error")
+# The translation input is the compact extraction, so it can use a smaller model than extraction
+# (which also has its own Groq rate limits, see llm_scheduler.LLM_RATE_LIMITS)
+TRANSLATION_MODEL = os.getenv("TRANSLATION_MODEL", "llama-3.1-8b-instant")
+
+def build_user_prompt(text: str, user_context: dict, part: int = None, parts: int = None) -> str:
+    target_lang = user_context.get('language', 'en')
+    scope = ""
+    if part is not None:
+        scope = f"""This is part {part} of {parts} of a longer document. Analyze ONLY this part.
+Set "voice_script" to an empty string; it will be written for the whole document later.
 
-        user_prompt = f"""Analyze this document text:
+"""
+    return f"""{scope}Analyze this document text:
 
 {text}
 
 User Context: 
 - Occupation: {user_context.get('occupation', 'N/A')}
 - Location: {user_context.get('location', 'N/A')}
-- Language Code: {target_lang} (Translate output to this language)
+- Language Code: {target_lang}
 
 Extract ONLY actual information. Do NOT invent content. Return JSON only."""
 
-        print(f"[ANALYSIS] Calling Groq API with model llama-3.3-70b-versatile...", flush=True)
-        
-        # Add timeout to prevent hanging
-        import asyncio
-        try:
-            # Run the synchronous Groq call with a timeout
+def output_budget(text_tokens: int) -> int:
+    """max_tokens for an extraction call over text of about text_tokens tokens"""
+    return max(ANALYSIS_MIN_OUTPUT_TOKENS, min(ANALYSIS_MAX_OUTPUT_TOKENS, 512 + text_tokens // 2))
+
+def _analysis_request(user_prompt: str, system_prompt: str = SYSTEM_PROMPT, max_tokens: int = 2000) -> dict:
+    return dict(
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.1,
+        max_tokens=max_tokens
+    )
+
+async def _run_completion(request_kwargs: dict, on_partial=None) -> str:
+    logger.info("Calling Groq API with model %s", request_kwargs['model'])
+    payload_logger.debug("Analysis prompt size: %d chars", sum(len(m["content"]) for m in request_kwargs["messages"]))
+    # Each attempt times out after ANALYSIS_TIMEOUT and is retried; the deadline only stops a hanging call
+    try:
+        if on_partial:
+            response_text = await asyncio.wait_for(
+                _stream_completion(request_kwargs, on_partial),
+                timeout=ANALYSIS_DEADLINE
+            )
+        else:
             completion = await asyncio.wait_for(
-                asyncio.to_thread(
-                    groq_client.chat.completions.create,
-                    model="llama-3.3-70b-versatile",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    temperature=0.1,
-                    max_tokens=2000
-                ),
-                timeout=30.0  # 30 second timeout
+                chat_completion(timeout=ANALYSIS_TIMEOUT, **request_kwargs),
+                timeout=ANALYSIS_DEADLINE
             )
-            print(f"[ANALYSIS] Groq API call completed successfully", flush=True)
-        except asyncio.TimeoutError:
-            print(f"[ANALYSIS] ERROR: Groq API call timed out after 30 seconds", flush=True)
-            raise Exception("AI analysis timed out. Please try again.")
-        except Exception as api_error:
-            print(f"[ANALYSIS] ERROR: Groq API call failed: {str(api_error)}", flush=True)
-            raise
-
-        response_text = completion.choices[0].message.content
-        print(f"[ANALYSIS] Received response from Groq API (length: {len(response_text)})", flush=True)
+            response_text = completion.choices[0].message.content
+        logger.debug("Groq API call completed successfully")
+    except asyncio.TimeoutError:
+        logger.error("Groq API call timed out after %ss", ANALYSIS_DEADLINE)
+        raise Exception("AI analysis timed out. Please try again.")
+    except Exception as api_error:
+        logger.error("Groq API call failed: %s", api_error)
+        raise
+
+    payload_logger.debug("Received response from Groq API (length: %d)", len(response_text))
+    return response_text
+
+def parse_model_json(response_text: str) -> dict:
+    """
+    The JSON object in a model response. Well-formed output (optionally in a
+    markdown fence) takes the plain json.loads path; anything else goes through
+    the tolerant parser, which keeps every field it can recover.
+    """
+    json_text = response_text.strip()
+    if json_text.startswith("```json"):
+        json_text = json_text.replace("```json", "").replace("```", "").strip()
+    elif json_text.startswith("```"):
+         json_text = json_text.replace("```", "").strip()
+
+    with stage("json_parse"):
+        try:
+            parsed = json.loads(json_text)
+            if isinstance(parsed, dict):
+                return parsed
+        except ValueError:
+            pass
+        parser = IncrementalObjectParser().feed(response_text)
+        fields = parser.finish()
+        if not fields:
+            raise ValueError("Model response is not a JSON object")
+        ANALYSIS_REPAIRS.labels("recovered").inc()
+        logger.warning("Malformed model JSON, recovered fields: %s", ", ".join(fields))
+        return fields
+
+async def _complete_missing_fields(fields: dict, text: str) -> dict:
+    """
+    Ask again for only the required fields the extraction left out, with the
+    fields it did return as context; a much smaller call than repeating the
+    whole extraction. Fields still missing afterwards are left empty.
+    """
+    missing = missing_fields(fields)
+    if not missing:
+        return fields
+    logger.warning("Model output is missing %s; asking for them again", ", ".join(missing))
+    known = {field: value for field, value in fields.items() if field in RESULT_FIELDS}
+    prompt = f"""Document text:
+
+{text}
+
+Already extracted (JSON):
+{json.dumps(known, ensure_ascii=False)}
+
+Missing fields: {", ".join(f'"{field}" ({"list of strings" if field in LIST_FIELDS else "string"})' for field in missing)}
+Return JSON only."""
+    request_kwargs = _analysis_request(prompt, system_prompt=REPAIR_SYSTEM_PROMPT, max_tokens=REPAIR_MAX_TOKENS)
+    try:
+        repaired = parse_model_json(await _run_completion(request_kwargs))
+        fields = {**fields, **{field: repaired[field] for field in missing if repaired.get(field) is not None}}
+        ANALYSIS_REPAIRS.labels("reasked").inc()
+    except Exception as e:
+        logger.warning("Re-asking for missing fields failed: %s", e)
+    still_missing = missing_fields(fields)
+    if any(field in ESSENTIAL_FIELDS for field in still_missing):
+        raise ValueError(f"Model response is missing {', '.join(still_missing)}")
+    if still_missing:
+        ANALYSIS_REPAIRS.labels("defaulted").inc()
+    return fields
+
+def validate_analysis(fields: dict) -> dict:
+    """An extraction result in the AnalysisResult shape (coerced types, defaults for optional fields)"""
+    extra = {field: value for field, value in fields.items() if field not in RESULT_FIELDS}
+    return {**AnalysisResult.model_validate(fields).model_dump(), **extra}
+
+def merge_chunk_results(results: list) -> dict:
+    """
+    Deterministic part of the reduce step: list fields are concatenated in
+    document order with duplicates removed, the type is the most common
+    specific type, and narrative fields fall back to the chunk values.
+    """
+    merged = {}
+    for field in LIST_FIELDS:
+        seen = set()
+        merged[field] = []
+        for result in results:
+            items = result.get(field) or []
+            for item in items if isinstance(items, list) else [items]:
+                key = " ".join(str(item).casefold().split())
+                if key and key not in seen:
+                    seen.add(key)
+                    merged[field].append(item)
+
+    types = [r.get("type") for r in results if r.get("type") and r.get("type") != "unknown"]
+    merged["type"] = max(set(types), key=types.count) if types else "unknown"
+    merged["title"] = next((r["title"] for r in results if r.get("title")), "Document Analysis")
+    merged["summary"] = " ".join(r["summary"] for r in results if r.get("summary"))
+    for field in ("targetAudience", "personalImpact", "trustNote"):
+        merged[field] = next((r[field] for r in results if r.get(field)), "")
+    merged["voice_script"] = f"{merged['title']}. {merged['summary']}"
+    return merged
+
+async def _analyze_chunked(text: str, user_context: dict, chunk_budget: int, on_partial=None) -> dict:
+    chunks = chunk_text(text, chunk_budget)
+    logger.info("Long document (~%d tokens): %d chunks in parallel", estimate_tokens(text), len(chunks))
+
+    # Map: every chunk against the full extraction prompt, concurrently (the scheduler enforces rate limits)
+    async def analyze_chunk(index, chunk):
+        prompt = build_user_prompt(chunk, user_context, part=index + 1, parts=len(chunks))
+        return parse_model_json(await _run_completion(_analysis_request(prompt, max_tokens=output_budget(estimate_tokens(chunk)))))
+
+    outcomes = await asyncio.gather(*(analyze_chunk(i, c) for i, c in enumerate(chunks)), return_exceptions=True)
+    results = [o for o in outcomes if isinstance(o, dict)]
+    failures = [o for o in outcomes if not isinstance(o, dict)]
+    if not results:
+        raise failures[0]
+    if failures:
+        logger.warning("%d/%d chunks failed: %s", len(failures), len(chunks), failures[0])
+
+    merged = merge_chunk_results(results)
+    if failures:
+        merged["trustNote"] = f"{merged['trustNote']} (Parts of this long document could not be analyzed.)".strip()
+
+    # Reduce: one small call turns the per-chunk narratives into a single explanation + voice script
+    reduce_input = {
+        "parts": [{k: r.get(k) for k in ("type", "title", "summary", "targetAudience", "personalImpact")} for r in results],
+        "important_points": merged["benefits"],
+        "actions": merged["actionItems"],
+        "deadlines": merged["deadlines"],
+    }
+    reduce_prompt = f"""Partial analyses (JSON):
+{json.dumps(reduce_input, ensure_ascii=False)}
+
+Language Code: {user_context.get('language', 'en')} (Write the output in this language)
+Return JSON only."""
+    try:
+        narrative = parse_model_json(await _run_completion(
+            _analysis_request(reduce_prompt, system_prompt=REDUCE_SYSTEM_PROMPT), on_partial
+        ))
+        for field in ("type", "title", "summary", "targetAudience", "personalImpact", "trustNote", "voice_script"):
+            if narrative.get(field) and not (field == "trustNote" and failures):
+                merged[field] = narrative[field]
+    except Exception as e:
+        # The merged chunk fields are still a usable answer
+        logger.warning("Reduce step failed, using merged chunk fields: %s", e)
+
+    merged = validate_analysis(merged)
+    merged["chunks"] = len(chunks)
+    if failures:
+        merged["partial"] = True  # missing chunks: served, but never cached
+    return merged
+
+async def analyze_document(text: str, user_context: dict, on_partial=None):
+    """
+    Complete analysis in user_context['language']: extract_document, then
+    translate_analysis. The pipeline calls the two steps itself so the
+    extraction can be cached and translated into several languages.
+    """
+    analysis = await extract_document(text, user_context, on_partial if user_context.get("language", "en") == EXTRACTION_LANGUAGE else None)
+    return await translate_analysis(analysis, user_context.get("language", "en"), on_partial)
+
+async def translate_analysis(analysis: dict, language: str, on_partial=None) -> dict:
+    """
+    One extraction result in the target language. English (the extraction
+    language) and fixed-wording results are returned unchanged; a failed
+    translation falls back to English, marked with translation_failed.
+    """
+    result = dict(analysis)
+    result["language"] = language
+    if language == EXTRACTION_LANGUAGE or analysis.get("type") in UNTRANSLATED_TYPES:
+        return result
+
+    source = {field: analysis[field] for field in TRANSLATED_FIELDS if analysis.get(field)}
+    prompt = f"""Language Code: {language}
+
+{json.dumps(source, ensure_ascii=False)}"""
+    request_kwargs = _analysis_request(prompt, system_prompt=TRANSLATE_SYSTEM_PROMPT, max_tokens=2000)
+    request_kwargs["model"] = TRANSLATION_MODEL
+    try:
+        translated = parse_model_json(await _run_completion(request_kwargs, on_partial))
+    except Exception as e:
+        logger.warning("Translation to %s failed, returning English: %s", language, e)
+        ERRORS.labels("translation").inc()
+        result["language"] = EXTRACTION_LANGUAGE
+        result["translation_failed"] = language
+        return result
+    for field in source:
+        if isinstance(translated.get(field), type(source[field])) and translated[field]:
+            result[field] = translated[field]
+    return result
+
+async def extract_document(text: str, user_context: dict, on_partial=None):
+    """
+    Language-neutral analysis: screening, then the Groq extraction written in
+    English (EXTRACTION_LANGUAGE) whatever language the user asked for.
+    on_partial: optional async callback(partial result); when given the completion is
+    streamed, and completed fields (plus title / summary as they are written) are
+    forwarded as soon as tokens arrive. Required fields the model leaves out are
+    asked for again on their own.
+    """
+    user_context = {**user_context, "language": EXTRACTION_LANGUAGE}
+    # ... (Low quality check skipped for brevity in this replace block, handled by original code)
+
+    try:
+        # One pass over the text for both screening checks (keywords live in data/screening_keywords.json)
+        screening = screen_text(text)
+
+        # Priority 1: Block identity documents (Aadhar, PAN, Voter ID)
+        if detect_identity_document(text, screening):
+            IDENTITY_BLOCKED.inc()
+            return {
+                "type": "identity_block",
+                "title": "Private Document Detected",
+                "summary": "private messages cannot be summarized",  # User requested exact message
+                "targetAudience": "N/A",
+                "personalImpact": "This document contains sensitive personal information.",
+                "actionItems": ["We do not process Aadhar, PAN, or Voter Cards for privacy reasons."],
+                "benefits": [],
+                "deadlines": [],
+                "trustNote": "🔒 Privacy Protection Active",
+                "voice_script": "This is a private identity document. Depending on privacy rules, private messages cannot be summarized."
+            }
         
-        # Parse JSON
-        import json
-        json_text = response_text.strip()
-        if json_text.startswith("```json"):
-            json_text = json_text.replace("```json", "").replace("```", "").strip()
-        elif json_text.startswith("```"):
-             json_text = json_text.replace("```", "").strip()
+        # Priority 2: Detect scams
+        if detect_scam(text, screening):
+            SCAMS_DETECTED.inc()
+            return {
+                "type": "scam",
+                "title": "⚠️ Potential Scam Detected",
+                "summary": "This document shows fraud characteristics.",
+                "targetAudience": "Anyone who received this",
+                "personalImpact": "DO NOT share personal information.",
+                "actionItems": ["Do not respond", "Report to cybercrime.gov.in"],
+                "benefits": [],
+                "deadlines": [],
+                "trustNote": "⚠️ FRAUD WARNING",
+                "voice_script": "Warning. This document shows signs of being a scam or fraud. Do not share your personal information. Do not send money."
+            }
         
-        result = json.loads(json_text)
-        return result
+        # Priority 3: Groq AI Analysis
+        logger.info("Starting Groq AI analysis")
+
+        # Screening above sees the raw text; the model gets it without markers, repeats and noise
+        raw_tokens = estimate_tokens(text)
+        text = compact_text(text)
+        text_tokens = estimate_tokens(text)
+        logger.info("Prompt text compacted: ~%d -> ~%d tokens", raw_tokens, text_tokens)
+
+        # Long documents: analyse page/section chunks in parallel and merge, instead of one huge prompt
+        if text_tokens > ANALYSIS_CHUNK_TOKENS:
+            chunk_budget = max(ANALYSIS_CHUNK_TOKENS, -(-text_tokens // ANALYSIS_MAX_CHUNKS))
+            return await _analyze_chunked(text, user_context, chunk_budget, on_partial)
+
+        request_kwargs = _analysis_request(build_user_prompt(text, user_context), max_tokens=output_budget(text_tokens))
+        response_text = await _run_completion(request_kwargs, on_partial)
+        fields = await _complete_missing_fields(parse_model_json(response_text), text)
+        return validate_analysis(fields)
 
     except Exception as e:
+        ERRORS.labels("analysis").inc()
         return {
             "type": "error",
             "title": "Analysis Error",
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+from services.metrics import ERRORS, start_trace
+from services.pipeline_service import run_pipeline, process_url, PipelineError
+from services.stage_scheduler import queue_when_full
+from services.upload_service import SpooledUpload, UPLOAD_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Documents admitted into the pipeline at once per batch. This only bounds
+# memory and open files; throughput is set by the shared stage limits
+# (services/stage_scheduler.py).
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "32"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+SUPPORTED_EXTENSIONS = {"pdf", "jpg", "jpeg", "png", "bmp", "tiff", "txt"}
+
+class BatchItem:
+    """
+    One document of a batch: a URL, a file on disk, or an already spooled upload.
+    item_id is stable across runs so an interrupted batch can be resumed.
+    """
+
+    def __init__(self, item_id: str, source: str, url: str = None, path: str = None, upload: SpooledUpload = None):
+        self.item_id = item_id
+        self.source = source
+        self.url = url
+        self.path = path
+        self.upload = upload
+
+def url_item(url: str) -> BatchItem:
+    return BatchItem(url, url, url=url)
+
+def file_item(path: str, item_id: str = None) -> BatchItem:
+    return BatchItem(item_id or path, path, path=path)
+
+def upload_item(upload: SpooledUpload) -> BatchItem:
+    # Content-addressed, so re-sending the same files maps to the same ids
+    return BatchItem(f"{upload.filename}#{upload.sha256[:12]}", upload.filename, upload=upload)
+
+def expand_paths(paths) -> list:
+    """Files as given; directories are walked for supported document types"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in sorted(os.walk(path)):
+                files.extend(
+                    os.path.join(root, name) for name in sorted(names)
+                    if name.rsplit(".", 1)[-1].lower() in SUPPORTED_EXTENSIONS
+                )
+        else:
+            files.append(path)
+    return files
+
+def _describe_file(path: str) -> SpooledUpload:
+    """Treat a file on disk like a spooled upload (size + sha256), without copying it"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return SpooledUpload(path, size, digest.hexdigest(), os.path.basename(path))
+
+async def process_item(item: BatchItem, context: dict, index: int) -> dict:
+    request_id = start_trace(f"b{index}")
+    start = time.perf_counter()
+    record = {"id": item.item_id, "source": item.source, "index": index}
+    try:
+        # Admission is bounded by max_in_flight; full stages are waited for, not shed
+        with queue_when_full():
+            if item.url:
+                result = await process_url(item.url, context, request_id)
+            else:
+                upload = item.upload or await asyncio.to_thread(_describe_file, item.path)
+                result = await run_pipeline(upload, context, request_id)
+        # Analysis failures come back as a result payload; they must be retried on resume
+        record["status"] = "error" if result.get("type") == "error" else "ok"
+        record["result"] = result
+    except PipelineError as e:
+        record["status"] = "error"
+        record["error"] = {**e.to_dict(), "status": e.status_code}
+    except Exception as e:
+        logger.exception("Batch item %s failed: %s", item.source, e)
+        ERRORS.labels("batch").inc()
+        record["status"] = "error"
+        record["error"] = {"error": "Processing failed", "details": str(e), "status": 500}
+    record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return record
+
+async def run_batch(items, context: dict, max_in_flight: int = BATCH_MAX_IN_FLIGHT):
+    """
+    Yield one record per item in completion order. At most max_in_flight
+    items are admitted at a time; the stage scheduler decides how many of
+    them OCR / fetch / analyse concurrently. Closing the generator cancels
+    whatever is still running.
+    """
+    results = asyncio.Queue()
+    admitted = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+
+    async def run_one(index, item):
+        try:
+            await results.put(await process_item(item, context, index))
+        finally:
+            admitted.release()
+
+    async def admit():
+        for index, item in enumerate(items):
+            await admitted.acquire()
+            task = asyncio.create_task(run_one(index, item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    admitter = asyncio.create_task(admit())
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        admitter.cancel()
+        for task in list(tasks):
+            task.cancel()
@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cache configuration (override via environment)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache"))
+CACHE_MEMORY_ITEMS = int(os.getenv("CACHE_MEMORY_ITEMS", "256"))
+CACHE_DISK_MAX_BYTES = int(os.getenv("CACHE_DISK_MAX_MB", "512")) * 1024 * 1024
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 of raw content, used as the content address of an upload"""
+    return hashlib.sha256(data).hexdigest()
+
+def make_key(*parts) -> str:
+    """
+    Build a stable cache key from arbitrary parts.
+    Strings are normalised (stripped, lower-cased) so 'Hindi ' and 'hindi' share an entry.
+    """
+    normalised = [str(part if part is not None else "").strip().lower() for part in parts]
+    return hashlib.sha256("\x1f".join(normalised).encode("utf-8")).hexdigest()
+
+def _copy(value):
+    # Callers decorate results per request (request_id etc.), so never hand out the cached dict itself
+    return dict(value) if isinstance(value, dict) else value
+
+class DiskStore:
+    """
+    Flat on-disk blob store with TTL and total-size based eviction.
+    Files are sharded by the first two hex chars of the key. The index
+    (key -> size, created, last_access) is kept in memory and rebuilt
+    from the directory on first use.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = CACHE_DISK_MAX_BYTES, ttl: int = CACHE_TTL_SECONDS, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.suffix = suffix
+        self._index = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        self._total_bytes = 0
+        if not os.path.isdir(self.directory):
+            return
+        for shard in os.listdir(self.directory):
+            shard_path = os.path.join(self.directory, shard)
+            if not os.path.isdir(shard_path):
+                continue
+            for name in os.listdir(shard_path):
+                if self.suffix and not name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(shard_path, name))
+                except OSError:
+                    continue
+                key = name[:-len(self.suffix)] if self.suffix else name
+                self._index[key] = [stat.st_size, stat.st_mtime, stat.st_mtime]
+                self._total_bytes += stat.st_size
+
+    def _remove(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total_bytes -= entry[0]
+        try:
+            os.remove(self.path_for(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, (_, created, _) in self._index.items() if now - created > self.ttl]:
+            self._remove(key)
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Least recently accessed first
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][2]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+
+    def _live_entry(self, key: str):
+        """Index entry of an unexpired key (caller holds the lock), or None"""
+        self._load_index()
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[1] > self.ttl:
+            self._remove(key)
+            return None
+        return entry
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return self._live_entry(key) is not None
+
+    def touch(self, key: str) -> bool:
+        """contains(), and marks the entry as just used so eviction keeps it longer"""
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return False
+            entry[2] = time.time()
+            return True
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return None
+            entry[2] = time.time()
+        try:
+            with open(self.path_for(key), "rb") as f:
+                return f.read()
+        except OSError:
+            with self._lock:
+                self._remove(key)
+            return None
+
+    def set(self, key: str, data: bytes):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._load_index()
+            old = self._index.get(key)
+            if old:
+                self._total_bytes -= old[0]
+            self._index[key] = [len(data), now, now]
+            self._total_bytes += len(data)
+            self._evict()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._load_index()
+            self._remove(key)
+
+class TwoTierCache:
+    """
+    JSON value cache: in-memory LRU in front of a DiskStore.
+    Memory hits are served inline; disk reads/writes go through a worker
+    thread so they never block the event loop.
+    """
+
+    def __init__(self, name: str, memory_items: int = CACHE_MEMORY_ITEMS, max_bytes: int = CACHE_DISK_MAX_BYTES, ttl: int = CACHE_TTL_SECONDS):
+        self.name = name
+        self.memory_items = memory_items
+        self.ttl = ttl
+        self.disk = DiskStore(os.path.join(CACHE_DIR, name), max_bytes=max_bytes, ttl=ttl, suffix=".json")
+        self._memory = OrderedDict()
+
+    def _memory_get(self, key: str):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.time() - stored_at > self.ttl:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value, stored_at: float = None):
+        self._memory[key] = (stored_at or time.time(), value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str):
+        if not CACHE_ENABLED:
+            return None
+        value = self._memory_get(key)
+        if value is not None:
+            return _copy(value)
+        raw = await asyncio.to_thread(self.disk.get, key)
+        if raw is None:
+            return None
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            await asyncio.to_thread(self.disk.delete, key)
+            return None
+        self._memory_set(key, value)
+        return _copy(value)
+
+    async def set(self, key: str, value):
+        if not CACHE_ENABLED:
+            return
+        self._memory_set(key, _copy(value))
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        await asyncio.to_thread(self.disk.set, key, data)
+
+# Shared caches
+result_cache = TwoTierCache("results")  # Full analysis responses
+ocr_cache = TwoTierCache("ocr")  # Extracted text, reused across languages
+extraction_cache = TwoTierCache("extractions")  # English analyses of OCR text, reused across languages
+translation_cache = TwoTierCache("translations")  # One extraction in one target language
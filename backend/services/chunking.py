@@ -0,0 +1,68 @@
+import re
+
+# Page markers written by extract_text_from_pdf: "--- Page 3 ---" / "--- Page 3 (OCR) ---"
+PAGE_MARKER = re.compile(r'^--- Page \d+(?: \([^)]*\))? ---$', re.MULTILINE)
+# Blank lines separate sections/paragraphs in both OCR and web text
+SECTION_BREAK = re.compile(r'\n\s*\n')
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate without a tokenizer: ~4 chars per token for
+    ASCII, ~2 for Indic scripts (which tokenise much less efficiently).
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 127) if not text.isascii() else 0
+    return (len(text) - non_ascii) // 4 + non_ascii // 2 + 1
+
+def split_sections(text: str) -> list:
+    """Split on page markers first, then on blank-line section boundaries; markers stay with their page"""
+    sections = []
+    starts = [m.start() for m in PAGE_MARKER.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts = [0] + starts
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(text)
+        page = text[start:end].strip()
+        if page:
+            sections.extend(part.strip() for part in SECTION_BREAK.split(page) if part.strip())
+    return sections
+
+def _split_oversized(section: str, max_tokens: int) -> list:
+    """Last resort for a single section larger than the budget: split on lines, then hard-split"""
+    pieces, current = [], ""
+    for line in section.splitlines():
+        while estimate_tokens(line) > max_tokens:
+            cut = max(1, len(line) * max_tokens // estimate_tokens(line))
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:cut])
+            line = line[cut:]
+        candidate = f"{current}\n{line}" if current else line
+        if current and estimate_tokens(candidate) > max_tokens:
+            pieces.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_text(text: str, max_tokens: int) -> list:
+    """
+    Greedily pack page/section boundaries into chunks of at most max_tokens.
+    Sections are never split unless a single one exceeds the budget.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for section in split_sections(text):
+        tokens = estimate_tokens(section)
+        parts = _split_oversized(section, max_tokens) if tokens > max_tokens else [section]
+        for part in parts:
+            part_tokens = estimate_tokens(part)
+            if current and current_tokens + part_tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
@@ -0,0 +1,102 @@
+import math
+import os
+import re
+
+from services.chunking import PAGE_MARKER
+
+# Prompt compaction: OCR / PDF text is cleaned up before it is sent for analysis.
+# Page markers, letterheads and running footers repeated on every page, page
+# numbers, whitespace runs, leader dots and symbol-only OCR noise cost input
+# tokens (and latency) without adding anything the model can extract.
+COMPACTION_ENABLED = os.getenv("PROMPT_COMPACTION", "1") != "0"
+# Lines at the top / bottom of each page checked for repeated headers and footers
+EDGE_LINES = int(os.getenv("COMPACTION_EDGE_LINES", "3"))
+# An edge line is a header/footer when it appears on at least this share of the pages (and on 2+).
+# Only those are de-duplicated: repeats in the body (table rows, "Documents required:") stay
+REPEAT_MIN_SHARE = float(os.getenv("COMPACTION_REPEAT_MIN_SHARE", "0.5"))
+
+_SPACES = re.compile(r'[ \t\u00a0\u200b]+')
+# "Name..........", "______", "-----", "*****": keep three
+_SYMBOL_RUN = re.compile(r'([^\w\s])\1{3,}')
+# "Page 3", "Page 3 of 10", "- 3 -" (a bare number may be a table cell, so it stays)
+_PAGE_NUMBER = re.compile(r'^(?:page\s*\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?|[-–]\s*\d{1,4}\s*[-–])$', re.IGNORECASE)
+_WORD_CHAR = re.compile(r'[^\W_]')  # letters and digits
+
+def _clean_line(line: str) -> str:
+    return _SYMBOL_RUN.sub(r'\1\1\1', _SPACES.sub(' ', line)).strip()
+
+def _is_noise(line: str) -> bool:
+    """Symbol-only lines and stray specks ("|", "~ .", "• •") but not "1." or "a)" """
+    chars = len(line.replace(' ', ''))
+    word_chars = len(_WORD_CHAR.findall(line))
+    return word_chars == 0 or (word_chars < 3 and word_chars / chars < 0.5)
+
+def _line_key(line: str) -> str:
+    return line.casefold()
+
+def _split_pages(text: str) -> list:
+    """Lines of each page, cleaned; page markers and form feeds separate pages"""
+    pages = []
+    for page in (sheet for part in PAGE_MARKER.split(text) for sheet in part.split('\f')):
+        lines = []
+        for raw in page.splitlines():
+            line = _clean_line(raw)
+            if not line:
+                if lines and lines[-1]:
+                    lines.append("")  # one blank line keeps a section break for chunking
+                continue
+            if _is_noise(line) or _PAGE_NUMBER.match(line):
+                continue
+            lines.append(line)
+        while lines and not lines[-1]:
+            lines.pop()
+        if lines:
+            pages.append(lines)
+    return pages
+
+def _edge_indexes(lines: list) -> list:
+    """Positions of the first and last EDGE_LINES non-blank lines of a page"""
+    content = [i for i, line in enumerate(lines) if line]
+    return sorted(set(content[:EDGE_LINES] + content[-EDGE_LINES:]))
+
+def _repeated_edge_lines(pages: list) -> set:
+    if len(pages) < 2:
+        return set()
+    counts = {}
+    for lines in pages:
+        for key in {_line_key(lines[i]) for i in _edge_indexes(lines)}:
+            counts[key] = counts.get(key, 0) + 1
+    needed = max(2, math.ceil(REPEAT_MIN_SHARE * len(pages)))
+    return {key for key, count in counts.items() if count >= needed}
+
+def compact_text(text: str) -> str:
+    """
+    Text with page markers, page numbers, noise lines and whitespace runs
+    removed, and headers/footers repeated across pages kept only where they
+    first appear (a letterhead still names the issuing office once). Lines
+    repeated inside a page's body are kept. Numbers, dates and wording of
+    every remaining line are left untouched.
+    """
+    if not COMPACTION_ENABLED or not text:
+        return text
+    pages = _split_pages(text)
+    repeated = _repeated_edge_lines(pages)
+    seen = set()
+    compacted = []
+    for lines in pages:
+        edges = set(_edge_indexes(lines))
+        kept = []
+        for index, line in enumerate(lines):
+            key = _line_key(line)
+            if index in edges and key in repeated:
+                if key in seen:
+                    continue
+                seen.add(key)
+            if line or (kept and kept[-1]):
+                kept.append(line)
+        while kept and not kept[-1]:
+            kept.pop()
+        if kept:
+            compacted.append("\n".join(kept))
+    # Pages stay separated by a blank line so chunking can still split between them
+    return "\n\n".join(compacted)
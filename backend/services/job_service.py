@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from services.cache_service import CACHE_DIR
+from services.metrics import ERRORS, start_trace
+from services.pipeline_service import run_pipeline, PipelineError
+from services.stage_scheduler import queue_when_full
+from services.upload_service import SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+# Job mode: uploads are accepted immediately and processed by a fixed pool of workers
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_DIR = os.getenv("JOB_DIR", os.path.join(CACHE_DIR, "jobs"))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(JOB_DIR, "jobs.sqlite3"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+# How often finished jobs older than the retention period are deleted while the server runs
+JOB_PURGE_INTERVAL = float(os.getenv("JOB_PURGE_INTERVAL", "3600"))
+# A job that was running during this many restarts is failed instead of retried forever
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+# Progress events worth persisting as the job's current stage (partial results are only streamed)
+STAGE_EVENTS = {"ocr_started", "ocr_page", "ocr_done", "fetch_started", "fetch_done", "analysis_started", "fields"}
+
+class JobStore:
+    """
+    SQLite-backed job table. One connection guarded by a lock; callers on
+    the event loop go through asyncio.to_thread.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress TEXT,
+                    filename TEXT,
+                    path TEXT,
+                    size INTEGER,
+                    sha256 TEXT,
+                    context TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def insert(self, job_id: str, upload: SpooledUpload, context: dict):
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, status, filename, path, size, sha256, context, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, QUEUED, upload.filename, upload.path, upload.size, upload.sha256, json.dumps(context, ensure_ascii=False), now, now),
+        )
+
+    def get(self, job_id: str):
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return dict(rows[0]) if rows else None
+
+    def update(self, job_id: str, **fields):
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        self._execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def start(self, job_id: str):
+        self._execute("UPDATE jobs SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?", (RUNNING, time.time(), job_id))
+
+    def unfinished(self) -> list:
+        """Jobs interrupted by a restart, oldest first"""
+        rows = self._execute("SELECT id, status, attempts FROM jobs WHERE status IN (?, ?) ORDER BY created", (QUEUED, RUNNING))
+        return [dict(row) for row in rows]
+
+    def expired(self, older_than: float) -> list:
+        rows = self._execute("SELECT id, path FROM jobs WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, older_than))
+        return [dict(row) for row in rows]
+
+    def delete(self, job_id: str):
+        self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def job_view(row: dict) -> dict:
+    """Client-facing shape of a job row"""
+    view = {
+        "job_id": row["id"],
+        "status": row["status"],
+        "stage": row["stage"],
+        "progress": json.loads(row["progress"]) if row["progress"] else None,
+        "filename": row["filename"],
+        "created": row["created"],
+        "updated": row["updated"],
+    }
+    if row["result"]:
+        view["result"] = json.loads(row["result"])
+    if row["error"]:
+        view["error"] = json.loads(row["error"])
+    return view
+
+class JobManager:
+    """
+    Queue + worker pool around run_pipeline. Job state lives in the
+    JobStore so queued (and interrupted) work survives a restart;
+    subscribers get the same progress events as the SSE endpoint.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, store_path: str = JOB_DB_PATH, upload_dir: str = os.path.join(JOB_DIR, "uploads")):
+        self.workers = workers
+        self.store_path = store_path
+        self.upload_dir = upload_dir
+        self.store = None
+        self._queue = None
+        self._tasks = []
+        self._subscribers = {}  # job id -> [asyncio.Queue]
+
+    async def start(self):
+        if self._tasks:
+            return
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.store = await asyncio.to_thread(JobStore, self.store_path)
+        self._queue = asyncio.Queue()
+        await self._purge_expired()
+        for job in await asyncio.to_thread(self.store.unfinished):
+            if job["status"] == RUNNING and job["attempts"] >= JOB_MAX_ATTEMPTS:
+                await asyncio.to_thread(self.store.update, job["id"], status=FAILED, error=json.dumps(
+                    {"error": "Processing failed", "details": "Job was interrupted too many times"}))
+                continue
+            self._queue.put_nowait(job["id"])
+        if self._queue.qsize():
+            logger.info("Requeued %d unfinished job(s)", self._queue.qsize())
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purge_periodically()))
+        logger.info("Job workers started (%d)", self.workers)
+
+    async def stop(self):
+        # Running jobs stay 'running' in the store and are picked up again on the next start
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.store:
+            await asyncio.to_thread(self.store.close)
+            self.store = None
+
+    async def _purge_expired(self):
+        expired = await asyncio.to_thread(self.store.expired, time.time() - JOB_RETENTION_SECONDS)
+        for job in expired:
+            _remove(job["path"])
+            await asyncio.to_thread(self.store.delete, job["id"])
+        if expired:
+            logger.info("Purged %d expired job(s)", len(expired))
+
+    async def _purge_periodically(self):
+        """Finished jobs and their stored results would otherwise pile up until the next restart"""
+        while True:
+            await asyncio.sleep(JOB_PURGE_INTERVAL)
+            try:
+                await self._purge_expired()
+            except Exception:
+                logger.exception("Purging expired jobs failed")
+
+    async def submit(self, upload: SpooledUpload, context: dict) -> str:
+        """Take ownership of a spooled upload and queue it; returns the job id"""
+        job_id = uuid.uuid4().hex
+        # The spooled temp file is cleaned up with the request; the job needs its own copy on disk
+        path = os.path.join(self.upload_dir, job_id + (f".{upload.extension}" if upload.extension else ""))
+        await asyncio.to_thread(shutil.move, upload.path, path)
+        job_upload = SpooledUpload(path, upload.size, upload.sha256, upload.filename)
+        await asyncio.to_thread(self.store.insert, job_id, job_upload, context)
+        self._queue.put_nowait(job_id)
+        logger.info("Job %s queued (%s, %d bytes)", job_id, upload.filename, upload.size)
+        return job_id
+
+    async def get(self, job_id: str):
+        row = await asyncio.to_thread(self.store.get, job_id)
+        return job_view(row) if row else None
+
+    async def subscribe(self, job_id: str):
+        """Yield (event, data) for a job until it finishes; a finished job yields its final event at once"""
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        try:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            yield "status", {"job_id": job_id, "status": job["status"], "stage": job["stage"]}
+            if job["status"] in FINISHED:
+                yield _final_event(job)
+                return
+            while True:
+                event, data = await queue.get()
+                yield event, data
+                if event in ("done", "error"):
+                    return
+        finally:
+            self._subscribers[job_id].remove(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    def _publish(self, job_id: str, event: str, data: dict):
+        for queue in self._subscribers.get(job_id, []):
+            queue.put_nowait((event, data))
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job %s crashed the worker loop", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        row = await asyncio.to_thread(self.store.get, job_id)
+        if row is None or row["status"] in FINISHED:
+            return
+        start_trace(job_id[:8])
+        await asyncio.to_thread(self.store.start, job_id)
+        self._publish(job_id, "status", {"job_id": job_id, "status": RUNNING})
+        upload = SpooledUpload(row["path"], row["size"], row["sha256"], row["filename"])
+
+        async def emit(event, data):
+            self._publish(job_id, event, data)
+            if event in STAGE_EVENTS:
+                await asyncio.to_thread(self.store.update, job_id, stage=event, progress=json.dumps(data, ensure_ascii=False))
+
+        try:
+            # Jobs are already queued here; a full stage makes them wait, not fail
+            with queue_when_full():
+                result = await run_pipeline(upload, json.loads(row["context"]), job_id[:8], emit)
+            await asyncio.to_thread(self.store.update, job_id, status=DONE, stage="done", result=json.dumps(result, ensure_ascii=False))
+            self._publish(job_id, "done", result)
+        except PipelineError as e:
+            error = {**e.to_dict(), "status": e.status_code}
+            await asyncio.to_thread(self.store.update, job_id, status=FAILED, stage="error", error=json.dumps(error))
+            self._publish(job_id, "error", error)
+        except Exception as e:
+            logger.exception("Job %s failed: %s", job_id, e)
+            ERRORS.labels("job").inc()
+            error = {"error": "Processing failed", "details": str(e), "status": 500}
+            await asyncio.to_thread(self.store.update, job_id, status=FAILED, stage="error", error=json.dumps(error))
+            self._publish(job_id, "error", error)
+        upload.cleanup()
+
+def _final_event(job: dict):
+    if job["status"] == DONE:
+        return "done", job["result"]
+    return "error", job.get("error") or {"error": "Processing failed"}
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except (OSError, TypeError):
+        pass
+
+job_manager = JobManager()
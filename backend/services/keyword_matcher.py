@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import unicodedata
+
+KEYWORDS_PATH = os.getenv(
+    "SCREENING_KEYWORDS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "screening_keywords.json")
+)
+
+# Zero-width (non-)joiners are common in OCR'd Indic text and never change meaning for matching
+_ZERO_WIDTH = re.compile("[\u200b\u200c\u200d\ufeff]")
+
+def _mark_class() -> str:
+    """Character class of the combining marks in the Indic blocks (vowel signs, virama, anusvara)"""
+    marks = [cp for cp in range(0x0900, 0x0E00) if unicodedata.category(chr(cp)).startswith("M")]
+    ranges, start = [], marks[0]
+    for prev, cp in zip(marks, marks[1:] + [None]):
+        if cp != prev + 1:
+            ranges.append(chr(start) if start == prev else f"{chr(start)}-{chr(prev)}")
+            start = cp
+    return "[" + "".join(ranges) + "]"
+
+# A keyword only matches as whole words: "act now" must not hit "contact now". \b is not
+# enough for Indic scripts because re's \w leaves out combining marks ("लॉटरी" ends in one).
+_WORD_CHAR = re.compile(r"(?:[^\W_]|" + _mark_class() + ")")
+
+def normalise(text: str) -> str:
+    """NFKC + casefold + zero-width removal; match positions refer to this normalised text"""
+    # The quick check is ~40x cheaper than normalising text that is already NFKC (the common case)
+    if not unicodedata.is_normalized("NFKC", text):
+        text = unicodedata.normalize("NFKC", text)
+    if not text.isascii():
+        text = _ZERO_WIDTH.sub("", text)
+    return text.casefold()
+
+class ScreeningResult:
+    """Per-category hits from one pass over a document"""
+
+    def __init__(self, thresholds: dict):
+        self.thresholds = thresholds
+        self.positions = {category: {} for category in thresholds}  # category -> keyword -> [offsets]
+
+    def add(self, category: str, keyword: str, offset: int):
+        self.positions[category].setdefault(keyword, []).append(offset)
+
+    def count(self, category: str) -> int:
+        """Total occurrences of all keywords in the category"""
+        return sum(len(offsets) for offsets in self.positions[category].values())
+
+    def distinct(self, category: str) -> int:
+        """Number of different keywords seen in the category"""
+        return len(self.positions[category])
+
+    def triggered(self, category: str) -> bool:
+        return self.distinct(category) >= self.thresholds[category]
+
+    def to_dict(self) -> dict:
+        return {
+            category: {
+                "count": self.count(category),
+                "distinct": self.distinct(category),
+                "triggered": self.triggered(category),
+                "positions": keywords,
+            }
+            for category, keywords in self.positions.items()
+        }
+
+def _trie_pattern(keywords) -> str:
+    """
+    Prefix-factored regex for a keyword set (the regex form of an Aho-Corasick trie):
+    at any text position the engine follows one branch per character instead of
+    retrying every keyword. Spaces become \\s+ so OCR line breaks still match. A match
+    must end at a word boundary; the start is checked by the caller, since a
+    lookbehind tried at every text position costs more than the rare rejected match.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        if "" in node and len(node) == 1:
+            return ""
+        branches = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        optional = "" in node  # a keyword ends here; longer ones are tried first (greedy)
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if optional else group
+
+    return f"(?:{build(trie)})(?!{_WORD_CHAR.pattern})"
+
+class KeywordMatcher:
+    """
+    All keywords of all categories compiled into one trie-shaped regex, so a
+    document is scanned once (in C) instead of lower()-ed and searched once
+    per keyword.
+    """
+
+    def __init__(self, categories: dict):
+        self.thresholds = {name: spec.get("threshold", 1) for name, spec in categories.items()}
+        self.keywords = {}  # normalised keyword -> category
+        for category, spec in categories.items():
+            for keyword in spec["keywords"]:
+                self.keywords.setdefault(" ".join(normalise(keyword).split()), category)
+        self._pattern = re.compile(_trie_pattern(self.keywords))
+
+    def scan(self, text: str) -> ScreeningResult:
+        result = ScreeningResult(self.thresholds)
+        text = normalise(text)
+        match = self._pattern.search(text)
+        while match:
+            start = match.start()
+            if start and _WORD_CHAR.match(text, start - 1):
+                match = self._pattern.search(text, start + 1)  # starts inside a word, e.g. "contact now"
+                continue
+            keyword = match.group()
+            if not keyword.isalnum():
+                keyword = " ".join(keyword.split())  # whitespace run matched between words
+            result.add(self.keywords[keyword], keyword, start)
+            match = self._pattern.search(text, match.end())
+        return result
+
+def load_matcher(path: str = KEYWORDS_PATH) -> KeywordMatcher:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return KeywordMatcher({name: spec for name, spec in data.items() if not name.startswith("_")})
+
+screening_matcher = load_matcher()
+
+def screen_text(text: str) -> ScreeningResult:
+    return screening_matcher.scan(text)
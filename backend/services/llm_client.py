@@ -0,0 +1,58 @@
+import os
+
+# Shared async Groq client: one keep-alive connection pool for OCR and analysis.
+# groq and httpx take ~0.2s to import, so both are imported when the client is first built.
+# GROQ_BASE_URL points the client at a local stand-in server for tests and benchmarks.
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "32"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # default per-call timeout, overridable per call
+
+_client = None
+
+def get_client():
+    """Build the shared client on first use"""
+    global _client
+    if _client is None:
+        import httpx
+        from groq import AsyncGroq
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        )
+        _client = AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            base_url=GROQ_BASE_URL,
+            http_client=http_client,
+            timeout=LLM_TIMEOUT,
+            max_retries=0,  # retries/backoff are owned by services/llm_scheduler.py
+        )
+    return _client
+
+async def chat_completion(timeout: float = None, **request_kwargs):
+    """Non-streaming chat completion on the shared pool"""
+    return await get_client().chat.completions.create(timeout=timeout or LLM_TIMEOUT, **request_kwargs)
+
+async def stream_chat_completion(timeout: float = None, on_usage=None, **request_kwargs):
+    """Yield content deltas of a streamed chat completion; on_usage(usage) gets the final chunk's token usage"""
+    stream = await get_client().chat.completions.create(stream=True, timeout=timeout or LLM_TIMEOUT, **request_kwargs)
+    async for chunk in stream:
+        # Groq reports usage in x_groq on the last chunk (OpenAI style .usage with stream_options)
+        usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+        if usage and on_usage:
+            on_usage(usage)
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
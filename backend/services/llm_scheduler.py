@@ -0,0 +1,281 @@
+import asyncio
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+
+from services import llm_client
+from services.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# Provider limits per model (Groq enforces them per model). 0 disables a bucket.
+LLM_RPM = int(os.getenv("LLM_RPM", "30"))
+LLM_TPM = int(os.getenv("LLM_TPM", "20000"))
+# Optional per-model overrides: '{"llama-3.3-70b-versatile": [30, 12000]}'
+LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+# Rough token cost of one image in a vision prompt
+IMAGE_TOKEN_ESTIMATE = 1500
+
+class TokenBucket:
+    """
+    Continuous-refill token bucket. capacity tokens per 60 seconds, bursting up to capacity.
+    pause() blocks every caller until a provider-imposed Retry-After has passed.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        if self.capacity <= 0:
+            return
+        amount = min(amount, self.capacity)
+        # The lock keeps waiters FIFO so a large request can't be starved by small ones
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def refund(self, amount: float):
+        if self.capacity > 0 and amount > 0:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+class _SharedCall:
+    """One upstream call and the number of callers still waiting for it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class _SharedStream:
+    """
+    One upstream streamed call, the deltas it has produced so far and the
+    number of callers reading them. A caller that joins late gets the deltas
+    already received first.
+    """
+
+    def __init__(self):
+        self.task = None
+        self.deltas = []
+        self.error = None
+        self.finished = False
+        self.readers = 0
+        self.updated = asyncio.Event()
+
+    def notify(self):
+        self.updated.set()
+        self.updated = asyncio.Event()
+
+_buckets = {}
+_inflight = {}  # request key -> _SharedCall
+_inflight_streams = {}  # request key -> _SharedStream
+
+def _buckets_for(model: str):
+    if model not in _buckets:
+        rpm, tpm = LLM_RATE_LIMITS.get(model, (LLM_RPM, LLM_TPM))
+        _buckets[model] = (TokenBucket(rpm), TokenBucket(tpm))
+    return _buckets[model]
+
+def estimate_tokens(request_kwargs: dict) -> int:
+    """Prompt (~4 chars per token, images at a flat rate) plus the completion budget"""
+    chars = 0
+    images = 0
+    for message in request_kwargs.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                chars += len(part.get("text", ""))
+            elif part.get("type") == "image_url":
+                images += 1
+    return chars // 4 + images * IMAGE_TOKEN_ESTIMATE + request_kwargs.get("max_tokens", 1024)
+
+def request_key(request_kwargs: dict) -> str:
+    return hashlib.sha256(json.dumps(request_kwargs, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _retry_after(error) -> float:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None  # malformed header: the caller falls back to its own backoff
+    return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+def _is_retryable(error) -> bool:
+    import groq  # already loaded by the client that raised
+    if isinstance(error, groq.APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: spreads retries of requests that failed together
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+async def _with_retries(model: str, estimate: int, call, stage_name: str = "llm_call"):
+    request_bucket, token_bucket = _buckets_for(model)
+    attempt = 0
+    while True:
+        await request_bucket.acquire(1)
+        await token_bucket.acquire(estimate)
+        try:
+            with stage(stage_name):
+                return await call()
+        except Exception as error:
+            if not _is_retryable(error) or attempt >= LLM_MAX_RETRIES:
+                raise
+            retry_after = _retry_after(error)
+            delay = max(retry_after or 0.0, _backoff(attempt))
+            if retry_after and getattr(error, "status_code", None) == 429:
+                # The provider told us everyone must wait, not just this request
+                request_bucket.pause(retry_after)
+                token_bucket.pause(retry_after)
+            logger.warning("%s %s (%s), retry %d/%d in %.1fs", model, type(error).__name__, getattr(error, 'status_code', '-'), attempt + 1, LLM_MAX_RETRIES, delay)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+async def chat_completion(timeout: float = None, **request_kwargs):
+    """
+    Rate-limited, retried chat completion. Identical concurrent requests
+    (same page image, same text + language) share one upstream call, which
+    is cancelled once no caller is waiting for it any more.
+    """
+    key = request_key(request_kwargs)
+    shared = _inflight.get(key)
+    if shared is None:
+        model = request_kwargs.get("model", "")
+        estimate = estimate_tokens(request_kwargs)
+
+        async def run():
+            completion = await _with_retries(model, estimate, lambda: llm_client.chat_completion(timeout=timeout, **request_kwargs))
+            usage = getattr(completion, "usage", None)
+            if usage and usage.total_tokens:
+                # Give back what we reserved but didn't use
+                _buckets_for(model)[1].refund(estimate - usage.total_tokens)
+            return completion
+
+        shared = _SharedCall(asyncio.create_task(run()))
+        _inflight[key] = shared
+        shared.task.add_done_callback(lambda _: _inflight.pop(key, None) if _inflight.get(key) is shared else None)
+    else:
+        logger.debug("Coalesced duplicate in-flight request %s", key[:12])
+    shared.waiters += 1
+    try:
+        # Shielded so one cancelled caller doesn't cancel the call for the others
+        return await asyncio.shield(shared.task)
+    finally:
+        shared.waiters -= 1
+        if shared.waiters == 0 and not shared.task.done():
+            # Every caller is gone (client disconnect, timeout): stop paying for the call
+            if _inflight.get(key) is shared:
+                del _inflight[key]
+            shared.task.cancel()
+
+async def _produce_stream(shared: _SharedStream, timeout: float, request_kwargs: dict):
+    model = request_kwargs.get("model", "")
+    estimate = estimate_tokens(request_kwargs)
+    usage = []
+
+    async def start():
+        iterator = llm_client.stream_chat_completion(timeout=timeout, on_usage=usage.append, **request_kwargs).__aiter__()
+        # Pull the first delta inside the retry loop so connection/429 errors are retried
+        try:
+            return iterator, await iterator.__anext__()
+        except StopAsyncIteration:
+            return iterator, None
+
+    try:
+        stream, first = await _with_retries(model, estimate, start, stage_name="llm_first_token")
+        if first is not None:
+            shared.deltas.append(first)
+            shared.notify()
+            async for delta in stream:
+                shared.deltas.append(delta)
+                shared.notify()
+        if usage and usage[-1].total_tokens:
+            # Give back what we reserved but didn't use (the reservation includes all of max_tokens)
+            _buckets_for(model)[1].refund(estimate - usage[-1].total_tokens)
+    except Exception as error:
+        shared.error = error
+    finally:
+        shared.finished = True
+        shared.notify()
+
+async def stream_chat_completion(timeout: float = None, **request_kwargs):
+    """
+    Rate-limited streamed completion. Retries only happen before the first
+    token arrives. Identical concurrent requests share one upstream stream
+    (every caller gets all of its deltas), which is cancelled once no caller
+    is reading it any more.
+    """
+    key = request_key(request_kwargs)
+    shared = _inflight_streams.get(key)
+    if shared is None:
+        shared = _SharedStream()
+        shared.task = asyncio.create_task(_produce_stream(shared, timeout, request_kwargs))
+        _inflight_streams[key] = shared
+        shared.task.add_done_callback(lambda _: _inflight_streams.pop(key, None) if _inflight_streams.get(key) is shared else None)
+    else:
+        logger.debug("Coalesced duplicate in-flight stream %s", key[:12])
+    shared.readers += 1
+    try:
+        index = 0
+        while True:
+            if index < len(shared.deltas):
+                index += 1
+                yield shared.deltas[index - 1]
+                continue
+            if shared.error is not None:
+                raise shared.error
+            if shared.finished:
+                return
+            await shared.updated.wait()
+    finally:
+        shared.readers -= 1
+        if shared.readers == 0 and not shared.task.done():
+            # Every caller is gone (client disconnect, timeout): stop paying for the call
+            if _inflight_streams.get(key) is shared:
+                del _inflight_streams[key]
+            shared.task.cancel()
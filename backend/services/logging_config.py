@@ -0,0 +1,127 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+from services.metrics import current_request_id
+
+# LOG_LEVEL sets the default; LOG_LEVELS overrides per module: "services.ocr_service=DEBUG,services.llm_scheduler=WARNING"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Fraction of DEBUG records kept (1 = all); INFO and above are never sampled
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1"))
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+APP_ENV = os.getenv("APP_ENV", "development")
+
+# Payload dumps (base64 sizes, prompt sizes) go to this logger; it is forced off in production
+PAYLOAD_LOGGER = "civic.payload"
+
+# Attributes every LogRecord has; anything else came in through extra={...}
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request id, message, extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """
+    Runs in the calling thread (before the queue), so the request id is read
+    from the caller's context; also drops sampled-out DEBUG records early.
+    """
+
+    def __init__(self, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record):
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1 and random.random() >= self.debug_sample_rate:
+            return False
+        record.request_id = current_request_id()
+        return True
+
+class _DropWhenFullQueueHandler(logging.handlers.QueueHandler):
+    """Never block the event loop on a full queue: count and drop instead"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # The default formats the message here, in the request path; leave that to the writer thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DropWhenFullQueueHandler.dropped += 1
+
+def parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+_listener = None
+
+def setup_logging(level: str = LOG_LEVEL, levels: str = LOG_LEVELS, fmt: str = LOG_FORMAT,
+                  debug_sample_rate: float = LOG_DEBUG_SAMPLE_RATE, stream=None, app_env: str = APP_ENV):
+    """
+    Route all logging through a bounded queue drained by a background
+    thread, so request handlers only pay for building a record.
+    Safe to call again (reconfigures; used by the logging benchmark).
+    """
+    global _listener
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    _listener = logging.handlers.QueueListener(queue.Queue(LOG_QUEUE_SIZE), output, respect_handler_level=False)
+
+    handler = _DropWhenFullQueueHandler(_listener.queue)
+    handler.addFilter(RequestContextFilter(debug_sample_rate))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    for name, module_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+    if app_env == "production":
+        logging.getLogger(PAYLOAD_LOGGER).setLevel(logging.WARNING)
+    # Third-party chatter (every httpx request at INFO) stays out unless asked for
+    for noisy in ("httpx", "httpcore"):
+        if noisy not in levels:
+            logging.getLogger(noisy).setLevel(logging.WARNING)
+
+    _listener.start()
+    return _listener
+
+def shutdown_logging():
+    """Flush whatever is still queued and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
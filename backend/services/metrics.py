@@ -0,0 +1,117 @@
+import contextvars
+import time
+import uuid
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Pipeline stages span 5ms (JSON parse) to a minute (multi-page OCR, slow LLM calls)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram(
+    "civic_stage_seconds", "Latency of one pipeline stage",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "civic_http_request_seconds", "API request latency until the response starts",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter("civic_cache_lookups_total", "Cache lookups by cache and outcome", ["cache", "result"])
+IDENTITY_BLOCKED = Counter("civic_identity_documents_blocked_total", "Documents blocked as identity documents")
+SCAMS_DETECTED = Counter("civic_scams_detected_total", "Documents flagged as scams")
+ERRORS = Counter("civic_errors_total", "Failures by stage", ["stage"])
+PAGE_CACHE_ENTRIES = Gauge("civic_page_cache_entries", "Pages held in the cross-document OCR page cache")
+STAGE_ACTIVE = Gauge("civic_stage_active", "Documents inside a pipeline stage", ["stage"])
+STAGE_WAITING = Gauge("civic_stage_waiting", "Documents queued for a pipeline stage", ["stage"])
+ADMISSION_REJECTED = Counter("civic_admission_rejected_total", "Requests turned away with 503 by a full stage queue or the memory budget", ["stage"])
+MEMORY_RESERVED_BYTES = Gauge("civic_admission_memory_reserved_bytes", "Estimated memory of documents currently being OCR'd")
+ANALYSIS_REPAIRS = Counter("civic_analysis_repairs_total", "Model outputs that were not a valid, complete result, by how they were fixed", ["outcome"])
+
+# Request-scoped tracing: the id and the list of (stage, seconds) spans for the current request
+request_id_var = contextvars.ContextVar("request_id", default="-")
+trace_var = contextvars.ContextVar("trace", default=None)
+
+def new_request_id() -> str:
+    return str(uuid.uuid4())[:8]
+
+def current_request_id() -> str:
+    return request_id_var.get()
+
+def start_trace(request_id: str = None) -> str:
+    """Bind a request id (and an empty span list) to the current context; returns the id"""
+    request_id = request_id or new_request_id()
+    request_id_var.set(request_id)
+    trace_var.set([])
+    return request_id
+
+@contextmanager
+def stage(name: str):
+    """Time a block into civic_stage_seconds and the current request's trace; exceptions count as errors"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.labels(name).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        spans = trace_var.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+def cache_lookup(cache: str, result: str):
+    CACHE_LOOKUPS.labels(cache, result).inc()
+
+def server_timing(spans) -> str:
+    """Server-Timing header value, summing repeated stages (one entry per OCR page otherwise)"""
+    totals, counts = {}, {}
+    for name, elapsed in spans:
+        totals[name] = totals.get(name, 0.0) + elapsed
+        counts[name] = counts.get(name, 0) + 1
+    return ", ".join(
+        f'{name};dur={totals[name] * 1000:.1f}' + (f';desc="x{counts[name]}"' if counts[name] > 1 else "")
+        for name in totals
+    )
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+class RequestTraceMiddleware:
+    """
+    Pure ASGI middleware: gives every /api request a request id (honouring
+    an incoming X-Request-ID), records its latency by route template and
+    status, and returns X-Request-ID and Server-Timing headers.
+    """
+
+    def __init__(self, app, paths=("/api/",)):
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64]
+        request_id = start_trace(incoming or None)
+        spans = trace_var.get()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                if spans:
+                    headers.append((b"server-timing", server_timing(spans).encode("latin-1")))
+                message = {**message, "headers": headers}
+                # Streaming endpoints are measured to their first byte, like every other request
+                route = scope.get("route")
+                HTTP_REQUEST_SECONDS.labels(
+                    scope["method"], getattr(route, "path", "unmatched"), str(status)
+                ).observe(time.perf_counter() - start)
+            await send(message)
+
+        await self.app(scope, receive, send_with_trace)
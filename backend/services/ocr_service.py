@@ -1,15 +1,46 @@
-import fitz  # PyMuPDF
-from PIL import Image
-import io
-import numpy as np
-import gc
 import asyncio
+import logging
 import os
 import base64
-from groq import Groq
+from services import render_pool
+from services.llm_scheduler import chat_completion
+from services.metrics import ERRORS, stage
+from services.page_cache import page_cache
+from services.logging_config import PAYLOAD_LOGGER
 
-# Initialize Groq Client for Vision Analysis
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+logger = logging.getLogger(__name__)
+payload_logger = logging.getLogger(PAYLOAD_LOGGER)
+
+# Scanned pages are OCR'd concurrently; a slow page is given up on after OCR_PAGE_TIMEOUT seconds
+OCR_PAGE_CONCURRENCY = int(os.getenv("OCR_PAGE_CONCURRENCY", "5"))
+OCR_PAGE_TIMEOUT = float(os.getenv("OCR_PAGE_TIMEOUT", "45"))
+# Pages beyond this are ignored (long documents are chunked downstream, so this is a cost cap)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "10"))
+
+# Scanned-page pre-pass (render_pool.survey_pdf_page): blank pages and repeats of an
+# earlier page are not sent to vision, and each page gets its own DPI / JPEG quality.
+# PDF_PAGE_PREPASS=0 renders every page at PDF_RENDER_DPI / PDF_JPEG_QUALITY (old behaviour;
+# the page cache needs the survey fingerprint, so PDF pages then skip it too).
+PDF_PAGE_PREPASS = os.getenv("PDF_PAGE_PREPASS", "1") != "0"
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "150"))
+PDF_JPEG_QUALITY = int(os.getenv("PDF_JPEG_QUALITY", "85"))
+# Share of ink pixels below which a page is blank
+PDF_BLANK_INK = float(os.getenv("PDF_BLANK_INK", "0.002"))
+# Duplicate pages: hash distance in bits, then the share of ink pixels allowed to differ
+PDF_DUPLICATE_DISTANCE = int(os.getenv("PDF_DUPLICATE_DISTANCE", "6"))
+PDF_DUPLICATE_MAX_DIFF = float(os.getenv("PDF_DUPLICATE_MAX_DIFF", "0.05"))
+# Pixels a line of text should be tall in the image sent to vision; DPI is derived from it
+PDF_TEXT_PIXELS = int(os.getenv("PDF_TEXT_PIXELS", "18"))
+PDF_MIN_DPI = int(os.getenv("PDF_MIN_DPI", "96"))
+# Never above the fixed setting: adaptive rendering only ever sends less
+PDF_MAX_DPI = int(os.getenv("PDF_MAX_DPI", str(PDF_RENDER_DPI)))
+PDF_MAX_RENDER_SIDE = int(os.getenv("PDF_MAX_RENDER_SIDE", "2000"))
+# Pages with less ink than this (headings, signatures, short letters) are encoded at lower quality
+PDF_SPARSE_INK = float(os.getenv("PDF_SPARSE_INK", "0.03"))
+
+# Admission estimate (stage_scheduler.memory_budget): the file is held by this process and a
+# render worker, and each page in flight is a decoded RGB raster plus its JPEG and copies
+ADMISSION_PAGE_BYTES = int(os.getenv("ADMISSION_PAGE_MB", "12")) * 1024 * 1024
 
 def encode_image(image_bytes):
     return base64.b64encode(image_bytes).decode('utf-8')
@@ -21,65 +52,76 @@ async def perform_groq_ocr(image_bytes):
     """
     try:
         base64_image = encode_image(image_bytes)
-        print(f"DEBUG: Base64 length: {len(base64_image)}", flush=True)
-        print(f"DEBUG: Data URI start: data:image/jpeg;base64,{base64_image[:20]}...", flush=True)
+        payload_logger.debug("Vision OCR image: %d base64 chars", len(base64_image))
         
-        loop = asyncio.get_event_loop()
-        completion = await loop.run_in_executor(
-            None,
-            lambda: groq_client.chat.completions.create(
-                model="llama-3.2-90b-vision-preview",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": "Extract ALL text from this image exactly as written. Return ONLY the extracted text, no explanation."},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
+        completion = await chat_completion(
+            model="llama-3.2-90b-vision-preview",
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "Extract ALL text from this image exactly as written. Return ONLY the extracted text, no explanation."},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{base64_image}"
                             }
-                        ]
-                    }
-                ],
-                temperature=0.0,
-                max_tokens=2000,
-            )
+                        }
+                    ]
+                }
+            ],
+            temperature=0.0,
+            max_tokens=2000,
+            timeout=OCR_PAGE_TIMEOUT,
         )
         return completion.choices[0].message.content.strip()
     except Exception as e:
-        print(f"DEBUG: Groq OCR Failed: {str(e)}", flush=True)
+        logger.warning("Groq OCR failed: %s", e)
+        ERRORS.labels("ocr_page").inc()
         return ""
 
-async def extract_text_from_image(image_bytes):
+def render_settings(page: dict):
+    """
+    (dpi, quality, grayscale) for one surveyed page: DPI so that its text
+    lines come out about PDF_TEXT_PIXELS tall, capped so the long side stays
+    under PDF_MAX_RENDER_SIDE; lower JPEG quality for sparse pages; grayscale
+    unless the page has colour.
+    """
+    if page is None:
+        return PDF_RENDER_DPI, PDF_JPEG_QUALITY, False
+    dpi = PDF_RENDER_DPI if page["text_pt"] is None else PDF_TEXT_PIXELS * 72 / page["text_pt"]
+    dpi = max(PDF_MIN_DPI, min(PDF_MAX_DPI, dpi))
+    dpi = min(dpi, PDF_MAX_RENDER_SIDE * 72 / max(page["width"], page["height"], 1))
+    quality = PDF_JPEG_QUALITY - 15 if page["ink"] < PDF_SPARSE_INK else PDF_JPEG_QUALITY - 5
+    return int(dpi), quality, not page["colour"]
+
+async def extract_text_from_image(image_source, on_page=None):
     """
     Extract text using Groq Vision
+    image_source: raw bytes or a path to the uploaded image
+    on_page: optional async callback(page, total, status) for progress reporting
+    A near-identical image OCR'd before (any document) is served from the page cache.
     """
     try:
-        # Resize and Ensure JPEG format
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to RGB (in case of PNG with transparency)
-        if image.mode in ("RGBA", "P"):
-            image = image.convert("RGB")
-            
-        max_size = 1024 # Reduced from 1500 to be safe
-        if max(image.size) > max_size:
-            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-            
-        # Always save as JPEG to match the API data URI
-        buf = io.BytesIO()
-        image.save(buf, format="JPEG", quality=75) # Reduced quality for size safety
-        image_bytes = buf.getvalue()
+        # Resize and re-encode as JPEG in the render pool (CPU-bound, keep it off the event loop)
+        with stage("image_prepare"):
+            image_bytes, fingerprint = await render_pool.run(render_pool.prepare_image, image_source, 1024, 75)
 
-        print("DEBUG: Sending image to Groq Vision...", flush=True)
-        text = await perform_groq_ocr(image_bytes)
-        
-        if not text:
-             return {"success": False, "error": "No text extracted by Vision API"}
+        text = await page_cache.get(fingerprint)
+        if text:
+            logger.info("Page cache hit")
+        else:
+            logger.debug("Sending image to Groq Vision")
+            with stage("ocr_page"):
+                text = await perform_groq_ocr(image_bytes)
+
+            if not text:
+                 return {"success": False, "error": "No text extracted by Vision API"}
 
-        print(f"DEBUG: Groq Vision success. Output length: {len(text)}", flush=True)
+            logger.debug("Groq Vision success. Output length: %d", len(text))
+            await page_cache.set(fingerprint, text)
+        if on_page:
+            await on_page(1, 1, "ocr")
         
         return {
             "success": True,
@@ -92,76 +134,205 @@ async def extract_text_from_image(image_bytes):
             "error": str(e)
         }
 
-async def extract_text_from_pdf(pdf_bytes):
+async def extract_text_from_pdf(pdf_source, on_page=None):
     """
     PDF Strategy:
     1. Try direct text extraction (fastest)
-    2. Fallback to Groq Vision for scanned pages
+    2. Fallback to Groq Vision for scanned pages, OCR'd concurrently
+       (bounded by OCR_PAGE_CONCURRENCY) and reassembled in page order.
+       A local pre-pass drops blank pages and repeats of an earlier page,
+       and picks DPI / JPEG quality per page; pages seen in an earlier
+       document come from the page cache.
+    A page that fails or times out is reported in 'failed_pages' instead
+    of failing the whole document.
+    Parsing and rasterisation run in the render process pool.
+    pdf_source: raw bytes or a path (preferred, pages are read lazily from disk)
+    on_page: optional async callback(page, total, status) fired as each page completes
     """
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        all_text = []
-        max_pages = min(len(doc), 10)
+        with stage("pdf_text"):
+            max_pages, direct_texts = await render_pool.run(render_pool.pdf_text_layer, pdf_source, PDF_MAX_PAGES)
+        page_texts = [None] * max_pages
+        scanned_pages = []
         
-        for page_num in range(max_pages):
-            page = doc.load_page(page_num)
-            
+        for page_num, text in enumerate(direct_texts):
             # STRATEGY 1: Direct Text (Digital PDFs)
-            text = page.get_text().strip()
             if len(text) > 50:
-                print(f"DEBUG: [Page {page_num+1}] Direct text found ({len(text)} chars).", flush=True)
-                all_text.append(f"--- Page {page_num + 1} ---\n{text}")
-                continue
-                
-            # STRATEGY 2: Groq Vision (Scanned PDFs)
-            print(f"DEBUG: [Page {page_num+1}] Scanned page detected. Using Groq Vision...", flush=True)
-            
-            # Get page as image
-            pix = page.get_pixmap(dpi=150)
-            # Convert to PIL Image to standardized as JPEG
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            buf = io.BytesIO()
-            img.save(buf, format="JPEG", quality=85)
-            img_data = buf.getvalue()
-            
-            # Call Vision API
-            ocr_text = await perform_groq_ocr(img_data)
-            all_text.append(f"--- Page {page_num + 1} (OCR) ---\n{ocr_text}")
+                logger.debug("[Page %d] Direct text found (%d chars)", page_num + 1, len(text))
+                page_texts[page_num] = f"--- Page {page_num + 1} ---\n{text}"
+                if on_page:
+                    await on_page(page_num + 1, max_pages, "text")
+            else:
+                scanned_pages.append(page_num)
+        
+        # STRATEGY 2: Groq Vision (Scanned PDFs), all pages in flight at once
+        failed_pages = []
+        blank_pages = []
+        duplicate_pages = {}
+        if scanned_pages:
+            logger.info("%d scanned page(s) detected. Using Groq Vision (concurrency %d)", len(scanned_pages), OCR_PAGE_CONCURRENCY)
+            semaphore = asyncio.Semaphore(OCR_PAGE_CONCURRENCY)
+
+            async def survey_page(page_num):
+                with stage("pdf_survey"):
+                    return await render_pool.run(render_pool.survey_pdf_page, pdf_source, page_num)
+
+            async def ocr_page(page_num, survey):
+                # Surveyed pages carry a fingerprint; one seen in any earlier document skips render and vision
+                cached = await page_cache.get(survey)
+                if cached:
+                    logger.debug("[Page %d] Page cache hit", page_num + 1)
+                    if on_page:
+                        await on_page(page_num + 1, max_pages, "cached")
+                    return cached
+                async with semaphore:
+                    dpi, quality, grayscale = render_settings(survey)
+                    with stage("pdf_render"):
+                        img_data = await render_pool.run(render_pool.render_pdf_page, pdf_source, page_num, dpi, quality, grayscale)
+                    logger.debug("[Page %d] Rendered at %d DPI, quality %d%s: %d bytes",
+                                 page_num + 1, dpi, quality, ", grayscale" if grayscale else "", len(img_data))
+                    try:
+                        with stage("ocr_page"):
+                            ocr_text = await asyncio.wait_for(perform_groq_ocr(img_data), timeout=OCR_PAGE_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        logger.warning("[Page %d] Vision OCR timed out after %ss", page_num + 1, OCR_PAGE_TIMEOUT)
+                        ocr_text = ""
+                await page_cache.set(survey, ocr_text)
+                if on_page:
+                    await on_page(page_num + 1, max_pages, "ocr" if ocr_text else "failed")
+                return ocr_text
+
+            # Pages are decided in order (a duplicate refers back to an earlier page) and each goes
+            # to vision as soon as it is decided. Surveys run a window ahead so they don't queue in
+            # the render pool in front of every page render.
+            surveys = []
+            ocr_tasks = {}
+            originals = []
+            try:
+                for index, page_num in enumerate(scanned_pages):
+                    survey = None
+                    if PDF_PAGE_PREPASS:
+                        surveys.extend(asyncio.ensure_future(survey_page(n))
+                                       for n in scanned_pages[len(surveys):index + OCR_PAGE_CONCURRENCY])
+                        try:
+                            survey = await surveys[index]
+                        except Exception as e:
+                            logger.warning("[Page %d] Page survey failed, sending as is: %r", page_num + 1, e)
+                    if survey and survey["ink"] < PDF_BLANK_INK:
+                        blank_pages.append(page_num + 1)
+                        if on_page:
+                            await on_page(page_num + 1, max_pages, "blank")
+                        continue
+                    original = survey and next((other for other in originals if render_pool.same_page(
+                        survey, other, PDF_DUPLICATE_DISTANCE, PDF_DUPLICATE_MAX_DIFF)), None)
+                    if original:
+                        duplicate_pages[page_num + 1] = original["page"] + 1
+                        page_texts[page_num] = f"--- Page {page_num + 1} (same as page {original['page'] + 1}) ---"
+                        if on_page:
+                            await on_page(page_num + 1, max_pages, "duplicate")
+                        continue
+                    if survey:
+                        originals.append(survey)
+                    ocr_tasks[page_num] = asyncio.ensure_future(ocr_page(page_num, survey))
+            except BaseException:
+                for task in [*surveys, *ocr_tasks.values()]:
+                    task.cancel()
+                raise
+            if blank_pages or duplicate_pages:
+                logger.info("Skipped blank page(s) %s and duplicate page(s) %s", blank_pages, duplicate_pages)
+
+            results = await asyncio.gather(*ocr_tasks.values(), return_exceptions=True)
             
-            # Cleanup
-            del pix
-            gc.collect()
+            for page_num, ocr_text in zip(ocr_tasks, results):
+                if isinstance(ocr_text, Exception) or not ocr_text:
+                    logger.warning("[Page %d] Vision OCR failed: %r", page_num + 1, ocr_text)
+                    failed_pages.append(page_num + 1)
+                    continue
+                page_texts[page_num] = f"--- Page {page_num + 1} (OCR) ---\n{ocr_text}"
+
+        # A duplicate of a page that could not be read is unread too
+        for page_num, original in duplicate_pages.items():
+            if original in failed_pages:
+                page_texts[page_num - 1] = None
+                failed_pages.append(page_num)
+        failed_pages.sort()
             
+        all_text = [text for text in page_texts if text]
+        if not all_text and failed_pages:
+            return {
+                "success": False,
+                "error": "No text extracted by Vision API",
+                "failed_pages": failed_pages
+            }
+        if not all_text and blank_pages:
+            return {
+                "success": False,
+                "error": "All pages of the document are blank",
+                "blank_pages": blank_pages
+            }
+
         combined_text = "\n\n".join(all_text)
         
         return {
             "success": True,
             "text": combined_text.strip(),
-            "confidence": 90.0
+            # Scale confidence down by the share of pages we could not read
+            "confidence": round(90.0 * (max_pages - len(failed_pages)) / max(max_pages, 1), 1),
+            "failed_pages": failed_pages,
+            "blank_pages": blank_pages,
+            "duplicate_pages": duplicate_pages,
         }
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
-    finally:
-        if 'doc' in locals():
-            doc.close()
-        gc.collect()
 
-async def extract_text_from_file(file_bytes, file_extension):
+def estimate_ocr_memory(path: str, file_extension: str, size: int) -> int:
+    """
+    Rough peak bytes for OCR'ing one upload, from its size and page count
+    (PDF pages in flight are capped by OCR_PAGE_CONCURRENCY). Reads only the
+    PDF page tree / image header; run it off the event loop.
+    """
+    if file_extension == 'pdf':
+        try:
+            import fitz  # PyMuPDF
+
+            with fitz.open(path) as doc:
+                pages = min(doc.page_count, PDF_MAX_PAGES)
+        except Exception:
+            pages = PDF_MAX_PAGES
+        return 2 * size + min(pages, OCR_PAGE_CONCURRENCY) * ADMISSION_PAGE_BYTES
+    if file_extension in ['jpg', 'jpeg', 'png', 'bmp', 'tiff']:
+        try:
+            from PIL import Image
+
+            with Image.open(path) as img:
+                width, height = img.size
+            # Decoded RGB, its resized copy and the JPEG, in the render worker
+            return 2 * size + 2 * width * height * 3
+        except Exception:
+            return 2 * size + ADMISSION_PAGE_BYTES
+    return 2 * size
+
+async def extract_text_from_file(file_source, file_extension, on_page=None):
     """
     Dispatcher
+    file_source: raw bytes or a path to the spooled upload
+    on_page: optional async progress callback(page, total, status)
     """
     if file_extension == 'pdf':
-        return await extract_text_from_pdf(file_bytes)
+        return await extract_text_from_pdf(file_source, on_page=on_page)
     elif file_extension in ['jpg', 'jpeg', 'png', 'bmp', 'tiff']:
-        return await extract_text_from_image(file_bytes)
+        return await extract_text_from_image(file_source, on_page=on_page)
     else:
         try:
+            if not isinstance(file_source, (bytes, bytearray)):
+                with open(file_source, "rb") as f:
+                    file_source = f.read()
             return {
                 "success": True,
-                "text": file_bytes.decode('utf-8'),
+                "text": file_source.decode('utf-8'),
                 "confidence": 100.0
             }
         except:
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from services.cache_service import CACHE_DIR, CACHE_ENABLED, CACHE_TTL_SECONDS
+from services.metrics import PAGE_CACHE_ENTRIES, cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Cross-document OCR cache for page images (photos and scans of the same forms and posters),
+# keyed by the perceptual fingerprint from render_pool.page_fingerprint
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join(CACHE_DIR, "pages.sqlite3"))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "20000"))
+# Pages whose hashes differ in at most this many bits are candidates...
+PAGE_CACHE_MAX_DISTANCE = int(os.getenv("PAGE_CACHE_MAX_DISTANCE", "6"))
+# ...and a candidate is only a hit if no thumbnail cell differs by more than this many grey
+# levels: re-encoding or resizing moves every cell a little, a filled-in name moves a few a lot
+PAGE_CACHE_MAX_CELL_DIFF = int(os.getenv("PAGE_CACHE_MAX_CELL_DIFF", "64"))
+
+def _bands(value: int, count: int) -> list:
+    """
+    Split a 64-bit hash into count bit ranges. Two hashes within count - 1 bits
+    of each other agree exactly on at least one range (pigeonhole), so an exact
+    lookup per range finds every candidate.
+    """
+    bands, start = [], 0
+    for index in range(count):
+        width = (64 - start) // (count - index)
+        bands.append((index, (value >> start) & ((1 << width) - 1)))
+        start += width
+    return bands
+
+def _max_cell_difference(a: bytes, b: bytes) -> int:
+    if len(a) != len(b):
+        return 255
+    return max(abs(x - y) for x, y in zip(a, b))
+
+class PageOcrCache:
+    """
+    Persistent page image -> OCR text cache with near-duplicate lookup.
+    Rows live in SQLite; hashes, the band index and LRU order are kept in
+    memory and rebuilt on first use. Bounded by entry count (least recently
+    used evicted first) and CACHE_TTL_SECONDS. Callers on the event loop go
+    through get()/set(), which run the SQLite work in a thread.
+    """
+
+    def __init__(self, path: str = PAGE_CACHE_PATH, max_entries: int = PAGE_CACHE_MAX_ENTRIES,
+                 max_distance: int = PAGE_CACHE_MAX_DISTANCE, max_cell_diff: int = PAGE_CACHE_MAX_CELL_DIFF,
+                 ttl: int = CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.max_cell_diff = max_cell_diff
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+        self._hashes = OrderedDict()  # row id -> hash, least recently used first
+        self._band_index = {}  # (band, value) -> {row id}
+
+    def _open(self):
+        if self._conn is not None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                hash BLOB NOT NULL,
+                thumb BLOB NOT NULL,
+                text TEXT NOT NULL,
+                created REAL NOT NULL,
+                used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("DELETE FROM pages WHERE created < ?", (time.time() - self.ttl,))
+        for row_id, page_hash in self._conn.execute("SELECT id, hash FROM pages ORDER BY used"):
+            self._index(row_id, int.from_bytes(page_hash, "big"))
+        self._evict()
+        PAGE_CACHE_ENTRIES.set(len(self._hashes))
+
+    def _index(self, row_id: int, page_hash: int):
+        self._hashes[row_id] = page_hash
+        for band in _bands(page_hash, self.max_distance + 1):
+            self._band_index.setdefault(band, set()).add(row_id)
+
+    def _unindex(self, row_id: int):
+        page_hash = self._hashes.pop(row_id)
+        for band in _bands(page_hash, self.max_distance + 1):
+            ids = self._band_index[band]
+            ids.discard(row_id)
+            if not ids:
+                del self._band_index[band]
+
+    def _evict(self):
+        stale = []
+        while len(self._hashes) > self.max_entries:
+            row_id = next(iter(self._hashes))
+            self._unindex(row_id)
+            stale.append((row_id,))
+        if stale:
+            self._conn.executemany("DELETE FROM pages WHERE id = ?", stale)
+
+    def _candidates(self, page_hash: int) -> list:
+        """Row ids within max_distance bits, nearest first"""
+        ids = set()
+        for band in _bands(page_hash, self.max_distance + 1):
+            ids |= self._band_index.get(band, set())
+        scored = []
+        for row_id in ids:
+            distance = bin(self._hashes[row_id] ^ page_hash).count("1")
+            if distance <= self.max_distance:
+                scored.append((distance, row_id))
+        return [row_id for _, row_id in sorted(scored)]
+
+    def load(self):
+        """Open the store and build the in-memory index now instead of on the first lookup"""
+        with self._lock:
+            self._open()
+
+    def lookup(self, fingerprint: dict):
+        with self._lock:
+            self._open()
+            now = time.time()
+            for row_id in self._candidates(fingerprint["hash"]):
+                thumb, text, created = self._conn.execute("SELECT thumb, text, created FROM pages WHERE id = ?", (row_id,)).fetchone()
+                if now - created > self.ttl:
+                    self._unindex(row_id)
+                    self._conn.execute("DELETE FROM pages WHERE id = ?", (row_id,))
+                    continue
+                if _max_cell_difference(thumb, fingerprint["thumb"]) > self.max_cell_diff:
+                    continue
+                self._hashes.move_to_end(row_id)
+                self._conn.execute("UPDATE pages SET used = ? WHERE id = ?", (now, row_id))
+                return text
+            return None
+
+    def store(self, fingerprint: dict, text: str):
+        with self._lock:
+            self._open()
+            now = time.time()
+            row_id = self._conn.execute(
+                "INSERT INTO pages (hash, thumb, text, created, used) VALUES (?, ?, ?, ?, ?)",
+                (fingerprint["hash"].to_bytes(8, "big"), fingerprint["thumb"], text, now, now),
+            ).lastrowid
+            self._index(row_id, fingerprint["hash"])
+            self._evict()
+            PAGE_CACHE_ENTRIES.set(len(self._hashes))
+
+    async def get(self, fingerprint: dict):
+        """OCR text of a stored near-identical page, or None"""
+        if not CACHE_ENABLED or fingerprint is None:
+            return None
+        text = await asyncio.to_thread(self.lookup, fingerprint)
+        if text is None:
+            self.misses += 1
+            cache_lookup("page_ocr", "miss")
+        else:
+            self.hits += 1
+            cache_lookup("page_ocr", "hit")
+        return text
+
+    async def set(self, fingerprint: dict, text: str):
+        if not CACHE_ENABLED or fingerprint is None or not text:
+            return
+        await asyncio.to_thread(self.store, fingerprint, text)
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._hashes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._hashes.clear()
+                self._band_index.clear()
+
+page_cache = PageOcrCache()
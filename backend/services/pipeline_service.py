@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import os
+from contextlib import AsyncExitStack
+
+from services.ocr_service import extract_text_from_file, estimate_ocr_memory, PDF_MAX_PAGES
+from services.analysis_service import extract_document, translate_analysis, EXTRACTION_LANGUAGE
+from services.cache_service import result_cache, ocr_cache, extraction_cache, translation_cache, make_key, hash_bytes
+from services.metrics import cache_lookup
+from services.similarity_index import find_near_duplicate, remember
+from services.stage_scheduler import stage_scheduler, memory_budget
+
+logger = logging.getLogger(__name__)
+
+# Bump when the OCR pipeline or the analysis prompt changes so stale entries are ignored
+OCR_CACHE_VERSION = "1"
+ANALYSIS_CACHE_VERSION = "3"
+TRANSLATION_CACHE_VERSION = "1"
+
+# Target languages one request may ask for; each is a separate translation call
+ANALYSIS_MAX_LANGUAGES = int(os.getenv("ANALYSIS_MAX_LANGUAGES", "5"))
+
+# TEMPORARY BYPASS: Skip OCR and use mock text for testing
+USE_MOCK_OCR = False  # Set to False to use real OCR
+
+class PipelineError(Exception):
+    """A failure that maps to a client-facing HTTP error (bad upload, unreadable document, bad URL)"""
+
+    def __init__(self, status_code: int, error: str, details: str):
+        super().__init__(details)
+        self.status_code = status_code
+        self.error = error
+        self.details = details
+
+    def to_dict(self):
+        return {"error": self.error, "details": self.details}
+
+def requested_languages(context: dict) -> list:
+    """
+    Target languages in order: context["language"] (a single code or a comma
+    separated list) first, the primary one, then any extra context["languages"]
+    """
+    languages = str(context.get("language") or "en").split(",") + list(context.get("languages") or [])
+    unique = []
+    for language in languages:
+        language = str(language).strip()
+        if language and language not in unique:
+            unique.append(language)
+    return unique[:ANALYSIS_MAX_LANGUAGES] or ["en"]
+
+def make_result_key(file_hash: str, context: dict) -> str:
+    """Only the context fields that change the model output are part of the key"""
+    return make_key(
+        "result", ANALYSIS_CACHE_VERSION, file_hash,
+        ",".join(requested_languages(context)), context.get("occupation", ""), context.get("location", "")
+    )
+
+def make_similarity_partition(context: dict) -> str:
+    """Near-duplicate matches stay within the same output-affecting context as the result cache"""
+    return make_key(
+        "near", ANALYSIS_CACHE_VERSION,
+        ",".join(requested_languages(context)), context.get("occupation", ""), context.get("location", "")
+    )
+
+def make_extraction_key(text: str, context: dict) -> str:
+    """The English extraction depends on the text and the audience, not on the target language"""
+    return make_key(
+        "extraction", ANALYSIS_CACHE_VERSION, hash_bytes(text.encode("utf-8")),
+        context.get("occupation", ""), context.get("location", "")
+    )
+
+def _cacheable(result: dict) -> bool:
+    """
+    Never cache failures, incomplete results (chunks of a long document that
+    failed) or fallbacks (an English result for a failed translation); they
+    should be retried on the next upload
+    """
+    if result.get("type") == "error" or result.get("partial"):
+        return False
+    results = [result, *(result.get("translations") or {}).values()]
+    return not any("translation_failed" in r for r in results)
+
+async def _no_emit(event, data):
+    pass
+
+async def reserve_stage(upload, stage: str) -> AsyncExitStack:
+    """
+    Enter a limited stage for an upload: the "fetch" slot, or the "ocr" slot
+    plus the upload's estimated OCR memory. Raises Overloaded when the stage
+    queue or the memory budget is full; closing the stack releases both.
+    """
+    stack = AsyncExitStack()
+    try:
+        if stage == "ocr":
+            memory = await asyncio.to_thread(estimate_ocr_memory, upload.path, upload.extension, upload.size)
+            await stack.enter_async_context(stage_scheduler.slot("ocr"))
+            await stack.enter_async_context(memory_budget.reserve(memory, "ocr"))
+        else:
+            await stack.enter_async_context(stage_scheduler.slot(stage))
+    except BaseException:
+        await stack.aclose()
+        raise
+    return stack
+
+async def admit(upload):
+    """
+    Admission for a streamed request, done before its response starts so a
+    full server answers 503 + Retry-After instead of an error event inside a
+    200: reserves the first limited stage the upload needs. The reservation is
+    passed to run_pipeline, which uses it for that stage and releases it.
+    """
+    if USE_MOCK_OCR:
+        return None
+    return await reserve_stage(upload, "fetch" if _upload_url(upload) else "ocr")
+
+def _upload_url(upload):
+    """The URL a text upload carries (the frontend sends URLs as input.txt), or None"""
+    if upload.extension != 'txt':
+        return None
+    content = upload.read_bytes().decode('utf-8').strip()
+    return content if _is_url(content) else None
+
+def _is_url(text: str) -> bool:
+    return text.startswith(('http://', 'https://')) and len(text.split()) == 1
+
+async def lookup_result(upload, context: dict, request_id: str):
+    """
+    Content-addressed cache: same bytes + same output-affecting context => same
+    result. The cached result for an upload, or None (URL inputs are never cached).
+    """
+    if USE_MOCK_OCR or _upload_url(upload):
+        return None
+    file_hash = upload.sha256
+    cached_result = await result_cache.get(make_result_key(file_hash, context))
+    cache_lookup("result", "hit" if cached_result is not None else "miss")
+    if cached_result is not None:
+        logger.info("⚡ RESULT CACHE HIT (%s)", file_hash[:12])
+        cached_result["request_id"] = request_id
+        cached_result["cache"] = "hit"
+    return cached_result
+
+async def run_pipeline(upload, context: dict, request_id: str, emit=None, reserved: AsyncExitStack = None, check_cache: bool = True) -> dict:
+    """
+    OCR / URL fetch -> analysis for one spooled upload.
+    emit(event, data) is awaited at each stage boundary so callers can
+    stream progress (SSE, job status); it defaults to a no-op.
+    reserved: the stage reservation from admit(), released here in any case.
+    check_cache=False skips the result cache lookup (the caller already did it).
+    Raises PipelineError for client-facing failures and stage_scheduler.Overloaded
+    when the OCR / analysis queue or the memory budget is full.
+    """
+    try:
+        return await _run_pipeline(upload, context, request_id, emit or _no_emit, reserved, check_cache)
+    finally:
+        if reserved is not None:
+            await reserved.aclose()  # no-op once the stage has used it
+
+async def _run_pipeline(upload, context: dict, request_id: str, emit, reserved, check_cache: bool) -> dict:
+    result_key = None
+    ocr_cache_status = "miss"
+    failed_pages = []
+
+    logger.info("STEP 1: Starting OCR")
+
+    if USE_MOCK_OCR:
+        logger.warning("⚠️ USING MOCK OCR (BYPASS MODE)")
+        extracted_text = "This is a government scheme notification about PM Awas Yojana housing benefits for eligible citizens."
+        confidence = 95.0
+        logger.info("Mock OCR complete. Text length: %d", len(extracted_text))
+    else:
+        # Step 1: File/Content Processing
+        file_extension = upload.extension
+
+        # Check for URL in text file (Frontend sends URL as input.txt)
+        url = _upload_url(upload)
+        if url:
+            logger.info("🔗 URL DETECTED: %s", url)
+            return await process_url(url, context, request_id, emit, reserved)
+
+        file_hash = upload.sha256
+        result_key = make_result_key(file_hash, context)
+        if check_cache:
+            cached_result = await lookup_result(upload, context, request_id)
+            if cached_result is not None:
+                return cached_result
+
+        # OCR text is language independent, so it has its own key
+        ocr_key = make_key("ocr", OCR_CACHE_VERSION, file_hash, file_extension, PDF_MAX_PAGES)
+        ocr_result = await ocr_cache.get(ocr_key)
+        cache_lookup("ocr", "hit" if ocr_result is not None else "miss")
+        if ocr_result is not None:
+            ocr_cache_status = "hit"
+            logger.info("⚡ OCR CACHE HIT (%s)", file_hash[:12])
+        else:
+            # Normal File Processing
+            await emit("ocr_started", {"extension": file_extension})
+
+            async def on_page(page, total, status):
+                await emit("ocr_page", {"page": page, "total": total, "status": status})
+
+            async with reserved or await reserve_stage(upload, "ocr"):
+                ocr_result = await extract_text_from_file(upload.path, file_extension, on_page=on_page)
+
+            if not ocr_result["success"]:
+                logger.warning("OCR FAILED: %s", ocr_result.get('error'))
+                raise PipelineError(400, "OCR failed", ocr_result.get("error"))
+            if ocr_result.get("failed_pages"):
+                # Partial OCR: serve it, but let the next upload retry the missing pages
+                logger.warning("OCR PARTIAL. Failed pages: %s", ocr_result['failed_pages'])
+                result_key = None
+            else:
+                await ocr_cache.set(ocr_key, {"text": ocr_result["text"], "confidence": ocr_result.get("confidence", 0)})
+
+        extracted_text = ocr_result["text"]
+        confidence = ocr_result.get("confidence", 0)
+        failed_pages = ocr_result.get("failed_pages", [])
+
+        logger.info("OCR SUCCESS. Text Length: %d", len(extracted_text))
+        if len(extracted_text) < 10:
+             logger.warning("Very short text extracted: %r", extracted_text)
+
+    await emit("ocr_done", {"text_length": len(extracted_text), "confidence": confidence, "cache": ocr_cache_status, "failed_pages": failed_pages})
+
+    # Another photo / crop / scan of a notice analysed before: reuse that analysis
+    partition = make_similarity_partition(context)
+    sketch, match = await find_near_duplicate(partition, extracted_text)
+    if match:
+        analysis_result, similarity = match
+        logger.info("⚡ NEAR-DUPLICATE HIT (similarity %.2f)", similarity)
+        analysis_result["ocr_confidence"] = confidence
+        analysis_result["extracted_text_length"] = len(extracted_text)
+        if failed_pages:
+            analysis_result["ocr_failed_pages"] = failed_pages
+        analysis_result["near_duplicate"] = {"similarity": similarity}
+        analysis_result["request_id"] = request_id
+        analysis_result["cache"] = "near_duplicate"
+        analysis_result["ocr_cache"] = ocr_cache_status
+        return analysis_result
+
+    analysis_result = await _analyze(extracted_text, context, request_id, emit)
+
+    # Add OCR metadata
+    analysis_result["ocr_confidence"] = confidence
+    analysis_result["extracted_text_length"] = len(extracted_text)
+    if failed_pages:
+        analysis_result["ocr_failed_pages"] = failed_pages
+
+    if result_key and _cacheable(analysis_result):
+        await result_cache.set(result_key, analysis_result)
+        await remember(partition, sketch, analysis_result)
+
+    analysis_result["request_id"] = request_id
+    analysis_result["cache"] = "miss"
+    analysis_result["ocr_cache"] = ocr_cache_status
+    return analysis_result
+
+async def process_url(url: str, context: dict, request_id: str, emit=None, reserved: AsyncExitStack = None) -> dict:
+    """Fetch a web page and run it through the same analysis step (page text is revalidated, results are never cached)"""
+    from services.web_service import fetch_url_content
+
+    emit = emit or _no_emit
+    await emit("fetch_started", {"url": url})
+    async with reserved or await reserve_stage(None, "fetch"):
+        url_content = await fetch_url_content(url)
+    if not url_content["success"]:
+        raise PipelineError(400, "URL processing failed", url_content["error"])
+
+    extracted_text = url_content["text"]
+    logger.info("URL FETCH SUCCESS. Length: %d", len(extracted_text))
+    await emit("fetch_done", {"text_length": len(extracted_text), "cache": url_content.get("cache", "miss")})
+
+    analysis_result = await _analyze(extracted_text, context, request_id, emit)
+    analysis_result["ocr_confidence"] = 100.0
+    analysis_result["extracted_text_length"] = len(extracted_text)
+    analysis_result["request_id"] = request_id
+    analysis_result["cache"] = "miss"
+    analysis_result["url_cache"] = url_content.get("cache", "miss")
+    return analysis_result
+
+async def _translate(extraction: dict, extraction_key: str, language: str, on_partial) -> dict:
+    """One target language of an extraction; successful translations are cached"""
+    if language == EXTRACTION_LANGUAGE or extraction.get("type") == "error":
+        return await translate_analysis(extraction, language)
+    key = make_key("translation", TRANSLATION_CACHE_VERSION, extraction_key, language)
+    cached = await translation_cache.get(key)
+    cache_lookup("translation", "hit" if cached is not None else "miss")
+    if cached is not None:
+        return cached
+    async with stage_scheduler.slot("analysis"):
+        translated = await translate_analysis(extraction, language, on_partial)
+    if "translation_failed" not in translated:
+        await translation_cache.set(key, translated)
+    return translated
+
+async def _analyze(extracted_text: str, context: dict, request_id: str, emit) -> dict:
+    """
+    Step 2-6: one language-neutral (English) extraction of the text, cached
+    across languages, then one translation per requested language in parallel.
+    The primary language's fields are at the top level; with several languages
+    all of them are also under "translations".
+    """
+    languages = requested_languages(context)
+    logger.info("CALLING AI ANALYSIS")
+    await emit("analysis_started", {"language": languages[0], "languages": languages})
+
+    async def on_partial(fields):
+        await emit("partial", fields)
+
+    async def on_preview(fields):
+        # English fields while the extraction is written, replaced once the translation streams in
+        await emit("partial", {**fields, "language": EXTRACTION_LANGUAGE, "preview": True})
+
+    # Only pay for token streaming when someone is listening. The extraction is always
+    # streamed (as a preview for other languages), then the primary language's translation
+    stream = on_partial if emit is not _no_emit else None
+    extraction_stream = stream and (on_partial if languages[0] == EXTRACTION_LANGUAGE else on_preview)
+
+    extraction_key = make_extraction_key(extracted_text, context)
+    extraction = await extraction_cache.get(extraction_key)
+    cache_lookup("extraction", "hit" if extraction is not None else "miss")
+    if extraction is None:
+        async with stage_scheduler.slot("analysis"):
+            extraction = await extract_document(extracted_text, context, on_partial=extraction_stream)
+        if extraction.get("type") != "error" and not extraction.get("partial"):
+            await extraction_cache.set(extraction_key, extraction)
+
+    results = await asyncio.gather(*(
+        _translate(extraction, extraction_key, language, stream if index == 0 else None)
+        for index, language in enumerate(languages)
+    ))
+    analysis_result = dict(results[0])
+    if len(languages) > 1:
+        analysis_result["translations"] = dict(zip(languages, results))
+    logger.info("AI ANALYSIS COMPLETE. Result Type: %s", analysis_result.get('type'))
+    await emit("fields", {"type": analysis_result.get("type"), "fields": sorted(analysis_result.keys())})
+    return analysis_result
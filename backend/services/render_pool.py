@@ -0,0 +1,254 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Process pool for CPU-bound rasterisation / JPEG encoding.
+# RENDER_POOL_WORKERS=0 renders inline on the event loop (old behaviour, useful for debugging).
+RENDER_POOL_WORKERS = int(os.getenv("RENDER_POOL_WORKERS", str(os.cpu_count() or 1)))
+# The pool is recycled after this many tasks per worker so PyMuPDF/PIL heap growth can't accumulate
+RENDER_POOL_MAX_TASKS_PER_CHILD = int(os.getenv("RENDER_POOL_MAX_TASKS_PER_CHILD", "50"))
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_submitted = 0
+
+def get_executor():
+    global _executor, _submitted
+    if _executor is not None and RENDER_POOL_MAX_TASKS_PER_CHILD and _submitted >= RENDER_POOL_MAX_TASKS_PER_CHILD * RENDER_POOL_WORKERS:
+        # Recycle the whole pool rather than using max_tasks_per_child, which deadlocks
+        # ProcessPoolExecutor when tasks are queued while a worker exits (CPython < 3.12.3).
+        # Work already submitted still finishes on the old pool.
+        _executor.shutdown(wait=False)
+        _executor = None
+    if _executor is None:
+        # 'spawn' avoids forking a process that already runs threads
+        _executor = ProcessPoolExecutor(max_workers=RENDER_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        _submitted = 0
+        logger.info("Process pool started (%d workers)", RENDER_POOL_WORKERS)
+    _submitted += 1
+    return _executor
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def _discard_broken(executor):
+    """
+    Drop a broken pool, unless another task has already replaced it: every
+    task of a broken pool fails at once, and the later ones must not throw
+    away (or cancel retries on) the fresh pool the first one started.
+    """
+    global _executor
+    if _executor is executor:
+        _executor = None
+        logger.warning("Process pool broken, restarting")
+    # Its pending futures have already failed with BrokenProcessPool; nothing to cancel
+    executor.shutdown(wait=False)
+
+async def run(fn, *args):
+    """Run a worker function in the render pool and return its (small, picklable) result"""
+    if RENDER_POOL_WORKERS <= 0:
+        return fn(*args)
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    try:
+        return await loop.run_in_executor(executor, fn, *args)
+    except BrokenProcessPool:
+        # A worker died (OOM, segfault in a malformed PDF); retry once on a fresh pool
+        _discard_broken(executor)
+        return await loop.run_in_executor(get_executor(), fn, *args)
+
+# ---------------------------------------------------------------------------
+# Worker functions (executed in the pool processes; must stay module level)
+# ---------------------------------------------------------------------------
+
+# 'source' is either raw bytes or a file path. Paths are preferred: PyMuPDF reads
+# pages lazily from disk and nothing larger than a file name crosses the process boundary.
+
+def preload():
+    """Import the rendering libraries in a worker ahead of its first page (warm-up)"""
+    import fitz  # PyMuPDF
+    from PIL import Image
+    return os.getpid()
+
+def _open_pdf(source):
+    import fitz  # PyMuPDF
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source, filetype="pdf")
+
+def pdf_text_layer(source, max_pages):
+    """Return (page_count, [direct text per page]) for the first max_pages pages"""
+    doc = _open_pdf(source)
+    try:
+        page_count = min(len(doc), max_pages)
+        return page_count, [doc.load_page(n).get_text().strip() for n in range(page_count)]
+    finally:
+        doc.close()
+
+def render_pdf_page(source, page_num, dpi=150, quality=85, grayscale=False):
+    """Rasterise one PDF page and encode it as JPEG; only the encoded bytes go back to the caller"""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    doc = _open_pdf(source)
+    try:
+        if grayscale:
+            pix = doc.load_page(page_num).get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            img = Image.frombytes("L", [pix.width, pix.height], pix.samples)
+        else:
+            pix = doc.load_page(page_num).get_pixmap(dpi=dpi)
+            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=quality)
+        return buf.getvalue()
+    finally:
+        doc.close()
+
+# Survey pre-pass: a 72 DPI render makes one pixel one PDF point
+SURVEY_DPI = 72
+# A pixel counts as ink when it is this much darker than the paper
+INK_CONTRAST = 64
+
+def survey_pdf_page(source, page_num):
+    """
+    Cheap look at a scanned page before any vision call, from a low-resolution render:
+      ink       share of pixels clearly darker than the paper
+      text_pt   typical height of a text line in points (None if no lines found)
+      colour    whether the page has any real colour (else it is sent as grayscale)
+      hash      64-bit difference hash of the page
+      thumb     fingerprint thumbnail (see page_fingerprint)
+      ink_bits  the 1-bit ink mask, for confirming duplicates (see same_page)
+    """
+    from PIL import Image
+
+    doc = _open_pdf(source)
+    try:
+        page = doc.load_page(page_num)
+        pix = page.get_pixmap(dpi=SURVEY_DPI)
+        rgb = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        gray = rgb.convert("L")
+        ink_mask = _ink_mask(gray)
+        return {
+            "page": page_num,
+            "width": page.rect.width,
+            "height": page.rect.height,
+            "ink": ink_mask.histogram()[255] / (gray.width * gray.height),
+            "text_pt": _text_height(ink_mask),
+            "colour": _has_colour(rgb),
+            **page_fingerprint(gray),
+            "ink_bits": ink_mask.convert("1").tobytes(),
+        }
+    finally:
+        doc.close()
+
+def same_page(a: dict, b: dict, max_distance: int = 6, max_diff: float = 0.05) -> bool:
+    """
+    Two surveyed pages show the same content: hashes within max_distance bits,
+    and the ink pixels that are not shared are at most max_diff of all ink.
+    The hash alone cannot tell apart two pages of body text with the same layout.
+    """
+    if hamming(a["hash"], b["hash"]) > max_distance or len(a["ink_bits"]) != len(b["ink_bits"]):
+        return False
+    mask_a = int.from_bytes(a["ink_bits"], "big")
+    mask_b = int.from_bytes(b["ink_bits"], "big")
+    ink = max(mask_a.bit_count(), mask_b.bit_count(), 1)
+    return (mask_a ^ mask_b).bit_count() <= max_diff * ink
+
+def _ink_mask(gray):
+    # Paper level is the median brightness (most of a page is paper)
+    histogram = gray.histogram()
+    half, count, paper = gray.width * gray.height / 2, 0, 255
+    for level in range(255, -1, -1):
+        count += histogram[level]
+        if count >= half:
+            paper = level
+            break
+    threshold = paper - INK_CONTRAST
+    return gray.point(lambda v: 255 if v < threshold else 0)
+
+def _text_height(ink_mask):
+    """Median height of the horizontal bands that contain ink, i.e. text lines (1px = 1pt at SURVEY_DPI)"""
+    from PIL import Image
+
+    rows = list(ink_mask.resize((1, ink_mask.height), Image.Resampling.BOX).getdata())
+    runs, run = [], 0
+    for value in rows + [0]:
+        # A row with at least ~half a percent of ink pixels is part of a text line
+        if value > 1:
+            run += 1
+        elif run:
+            if run >= 2:  # single rows are scanner speckle
+                runs.append(run)
+            run = 0
+    if not runs:
+        return None
+    runs.sort()
+    return float(runs[len(runs) // 2])
+
+def _has_colour(rgb):
+    from PIL import ImageChops
+
+    hsv = rgb.reduce(4).convert("HSV")
+    saturated = hsv.getchannel("S").point(lambda v: 255 if v > 80 else 0)
+    lit = hsv.getchannel("V").point(lambda v: 255 if v > 80 else 0)
+    coloured = ImageChops.multiply(saturated, lit).histogram()[255]
+    return coloured > 0.005 * hsv.width * hsv.height
+
+def dhash(gray) -> int:
+    """64-bit difference hash: brightness gradients on a 9x8 thumbnail"""
+    from PIL import Image
+
+    pixels = list(gray.resize((9, 8), Image.Resampling.BOX).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+# Side of the contrast-normalised grayscale thumbnail kept with a page fingerprint
+THUMB_SIZE = 64
+
+def page_fingerprint(gray) -> dict:
+    """
+    Resolution-independent identity of a page image: the difference hash
+    (for finding candidates) and a small contrast-normalised thumbnail (for
+    telling near-identical pages apart from different fillings of one form).
+    """
+    from PIL import Image, ImageOps
+
+    thumb = ImageOps.autocontrast(gray.resize((THUMB_SIZE, THUMB_SIZE), Image.Resampling.BOX), cutoff=1)
+    return {"hash": dhash(gray), "thumb": thumb.tobytes()}
+
+def prepare_image(source, max_size=1024, quality=75):
+    """
+    Normalise an uploaded image to an RGB JPEG no larger than max_size on either side.
+    Returns (jpeg bytes, page_fingerprint of the image).
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+    # JPEG decoders can downscale by 1/2..1/8 while decoding; avoids materialising a full-size bitmap
+    image.draft("RGB", (max_size, max_size))
+
+    # Convert to RGB (in case of PNG with transparency)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if max(image.size) > max_size:
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+    # Always save as JPEG to match the API data URI
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue(), page_fingerprint(image.convert("L"))
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from services.cache_service import CACHE_DIR, CACHE_ENABLED, CACHE_TTL_SECONDS
+from services.keyword_matcher import normalise
+from services.metrics import cache_lookup
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Near-duplicate documents (other photos / crops / scans of the same notice) reuse an earlier
+# analysis when their OCR text is at least this similar (estimated Jaccard over word 3-grams)
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "1") == "1"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "10000"))
+# Too little text for a meaningful similarity (short captions, failed OCR)
+NEAR_DUP_MIN_WORDS = int(os.getenv("NEAR_DUP_MIN_WORDS", "25"))
+NEAR_DUP_PATH = os.getenv("NEAR_DUP_PATH", os.path.join(CACHE_DIR, "near_duplicates.sqlite3"))
+
+# 128 MinHash values in 16 LSH bands of 8 rows: a pair at Jaccard 0.8 shares a band with
+# probability ~0.95, at 0.5 ~0.06. Candidates are then checked against NEAR_DUP_THRESHOLD.
+NUM_PERM = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_WORDS = 3
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_PAGE_MARKER = re.compile(r"^-+ page \d+[^\n]*-+$", re.MULTILINE)
+_WORD = re.compile(r"\w+")
+
+def document_words(text: str) -> list:
+    """Words of OCR text with page markers, punctuation, case and Unicode form normalised away"""
+    return _WORD.findall(_PAGE_MARKER.sub(" ", normalise(text)))
+
+@functools.lru_cache(maxsize=None)
+def _permutations():
+    """MinHash hash family; numpy is imported on first use, not at startup"""
+    import numpy as np
+    rng = np.random.RandomState(1)  # fixed seed: signatures are persisted
+    return (
+        rng.randint(1, _MERSENNE, size=NUM_PERM, dtype=np.uint64),
+        rng.randint(0, _MERSENNE, size=NUM_PERM, dtype=np.uint64),
+    )
+
+def _shingle_hashes(words: list) -> np.ndarray:
+    import numpy as np
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+
+def minhash(words: list) -> np.ndarray:
+    """NUM_PERM-value MinHash signature (uint32) of the document's word 3-grams"""
+    import numpy as np
+    perm_a, perm_b = _permutations()
+    hashes = _shingle_hashes(words)
+    # Wrapping uint64 arithmetic is intended: it is still a fixed hash family
+    with np.errstate(over="ignore"):
+        permuted = ((np.outer(hashes, perm_a) + perm_b) % np.uint64(_MERSENNE)) & np.uint64(_MAX_HASH)
+    return permuted.min(axis=0).astype(np.uint32)
+
+def facts_key(words: list) -> str:
+    """
+    Digest of the numbers in a document (amounts, dates, ids). Two fillings of one
+    letter template are textually near-identical but must not share a result, so a
+    near-duplicate must also agree on these exactly. Words that merely contain a
+    digit are left out: OCR turns "Officer" into "0fficer".
+    """
+    facts = sorted({word for word in words if word.isdigit()})
+    return hashlib.sha256("\x1f".join(facts).encode("utf-8")).hexdigest()
+
+def _bands(partition: str, signature: np.ndarray) -> list:
+    return [
+        (partition, band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes())
+        for band in range(LSH_BANDS)
+    ]
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index from earlier documents' OCR text to their analysis results.
+    partition separates entries that must never match each other (target language and
+    the other output-affecting context). Results and signatures live in SQLite;
+    signatures and LSH buckets of the NEAR_DUP_MAX_ENTRIES most recently used
+    documents are kept in memory (~0.5KB each) and rebuilt on first use.
+    """
+
+    def __init__(self, path: str = NEAR_DUP_PATH, max_entries: int = NEAR_DUP_MAX_ENTRIES,
+                 threshold: float = NEAR_DUP_THRESHOLD, ttl: int = CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self._conn = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # row id -> (partition, signature, facts, created), least recently used first
+        self._buckets = {}  # (partition, band, band bytes) -> {row id}
+
+    def _open(self):
+        if self._conn is not None:
+            return
+        import numpy as np
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                partition TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                facts TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created REAL NOT NULL,
+                used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("DELETE FROM documents WHERE created < ?", (time.time() - self.ttl,))
+        for row_id, partition, signature, facts, created in self._conn.execute(
+                "SELECT id, partition, signature, facts, created FROM documents ORDER BY used"):
+            self._index(row_id, partition, np.frombuffer(signature, dtype=np.uint32), facts, created)
+        self._evict()
+
+    def _index(self, row_id, partition, signature, facts, created):
+        self._entries[row_id] = (partition, signature, facts, created)
+        for bucket in _bands(partition, signature):
+            self._buckets.setdefault(bucket, set()).add(row_id)
+
+    def _remove(self, row_id):
+        partition, signature, _, _ = self._entries.pop(row_id)
+        for bucket in _bands(partition, signature):
+            ids = self._buckets[bucket]
+            ids.discard(row_id)
+            if not ids:
+                del self._buckets[bucket]
+        self._conn.execute("DELETE FROM documents WHERE id = ?", (row_id,))
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def load(self):
+        """Open the store and build the in-memory index now instead of on the first lookup"""
+        with self._lock:
+            self._open()
+
+    def lookup(self, partition: str, signature: np.ndarray, facts: str):
+        """(stored result, similarity) of the most similar document in the partition, or None"""
+        with self._lock:
+            self._open()
+            candidates = set()
+            for bucket in _bands(partition, signature):
+                candidates |= self._buckets.get(bucket, set())
+            best, best_similarity = None, self.threshold
+            now = time.time()
+            for row_id in candidates:
+                _, other, other_facts, created = self._entries[row_id]
+                if now - created > self.ttl:
+                    self._remove(row_id)
+                    continue
+                similarity = float((signature == other).mean())
+                if similarity >= best_similarity and other_facts == facts:
+                    best, best_similarity = row_id, similarity
+            if best is None:
+                return None
+            self._entries.move_to_end(best)
+            self._conn.execute("UPDATE documents SET used = ? WHERE id = ?", (now, best))
+            (result,) = self._conn.execute("SELECT result FROM documents WHERE id = ?", (best,)).fetchone()
+            return json.loads(result), round(best_similarity, 3)
+
+    def add(self, partition: str, signature: np.ndarray, facts: str, result: dict):
+        with self._lock:
+            self._open()
+            now = time.time()
+            row_id = self._conn.execute(
+                "INSERT INTO documents (partition, signature, facts, result, created, used) VALUES (?, ?, ?, ?, ?, ?)",
+                (partition, signature.tobytes(), facts, json.dumps(result, ensure_ascii=False), now, now),
+            ).lastrowid
+            self._index(row_id, partition, signature, facts, now)
+            self._evict()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._entries.clear()
+                self._buckets.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class DocumentSketch:
+    """What the index needs from one document's OCR text; None when the text is too short"""
+
+    def __init__(self, words: list):
+        self.signature = minhash(words)
+        self.facts = facts_key(words)
+
+    @classmethod
+    def from_text(cls, text: str):
+        words = document_words(text)
+        if len(words) < NEAR_DUP_MIN_WORDS:
+            return None
+        return cls(words)
+
+near_duplicates = NearDuplicateIndex()
+
+async def find_near_duplicate(partition: str, text: str):
+    """
+    Returns (sketch, match): match is (stored result, similarity) or None. The
+    sketch is passed back to remember() so the text is only hashed once.
+    """
+    if not (CACHE_ENABLED and NEAR_DUP_ENABLED):
+        return None, None
+    sketch = await asyncio.to_thread(DocumentSketch.from_text, text)
+    if sketch is None:
+        return None, None
+    match = await asyncio.to_thread(near_duplicates.lookup, partition, sketch.signature, sketch.facts)
+    cache_lookup("near_duplicate", "hit" if match else "miss")
+    return sketch, match
+
+async def remember(partition: str, sketch, result: dict):
+    if sketch is None:
+        return
+    await asyncio.to_thread(near_duplicates.add, partition, sketch.signature, sketch.facts, result)
@@ -0,0 +1,170 @@
+import asyncio
+import contextvars
+import math
+import os
+from contextlib import asynccontextmanager, contextmanager
+
+from services.metrics import ADMISSION_REJECTED, MEMORY_RESERVED_BYTES, STAGE_ACTIVE, STAGE_WAITING
+
+# Documents allowed in each pipeline stage at once, shared by every caller
+# (interactive requests, jobs, batch runs). Batch throughput follows these,
+# not how many documents a client sends in parallel.
+STAGE_LIMITS = {
+    "ocr": int(os.getenv("STAGE_OCR_CONCURRENCY", "4")),
+    "fetch": int(os.getenv("STAGE_FETCH_CONCURRENCY", "8")),
+    "analysis": int(os.getenv("STAGE_ANALYSIS_CONCURRENCY", "8")),
+    "tts": int(os.getenv("STAGE_TTS_CONCURRENCY", "8")),
+}
+# Interactive requests allowed to wait for each stage; past that they are
+# turned away at once with 503 + Retry-After instead of timing out in line (0 = unbounded)
+STAGE_QUEUE_LIMITS = {
+    "ocr": int(os.getenv("STAGE_OCR_QUEUE", "16")),
+    "fetch": int(os.getenv("STAGE_FETCH_QUEUE", "32")),
+    "analysis": int(os.getenv("STAGE_ANALYSIS_QUEUE", "32")),
+    "tts": int(os.getenv("STAGE_TTS_QUEUE", "16")),
+}
+# Estimated working memory of documents being OCR'd at once (see ocr_service.estimate_ocr_memory)
+ADMISSION_MEMORY_BYTES = int(os.getenv("ADMISSION_MEMORY_MB", "1024")) * 1024 * 1024
+# Retry-After bounds, in seconds
+RETRY_AFTER_MIN = int(os.getenv("RETRY_AFTER_MIN", "1"))
+RETRY_AFTER_MAX = int(os.getenv("RETRY_AFTER_MAX", "60"))
+
+# Jobs and batch runs already bound their own concurrency; they queue instead of being shed
+_queue_when_full = contextvars.ContextVar("queue_when_full", default=False)
+
+@contextmanager
+def queue_when_full():
+    """Within this block (and tasks started from it) full stages are waited for, never rejected"""
+    token = _queue_when_full.set(True)
+    try:
+        yield
+    finally:
+        _queue_when_full.reset(token)
+
+def _retry_after(seconds: float) -> int:
+    return max(RETRY_AFTER_MIN, min(RETRY_AFTER_MAX, math.ceil(seconds)))
+
+class Overloaded(Exception):
+    """A stage queue or the memory budget is full; answered with 503 and Retry-After"""
+
+    status_code = 503
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"{stage} is at capacity")
+        self.stage = stage
+        self.retry_after = retry_after
+
+    def to_dict(self):
+        return {
+            "error": "Server busy",
+            "details": f"Too many documents are being processed ({self.stage}). Please retry in {self.retry_after}s.",
+            "retry_after": self.retry_after,
+        }
+
+class StageScheduler:
+    """
+    One semaphore per stage; waiters are served in arrival order. A stage
+    whose queue is full rejects interactive callers with Overloaded, with a
+    Retry-After from the stage's recent hold times.
+    """
+
+    def __init__(self, limits: dict, queue_limits: dict = None):
+        self.limits = dict(limits)
+        self.queue_limits = {name: (queue_limits or {}).get(name, 0) for name in self.limits}
+        self._semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.limits.items()}
+        self._active = {name: 0 for name in self.limits}
+        self._waiting = {name: 0 for name in self.limits}
+        self._rejected = {name: 0 for name in self.limits}
+        self._hold_seconds = {name: 1.0 for name in self.limits}  # moving average
+
+    def retry_after(self, stage: str) -> int:
+        """Seconds until the current queue of a stage has roughly drained"""
+        return _retry_after(self._hold_seconds[stage] * (self._waiting[stage] + 1) / self.limits[stage])
+
+    def _update_gauges(self, stage: str):
+        STAGE_ACTIVE.labels(stage).set(self._active[stage])
+        STAGE_WAITING.labels(stage).set(self._waiting[stage])
+
+    @asynccontextmanager
+    async def slot(self, stage: str):
+        semaphore = self._semaphores[stage]
+        queue_limit = self.queue_limits[stage]
+        if (queue_limit and semaphore.locked() and self._waiting[stage] >= queue_limit
+                and not _queue_when_full.get()):
+            self._rejected[stage] += 1
+            ADMISSION_REJECTED.labels(stage).inc()
+            raise Overloaded(stage, self.retry_after(stage))
+        self._waiting[stage] += 1
+        self._update_gauges(stage)
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting[stage] -= 1
+        self._active[stage] += 1
+        self._update_gauges(stage)
+        start = asyncio.get_running_loop().time()
+        try:
+            yield
+        finally:
+            held = asyncio.get_running_loop().time() - start
+            self._hold_seconds[stage] = 0.8 * self._hold_seconds[stage] + 0.2 * held
+            self._active[stage] -= 1
+            self._update_gauges(stage)
+            semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {
+            name: {
+                "limit": self.limits[name],
+                "active": self._active[name],
+                "waiting": self._waiting[name],
+                "queue_limit": self.queue_limits[name],
+                "rejected": self._rejected[name],
+                "retry_after": self.retry_after(name),
+            }
+            for name in self.limits
+        }
+
+class MemoryBudget:
+    """
+    Estimated bytes of documents being processed at once. A document that
+    does not fit is rejected (interactive) or waits (jobs, batch); one that
+    is larger than the whole budget still runs, alone.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.reserved = 0
+        self.rejected = 0
+        self._changed = asyncio.Condition()
+
+    def _fits(self, amount: int) -> bool:
+        return self.reserved == 0 or self.reserved + amount <= self.limit
+
+    @asynccontextmanager
+    async def reserve(self, amount: int, stage: str = "memory"):
+        if self.limit <= 0:
+            yield
+            return
+        async with self._changed:
+            if not self._fits(amount):
+                if not _queue_when_full.get():
+                    self.rejected += 1
+                    ADMISSION_REJECTED.labels("memory").inc()
+                    raise Overloaded("memory", stage_scheduler.retry_after(stage))
+                await self._changed.wait_for(lambda: self._fits(amount))
+            self.reserved += amount
+            MEMORY_RESERVED_BYTES.set(self.reserved)
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self.reserved -= amount
+                MEMORY_RESERVED_BYTES.set(self.reserved)
+                self._changed.notify_all()
+
+    def snapshot(self) -> dict:
+        return {"limit_bytes": self.limit, "reserved_bytes": self.reserved, "rejected": self.rejected}
+
+stage_scheduler = StageScheduler(STAGE_LIMITS, STAGE_QUEUE_LIMITS)
+memory_budget = MemoryBudget(ADMISSION_MEMORY_BYTES)
@@ -1,8 +1,18 @@
+import asyncio
+import logging
 import os
-import httpx
+import re
+import unicodedata
 import json
 
-MURF_API_URL = "https://api.murf.ai/v1/speech/generate"
+from services.cache_service import CACHE_DIR, CACHE_ENABLED, CACHE_TTL_SECONDS, DiskStore, hash_bytes
+from services.metrics import cache_lookup, stage
+from services.stage_scheduler import queue_when_full, stage_scheduler
+
+logger = logging.getLogger(__name__)
+
+# MURF_API_URL points the client at a local stand-in server for tests and benchmarks
+MURF_API_URL = os.getenv("MURF_API_URL", "https://api.murf.ai/v1/speech/generate")
 
 # Voice ID Mapping (Best guess based on research, user can update)
 VOICE_MAP = {
@@ -13,6 +23,179 @@ VOICE_MAP = {
     'mr': 'mr-IN-ananya'    # Marathi (Placeholder/Guess)
 }
 
+# Synthesised audio is content-addressed by (voice, normalised text) and kept on disk
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "256")) * 1024 * 1024
+audio_store = DiskStore(os.path.join(CACHE_DIR, "audio"), max_bytes=TTS_CACHE_MAX_BYTES, ttl=CACHE_TTL_SECONDS, suffix=".mp3")
+_AUDIO_ID = re.compile(r"^[0-9a-f]{64}$")
+
+# Long scripts are synthesised sentence by sentence so playback can start after the first one
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "3"))
+TTS_MIN_CHUNK_CHARS = int(os.getenv("TTS_MIN_CHUNK_CHARS", "40"))
+TTS_MAX_CHUNK_CHARS = int(os.getenv("TTS_MAX_CHUNK_CHARS", "1000"))
+
+# Devanagari scripts end sentences with a danda; English additionally needs the next sentence to start with a capital/digit
+_SENTENCE_END = {
+    'en': re.compile(r'(?<=[.!?])\s+(?=["\'(A-Z0-9])'),
+}
+_DEFAULT_SENTENCE_END = re.compile(r'(?<=[.!?।॥])\s+')
+# "Rs. 500", "Dr. Rao": a break after these is not a sentence end
+_ABBREVIATIONS = {"rs", "dr", "mr", "mrs", "ms", "no", "st", "govt", "dept", "sh", "smt", "shri", "approx", "e.g", "i.e", "etc", "vs"}
+
+_pending = {}
+_http_client = None
+
+def _get_http_client():
+    """One keep-alive pool for Murf, shared by all sentence requests (httpx is imported on first use)"""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=TTS_CONCURRENCY * 4))
+    return _http_client
+
+async def aclose():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def voice_for(language_code: str) -> str:
+    return VOICE_MAP.get(language_code, 'en-US-alicia')
+
+def normalise_speech_text(text: str) -> str:
+    """Whitespace and Unicode form never change the spoken output; case and punctuation can"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+def audio_id_for(text: str, language_code: str = 'en') -> str:
+    return hash_bytes(f"{voice_for(language_code)}\x1f{normalise_speech_text(text)}".encode("utf-8"))
+
+def is_audio_id(value: str) -> bool:
+    return bool(_AUDIO_ID.match(value))
+
+def cached_audio_path(audio_id: str):
+    """Path of a cached clip, or None (also touches it for LRU eviction)"""
+    if not is_audio_id(audio_id) or not audio_store.touch(audio_id):
+        return None
+    path = audio_store.path_for(audio_id)
+    return path if os.path.exists(path) else None
+
+async def lookup_speech(text: str, language_code: str = 'en'):
+    """Audio id of an already synthesised clip for (text, voice), or None"""
+    if not CACHE_ENABLED:
+        return None
+    audio_id = audio_id_for(text, language_code)
+    if await asyncio.to_thread(cached_audio_path, audio_id):
+        logger.info("⚡ AUDIO CACHE HIT (%s)", audio_id[:12])
+        cache_lookup("audio", "hit")
+        return audio_id
+    cache_lookup("audio", "miss")
+    return None
+
+def _split_long(sentence: str) -> list:
+    """Murf rejects very long inputs: split on clause, then word boundaries"""
+    pieces = []
+    while len(sentence) > TTS_MAX_CHUNK_CHARS:
+        window = sentence[:TTS_MAX_CHUNK_CHARS]
+        cut = max(window.rfind(", "), window.rfind("; "), window.rfind("، "))
+        if cut <= 0:
+            cut = window.rfind(" ")
+        cut = cut + 1 if cut > 0 else TTS_MAX_CHUNK_CHARS
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+def split_sentences(text: str, language_code: str = 'en') -> list:
+    """
+    Sentences of the normalised script, in order. Fragments shorter than
+    TTS_MIN_CHUNK_CHARS are joined to the next one (each Murf call has a
+    fixed cost); overlong ones are split.
+    """
+    pattern = _SENTENCE_END.get(language_code, _DEFAULT_SENTENCE_END)
+    chunks, current = [], ""
+    for sentence in pattern.split(normalise_speech_text(text)):
+        current = f"{current} {sentence}" if current else sentence
+        last_word = current.rsplit(" ", 1)[-1].rstrip(".").lower()
+        if len(current) < TTS_MIN_CHUNK_CHARS or last_word in _ABBREVIATIONS:
+            continue
+        chunks.extend(_split_long(current))
+        current = ""
+    if current:
+        if chunks and len(current) < TTS_MIN_CHUNK_CHARS and len(chunks[-1]) + len(current) < TTS_MAX_CHUNK_CHARS:
+            chunks[-1] = f"{chunks[-1]} {current}"
+        else:
+            chunks.extend(_split_long(current))
+    return chunks
+
+def _strip_id3(audio: bytes) -> bytes:
+    """Drop a leading ID3v2 tag so clips can be concatenated into one MP3 stream"""
+    if len(audio) < 10 or audio[:3] != b"ID3":
+        return audio
+    size = (audio[6] & 0x7f) << 21 | (audio[7] & 0x7f) << 14 | (audio[8] & 0x7f) << 7 | (audio[9] & 0x7f)
+    footer = 10 if audio[5] & 0x10 else 0
+    end = 10 + size + footer
+    return audio[end:] if end < len(audio) else audio
+
+async def _synthesise(audio_id: str, text: str, language_code: str) -> bytes:
+    """Murf call for one clip; concurrent requests for the same clip share it. The clip is stored before returning."""
+    task = _pending.get(audio_id)
+    if task is None:
+        async def run():
+            # The "tts" stage slot covers the Murf call only, never a client's download
+            async with stage_scheduler.slot("tts"):
+                with stage("tts"):
+                    audio = await generate_speech(text, language_code)
+            await asyncio.to_thread(audio_store.set, audio_id, audio)
+            return audio
+
+        task = asyncio.create_task(run())
+        _pending[audio_id] = task
+        task.add_done_callback(lambda _: _pending.pop(audio_id, None))
+    return await asyncio.shield(task)
+
+async def speech_clip(text: str, language_code: str = 'en') -> bytes:
+    """MP3 for one chunk of text, from the audio cache when possible"""
+    audio_id = audio_id_for(text, language_code)
+    audio = await asyncio.to_thread(audio_store.get, audio_id) if CACHE_ENABLED else None
+    if audio is None:
+        audio = await _synthesise(audio_id, normalise_speech_text(text), language_code)
+    return audio
+
+async def stream_speech(text: str, language_code: str = 'en'):
+    """
+    Yield the MP3 for text sentence by sentence, in playback order.
+    Sentences are synthesised ahead of playback, at most TTS_CONCURRENCY
+    at a time (the semaphore is FIFO, so earlier sentences go first).
+    Once every sentence has been sent, the joined clip is stored under the
+    full text's audio id so replays are served straight from the cache.
+    """
+    sentences = split_sentences(text, language_code)
+    semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+
+    async def clip(sentence):
+        async with semaphore:
+            return await speech_clip(sentence, language_code)
+
+    parts = []
+    # Each clip takes a "tts" stage slot while Murf synthesises it. The first one is
+    # admitted like any request (Overloaded before anything is sent); once it is, the
+    # rest of the script waits for slots instead of being cut short mid-stream.
+    tasks = [asyncio.create_task(clip(sentence)) for sentence in sentences[:1]]
+    with queue_when_full():
+        tasks += [asyncio.create_task(clip(sentence)) for sentence in sentences[1:]]
+    try:
+        for i, task in enumerate(tasks):
+            audio = await task
+            audio = _strip_id3(audio) if i else audio
+            parts.append(audio)
+            yield audio
+    finally:
+        # Client went away or a sentence failed: don't start the remaining ones
+        for task in tasks:
+            task.cancel()
+    if len(parts) > 1:
+        await asyncio.to_thread(audio_store.set, audio_id_for(text, language_code), b"".join(parts))
+
 async def generate_speech(text: str, language_code: str = 'en'):
     """
     Generate speech using Murf.ai API
@@ -21,7 +204,7 @@ async def generate_speech(text: str, language_code: str = 'en'):
     if not api_key:
         raise Exception("MURF_API_KEY not found in environment variables")
 
-    voice_id = VOICE_MAP.get(language_code, 'en-US-alicia')
+    voice_id = voice_for(language_code)
 
     headers = {
         "Content-Type": "application/json",
@@ -36,22 +219,23 @@ async def generate_speech(text: str, language_code: str = 'en'):
         "channelType": "MONO"
     }
 
-    async with httpx.AsyncClient() as client:
-        print(f"[TTS] Calling Murf.ai for voice {voice_id}...", flush=True)
-        response = await client.post(MURF_API_URL, json=payload, headers=headers, timeout=30.0)
-        
-        if response.status_code != 200:
-            print(f"[TTS] Error: {response.text}", flush=True)
-            raise Exception(f"Murf API Error: {response.status_code}")
-
-        result = response.json()
-        audio_url = result.get("audioFile")
-        
-        if not audio_url:
-             raise Exception("No audio URL returned from Murf")
-
-        print(f"[TTS] Audio generated: {audio_url}", flush=True)
-        
-        # Download the audio file to stream it back
-        audio_response = await client.get(audio_url)
-        return audio_response.content
+    client = _get_http_client()
+    logger.info("Calling Murf.ai for voice %s (%d chars)", voice_id, len(text))
+    response = await client.post(MURF_API_URL, json=payload, headers=headers, timeout=30.0)
+    
+    if response.status_code != 200:
+        logger.error("Murf error %d: %s", response.status_code, response.text[:500])
+        raise Exception(f"Murf API Error: {response.status_code}")
+
+    result = response.json()
+    audio_url = result.get("audioFile")
+    
+    if not audio_url:
+         raise Exception("No audio URL returned from Murf")
+
+    logger.debug("Audio generated: %s", audio_url)
+    
+    # Download the audio file to stream it back
+    audio_response = await client.get(audio_url)
+    audio_response.raise_for_status()
+    return audio_response.content
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from services.metrics import stage
+
+# Upload limits (override via environment)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "10")) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 256 * 1024
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None  # None = system temp dir
+# Multipart boundaries, headers and the user_context field on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+class UploadTooLarge(Exception):
+    pass
+
+class SpooledUpload:
+    """
+    An upload streamed to a named temp file.
+    The path can be handed to PyMuPDF / PIL (or another process) without
+    ever holding the whole document in memory.
+    """
+
+    def __init__(self, path: str, size: int, sha256: str, filename: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.filename = filename or ""
+        self.extension = self.filename.split('.')[-1].lower()
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def cleanup(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+async def spool_upload(file, max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """
+    Copy an UploadFile to disk chunk by chunk, hashing as we go.
+    Raises UploadTooLarge as soon as the cap is crossed instead of after the fact.
+    """
+    suffix = "." + file.filename.split('.')[-1].lower() if file.filename and '.' in file.filename else ""
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="civic-upload-", suffix=suffix, dir=UPLOAD_TMP_DIR)
+    try:
+        with stage("upload_read"), os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes // (1024 * 1024)}MB")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    return SpooledUpload(path, size, digest.hexdigest(), file.filename)
+
+class MaxBodySizeMiddleware:
+    """
+    Pure ASGI middleware that rejects oversized request bodies while they
+    are still arriving: up front from Content-Length, or mid-stream by
+    counting chunked bytes. Only applied to the given path prefixes;
+    overrides maps a path prefix to its own limit (multi-file batch uploads).
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES, paths=("/api/",), overrides: dict = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(paths)
+        self.overrides = overrides or {}
+
+    def _limit_for(self, path: str) -> int:
+        for prefix, limit in self.overrides.items():
+            if path.startswith(prefix):
+                return limit
+        return self.max_bytes
+
+    async def _reject(self, send, limit: int):
+        if limit == self.max_bytes:
+            details = f"Please upload a document smaller than {MAX_UPLOAD_BYTES // (1024 * 1024)}MB."
+        else:
+            details = f"Please upload less than {(limit - MULTIPART_OVERHEAD_BYTES) // (1024 * 1024)}MB per request."
+        body = json.dumps({"error": "File too large", "details": details}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "POST" or not scope["path"].startswith(self.paths):
+            return await self.app(scope, receive, send)
+
+        max_bytes = self._limit_for(scope["path"])
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    if int(value) > max_bytes:
+                        return await self._reject(send, max_bytes)
+                except ValueError:
+                    pass
+
+        state = {"received": 0, "exceeded": False, "started": False}
+
+        async def limited_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["received"] += len(message.get("body", b""))
+                if state["received"] > max_bytes:
+                    state["exceeded"] = True
+                    raise UploadTooLarge("Request body too large")
+            return message
+
+        async def guarded_send(message):
+            if state["exceeded"]:
+                # The app turned our exception into its own error response; replace it with a 413
+                if message["type"] == "http.response.start" and not state["started"]:
+                    state["started"] = True
+                    await self._reject(send, max_bytes)
+                return
+            if message["type"] == "http.response.start":
+                state["started"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            if not state["started"]:
+                state["started"] = True
+                await self._reject(send, max_bytes)
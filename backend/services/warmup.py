@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Heavy modules (PyMuPDF, PIL, numpy, groq/httpx), API clients, the on-disk indexes and the
+# render workers are loaded by the first request that needs them, so a new container
+# accepts requests as soon as FastAPI is up. WARMUP=1 loads them in the background right
+# after startup instead, so the first requests do not pay for it either.
+WARMUP_ENABLED = os.getenv("WARMUP", "0") == "1"
+
+_state = {"enabled": WARMUP_ENABLED, "done": False, "seconds": {}}
+
+def _load_libraries():
+    import fitz  # PyMuPDF
+    from PIL import Image
+    from services.similarity_index import _permutations
+    _permutations()  # numpy
+
+def _build_clients():
+    from services import llm_client, tts_service, web_service
+    llm_client.get_client()
+    tts_service._get_http_client()
+    web_service.get_client()
+
+def _load_indexes():
+    from services.page_cache import page_cache
+    from services.similarity_index import near_duplicates
+    page_cache.load()
+    near_duplicates.load()
+
+async def _start_render_workers():
+    from services import render_pool
+    if render_pool.RENDER_POOL_WORKERS > 0:
+        # One task per worker so the pool spawns all of them
+        await asyncio.gather(*(render_pool.run(render_pool.preload) for _ in range(render_pool.RENDER_POOL_WORKERS)))
+
+async def warm_up():
+    """Load everything the request path would otherwise load lazily; failures are logged, never raised"""
+    steps = {
+        "libraries": lambda: asyncio.to_thread(_load_libraries),
+        "clients": lambda: asyncio.to_thread(_build_clients),
+        "indexes": lambda: asyncio.to_thread(_load_indexes),
+        "render_workers": _start_render_workers,
+    }
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+        _state["seconds"][name] = round(time.perf_counter() - start, 3)
+    _state["done"] = True
+    logger.info("Warm-up finished: %s", _state["seconds"])
+
+def snapshot() -> dict:
+    return {**_state, "seconds": dict(_state["seconds"])}
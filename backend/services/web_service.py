@@ -1,41 +1,233 @@
-import httpx
-from bs4 import BeautifulSoup
+import asyncio
+import html
+import logging
+from html.entities import html5 as HTML5_ENTITIES
+from html.parser import HTMLParser
+import os
 import re
+import time
+
+from services.cache_service import TwoTierCache, hash_bytes
+from services.metrics import cache_lookup, stage
+
+logger = logging.getLogger(__name__)
+
+# Characters of page text handed to analysis (long pages are chunked downstream, so this is a cost cap)
+URL_MAX_CHARS = int(os.getenv("URL_MAX_CHARS", "15000"))
+# Bytes of HTML read per page; anything past this is never downloaded
+URL_MAX_BYTES = int(os.getenv("URL_MAX_MB", "5")) * 1024 * 1024
+URL_TIMEOUT = float(os.getenv("URL_TIMEOUT", "10"))
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Extracted page text plus the validators needed to revalidate it
+url_cache = TwoTierCache("urls")
+
+_client = None
+
+def get_client():
+    """Shared keep-alive pool for page fetches (portals are fetched over and over); built on first use"""
+    global _client
+    if _client is None:
+        import httpx
+        _client = httpx.AsyncClient(follow_redirects=True, timeout=URL_TIMEOUT, headers=HEADERS)
+    return _client
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# Elements whose text never reaches the analysis: boilerplate, code, and
+# strings BeautifulSoup's get_text() never returned (template contents, ruby annotations)
+SKIP_TAGS = {"script", "style", "nav", "footer", "header", "noscript", "template", "rt", "rp"}
+# Elements with no closing tag
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer"}
+# Whitespace-only strings inside these are kept as-is
+PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+class _TextExtractor(HTMLParser):
+    """
+    Single-pass text extraction with the same output as the previous
+    BeautifulSoup(html.parser) + decompose() + get_text(' ') path, without
+    building a tree. It mirrors that tree builder's rules: adjacent data is
+    one string, whitespace-only strings collapse to ' ' or '\\n', an end tag
+    closes every unclosed element above its match, stray end tags are ignored,
+    and entity references resolve the same way.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.strings = []
+        self._data = []
+        self._stack = []
+        self._closed_void = []  # <br> seen without </br>; a later </br> is ignored
+        self._skip_depth = 0  # open SKIP_TAGS elements on the stack
+        self._preserve_depth = 0
+
+    def _end_data(self):
+        if not self._data:
+            return
+        data = "".join(self._data)
+        self._data = []
+        if self._skip_depth:
+            return
+        if not self._preserve_depth and not data.strip(ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+        self.strings.append(data)
+
+    def _push(self, tag):
+        self._stack.append(tag)
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth += 1
+
+    def _pop_to(self, tag):
+        if tag not in self._stack:
+            return
+        while self._stack:
+            popped = self._stack.pop()
+            if popped in SKIP_TAGS:
+                self._skip_depth -= 1
+            if popped in PRESERVE_WHITESPACE_TAGS:
+                self._preserve_depth -= 1
+            if popped == tag:
+                return
+
+    def handle_starttag(self, tag, attrs):
+        self._end_data()
+        if tag in VOID_TAGS:
+            self._closed_void.append(tag)
+        else:
+            self._push(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # <div/> opens and closes immediately
+        self._end_data()
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+            return
+        self._end_data()
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_entityref(self, name):
+        # Unknown names stay literal (without their ';', as before)
+        self._data.append(HTML5_ENTITIES.get(name + ";", "&" + name))
+
+    def handle_charref(self, name):
+        self._data.append(html.unescape(f"&#{name};"))
+
+    def handle_comment(self, data):
+        self._end_data()
+
+    def handle_decl(self, decl):
+        self._end_data()
+
+    def handle_pi(self, data):
+        self._end_data()
+
+    def unknown_decl(self, data):
+        self._end_data()
+        if data.upper().startswith("CDATA["):
+            self._data.append(data[len("CDATA["):])
+            self._end_data()
+
+def extract_text(markup: str) -> str:
+    """Visible text of a page, one phrase per line"""
+    parser = _TextExtractor()
+    parser.feed(markup)
+    parser.close()
+    parser._end_data()
+    text = " ".join(parser.strings)
+
+    # Clean up whitespace
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+def _cache_policy(headers):
+    """(cacheable, fresh_for_seconds) from the response's Cache-Control"""
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return False, 0
+    if "no-cache" in cache_control:
+        return True, 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return True, int(match.group(1)) if match else 0
+
+async def _download(client, url: str, request_headers: dict):
+    """Stream the body, stopping at URL_MAX_BYTES. Returns (response, html or None on 304)."""
+    async with client.stream("GET", url, headers=request_headers) as response:
+        if response.status_code == 304 and request_headers:
+            return response, None
+        response.raise_for_status()
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) >= URL_MAX_BYTES:
+                logger.warning("%s exceeds %d bytes, truncating", url, URL_MAX_BYTES)
+                del body[URL_MAX_BYTES:]
+                break
+        return response, body.decode(response.encoding or "utf-8", errors="replace")
 
 async def fetch_url_content(url: str):
     """
     Fetches and extracts text content from a given URL.
+    Pages are cached with their ETag/Last-Modified and revalidated with a
+    conditional GET, so an unchanged page costs one 304 and no parsing.
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
-        async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove scripts, styles, and other non-text elements
-            for script in soup(["script", "style", "nav", "footer", "header", "noscript"]):
-                script.decompose()
-                
-            # Extract text
-            text = soup.get_text(separator=' ')
-            
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            clean_text = '\n'.join(chunk for chunk in chunks if chunk)
-            
-            return {
-                "success": True,
-                "text": clean_text[:15000],  # Limit to 15k chars to avoid token limits
-                "confidence": 100.0,
-                "is_url_content": True
-            }
-            
+        cache_key = hash_bytes(url.encode("utf-8"))
+        cached = await url_cache.get(cache_key)
+        if cached and time.time() < cached.get("fresh_until", 0):
+            logger.info("⚡ FRESH CACHE HIT %s", url)
+            cache_lookup("url", "hit")
+            return _url_result(cached["text"], "hit")
+
+        request_headers = {}
+        if cached:
+            if cached.get("etag"):
+                request_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                request_headers["If-Modified-Since"] = cached["last_modified"]
+
+        with stage("url_fetch"):
+            response, page = await _download(get_client(), url, request_headers)
+        cacheable, max_age = _cache_policy(response.headers)
+
+        if page is None:
+            logger.info("⚡ NOT MODIFIED %s", url)
+            cache_lookup("url", "revalidated")
+            cached["fresh_until"] = time.time() + max_age
+            await url_cache.set(cache_key, cached)
+            return _url_result(cached["text"], "revalidated")
+
+        cache_lookup("url", "miss")
+        # Off the event loop: a multi-megabyte page takes tens of milliseconds to parse
+        with stage("html_extract"):
+            clean_text = await asyncio.to_thread(extract_text, page)
+
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if cacheable and (etag or last_modified or max_age):
+            await url_cache.set(cache_key, {
+                "text": clean_text,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fresh_until": time.time() + max_age,
+            })
+        return _url_result(clean_text, "miss")
+
     except Exception as e:
         return {
             "success": False,
@@ -43,6 +235,15 @@ async def fetch_url_content(url: str):
             "is_url_content": False
         }
 
+def _url_result(text: str, cache_status: str):
+    return {
+        "success": True,
+        "text": text[:URL_MAX_CHARS],
+        "confidence": 100.0,
+        "is_url_content": True,
+        "cache": cache_status
+    }
+
 def is_valid_url(text: str) -> bool:
     """
     Simple check if the text is a URL
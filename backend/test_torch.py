@@ -1,3 +0,0 @@
-print("Testing torch import...", flush=True)
-import torch
-print("Torch imported successfully.", flush=True)
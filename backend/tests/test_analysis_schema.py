@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.analysis_schema import AnalysisResult, IncrementalObjectParser, missing_fields
+
+def parse(text: str, chunk: int = None):
+    parser = IncrementalObjectParser()
+    for start in range(0, len(text), chunk or len(text) or 1):
+        parser.feed(text[start:start + (chunk or len(text))])
+    return parser.finish(), parser.repaired
+
+WELL_FORMED = json.dumps({
+    "type": "scheme",
+    "title": "PM Awas Yojana \"Gramin\"",
+    "summary": "Housing grant, line one\nline two",
+    "actionItems": ["Apply at the gram panchayat", "Bring \\ receipts"],
+    "deadlines": [],
+})
+
+@pytest.mark.parametrize("chunk", [None, 1, 7])
+def test_well_formed_object_is_parsed_in_any_chunking(chunk):
+    fields, repaired = parse(WELL_FORMED, chunk)
+    assert fields == json.loads(WELL_FORMED)
+    assert not repaired
+
+def test_fields_complete_as_they_arrive():
+    parser = IncrementalObjectParser()
+    parser.feed('{"title": "Hous')
+    assert parser.fields == {}
+    assert parser.partial(("title",)) == {"title": "Hous"}
+    assert parser.partial(("summary",)) == {}
+    parser.feed('ing scheme", "benefits": ["a", ')
+    assert parser.fields == {"title": "Housing scheme"}
+    parser.feed('"b"], "summary": "')
+    assert parser.fields == {"title": "Housing scheme", "benefits": ["a", "b"]}
+
+def test_half_written_escape_is_not_shown():
+    parser = IncrementalObjectParser().feed('{"title": "Yojana \\u09')
+    assert parser.partial(("title",)) == {"title": "Yojana "}
+
+def test_unescaped_quotes_inside_a_string_are_repaired():
+    fields, repaired = parse('{"title": "The "PM Awas" scheme", "summary": "S"}')
+    assert fields == {"title": 'The "PM Awas" scheme', "summary": "S"}
+    assert repaired
+
+def test_trailing_comma_in_a_list():
+    fields, repaired = parse('{"title": "T", "actionItems": ["a", "b",], "summary": "S"}')
+    assert fields == {"title": "T", "actionItems": ["a", "b"], "summary": "S"}
+    assert repaired
+
+def test_missing_comma_between_pairs():
+    fields, _ = parse('{"title": "T" "summary": "S"}')
+    assert fields == {"title": "T", "summary": "S"}
+
+def test_cut_off_output_keeps_what_was_written():
+    fields, repaired = parse('{"title": "T", "benefits": ["a", "b"], "summary": "cut off her')
+    assert fields == {"title": "T", "benefits": ["a", "b"], "summary": "cut off her"}
+    assert repaired
+    fields, _ = parse('{"title": "T", "deadlines": ["31 March", "15 Ap')
+    assert fields["deadlines"] == ["31 March"]
+
+def test_malformed_value_is_skipped_up_to_the_next_known_key():
+    fields, repaired = parse('{"title": "T", "deadlines": {not json}, "summary": "S"}')
+    assert fields == {"title": "T", "summary": "S"}
+    assert repaired
+
+def test_code_fence_and_preamble_are_ignored():
+    fields, _ = parse('Here is the analysis:\n```json\n{"title": "T", "summary": "S"}\n```')
+    assert fields == {"title": "T", "summary": "S"}
+
+def test_missing_fields_treats_blank_essentials_as_missing():
+    fields = {"type": "scheme", "title": " ", "summary": "S", "targetAudience": "", "personalImpact": "",
+              "actionItems": [], "benefits": [], "deadlines": [], "trustNote": ""}
+    assert missing_fields(fields) == ["title"]
+    assert "voice_script" not in missing_fields({})
+
+def test_result_values_are_coerced_to_the_frontend_shape():
+    result = AnalysisResult.model_validate({
+        "type": "SCHEME", "title": "T", "summary": ["one", "two"], "actionItems": "Apply",
+        "benefits": [{"amount": "Rs. 1.2 lakh"}, None, ""], "deadlines": None,
+    }).model_dump()
+    assert result["type"] == "scheme"
+    assert result["summary"] == "one; two"
+    assert result["actionItems"] == ["Apply"]
+    assert result["benefits"] == ["amount: Rs. 1.2 lakh"]
+    assert result["deadlines"] == []
+    assert result["voice_script"] == ""
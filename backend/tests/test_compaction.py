@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.compaction import compact_text
+
+HEADER = "Office of the District Collector, Pune"
+FOOTER = "For official use only - Revenue Department"
+
+def page(number: int, body: list) -> str:
+    return "\n".join([f"--- Page {number} ---", HEADER, "", *body, "", FOOTER, f"Page {number} of 3"])
+
+def test_headers_and_footers_repeated_across_pages_are_kept_once():
+    text = "\n".join(page(n, [f"Section {n} of the notice about land records."]) for n in (1, 2, 3))
+    compacted = compact_text(text)
+    assert compacted.count(HEADER) == 1
+    assert compacted.count(FOOTER) == 1
+    for n in (1, 2, 3):
+        assert f"Section {n} of the notice about land records." in compacted
+    assert "Page 2 of 3" not in compacted
+    assert "--- Page" not in compacted
+
+def test_repeated_body_lines_are_kept():
+    rows = [
+        "Applications are invited for the housing scheme.",
+        "Eligibility and fees for each category:",
+        "Documents required:",
+        "General category | Fee Rs. 500 | Last date 31.03.2025",
+        "Documents required:",
+        "General category | Fee Rs. 500 | Last date 31.03.2025",
+        "Income certificate and ration card copy",
+        "Submit the form at the tehsil office.",
+        "Incomplete forms will be rejected.",
+    ]
+    text = "\n".join(page(n, rows) for n in (1, 2))
+    compacted = compact_text(text)
+    assert compacted.count("Documents required:") == 4
+    assert compacted.count("General category | Fee Rs. 500 | Last date 31.03.2025") == 4
+    assert compacted.count(HEADER) == 1
+
+def test_edge_line_on_a_single_page_is_kept():
+    text = "\n".join([page(1, ["First page body text here."]), "--- Page 2 ---", "Annexure A", "Second page body text."])
+    compacted = compact_text(text)
+    assert "Annexure A" in compacted
+    # Header only on page 1 is not a repeated header
+    assert compacted.count(HEADER) == 1
+
+def test_noise_and_whitespace_are_cleaned_but_wording_is_kept():
+    compacted = compact_text("Apply   before\t15.04.2025 .\n| ~\nName.............. Ramesh\n• •\n1. Aadhaar seeding")
+    assert compacted.splitlines() == ["Apply before 15.04.2025 .", "Name... Ramesh", "1. Aadhaar seeding"]
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.keyword_matcher import KeywordMatcher, screen_text
+
+def test_keyword_inside_a_longer_word_is_not_a_hit():
+    matcher = KeywordMatcher({"scam": {"threshold": 1, "keywords": ["act now"]}})
+    assert not matcher.scan("Please contact now the Tehsil office").triggered("scam")
+    assert matcher.scan("Act now!").triggered("scam")
+
+def test_pmay_housing_lottery_notice_is_not_a_scam():
+    notice = (
+        "प्रधानमंत्री आवास योजना (PMAY) के अंतर्गत आवासों का आवंटन लॉटरी द्वारा किया जाएगा। "
+        "लॉटरी की तिथि 15 मार्च है। Please contact now the municipal office for the lottery list."
+    )
+    result = screen_text(notice)
+    assert not result.triggered("scam")
+    assert result.distinct("scam") == 0
+
+def test_scam_message_is_still_flagged():
+    result = screen_text("बधाई हो आपने जीता! आपकी लॉटरी लगी है। इनाम राशि के लिए OTP share karein.")
+    assert result.triggered("scam")
+
+def test_devanagari_keyword_needs_whole_words():
+    assert screen_text("आधार कार्ड की प्रति").triggered("identity")
+    # Same letters followed by a vowel sign are a different word
+    assert not KeywordMatcher({"identity": {"keywords": ["आधार"]}}).scan("आधारित योजना").triggered("identity")
+
+def test_keyword_split_across_lines_matches():
+    result = screen_text("Enter your PAN\ncard details")
+    assert result.positions["identity"] == {"pan card": [11]}
@@ -1,34 +1,48 @@
 import Groq from "groq-sdk";
 import { NextResponse } from "next/server";
+import screeningKeywords from "../../../../backend/data/screening_keywords.json";
 
 const groq = new Groq({
     apiKey: process.env.NEXT_PUBLIC_GROQ_API_KEY,
 });
 
+// Screening keywords are shared with the Python backend (backend/services/keyword_matcher.py)
+type ScreeningCategory = { threshold: number; keywords: string[] };
+
+// Same normalisation as the backend: NFKC, zero-width characters removed, lower-cased
+function normaliseText(text: string): string {
+    return text.normalize('NFKC').replace(/[\u200b\u200c\u200d\ufeff]/g, '').toLowerCase();
+}
+
+// Spaces in a keyword match any whitespace run (OCR line breaks); keywords match whole
+// words only, with combining marks counted as word characters (Devanagari vowel signs)
+function compileCategory({ keywords }: ScreeningCategory): RegExp[] {
+    return keywords.map(keyword =>
+        new RegExp(
+            '(?<![\\p{L}\\p{N}\\p{M}])'
+            + normaliseText(keyword).split(/\s+/).map(part => part.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')).join('\\s+')
+            + '(?![\\p{L}\\p{N}\\p{M}])',
+            'u'
+        )
+    );
+}
+
+const IDENTITY_PATTERNS = compileCategory(screeningKeywords.identity);
+const SCAM_PATTERNS = compileCategory(screeningKeywords.scam);
+
+function countDistinctHits(text: string, patterns: RegExp[]): number {
+    const normalised = normaliseText(text);
+    return patterns.filter(pattern => pattern.test(normalised)).length;
+}
+
 // Helper: Detect identity documents BEFORE AI call
 function detectIdentityDocument(text: string): boolean {
-    const identityKeywords = [
-        'aadhaar', 'aadhar', 'uid', 'uidai',
-        'pan card', 'pan number', 'permanent account number',
-        'voter id', 'epic', 'election card',
-        'driving license', 'driving licence', 'dl number',
-        'passport', 'passport number'
-    ];
-    const lowerText = text.toLowerCase();
-    return identityKeywords.some(keyword => lowerText.includes(keyword));
+    return countDistinctHits(text, IDENTITY_PATTERNS) >= screeningKeywords.identity.threshold;
 }
 
 // Helper: Detect scam indicators
 function detectScamIndicators(text: string): boolean {
-    const scamKeywords = [
-        'urgent action required', 'click here immediately',
-        'your account will be blocked', 'send money', 'share otp',
-        'lottery winner', 'congratulations you won', 'limited time offer',
-        'act now', 'verify your account', 'suspended', 'prize money'
-    ];
-    const lowerText = text.toLowerCase();
-    const scamCount = scamKeywords.filter(keyword => lowerText.includes(keyword)).length;
-    return scamCount >= 2;
+    return countDistinctHits(text, SCAM_PATTERNS) >= screeningKeywords.scam.threshold;
 }
 
 export async function POST(request: Request) {
@@ -15,7 +15,7 @@ export default function Home() {
     language: 'en'
   });
 
-  const { status, result, progress, analyzeDocument, reset } = useCivicAnalysis();
+  const { status, result, progress, partialResult, analyzeDocument, reset } = useCivicAnalysis();
 
   const handleAnalyze = (input: string | File, type: 'text' | 'file' | 'url') => {
     analyzeDocument(input, userContext);
@@ -47,7 +47,7 @@ export default function Home() {
         )}
 
         {/* Progress Indicator */}
-        <AnalysisProgress status={status} progress={progress} />
+        <AnalysisProgress status={status} progress={progress} preview={partialResult} />
 
         {/* Results */}
         {result && status === 'complete' && (
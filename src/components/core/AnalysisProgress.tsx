@@ -2,11 +2,12 @@
 
 import { motion } from "framer-motion";
 import { Loader2, CheckCircle2, FileSearch, Shield, Languages, Lightbulb } from "lucide-react";
-import { AnalysisStatus } from "@/types";
+import { AnalysisResult, AnalysisStatus } from "@/types";
 
 interface AnalysisProgressProps {
     status: AnalysisStatus;
     progress: number;
+    preview?: Partial<AnalysisResult> | null; // Title/summary streamed while the analysis is running
 }
 
 const statusConfig = {
@@ -17,7 +18,7 @@ const statusConfig = {
     complete: { icon: CheckCircle2, label: "Analysis Ready", color: "text-green-600" },
 };
 
-export function AnalysisProgress({ status, progress }: AnalysisProgressProps) {
+export function AnalysisProgress({ status, progress, preview }: AnalysisProgressProps) {
     if (status === 'idle' || status === 'error') return null;
 
     const config = statusConfig[status as keyof typeof statusConfig] || statusConfig.scanning;
@@ -52,6 +53,13 @@ export function AnalysisProgress({ status, progress }: AnalysisProgressProps) {
                         transition={{ duration: 0.5 }}
                     />
                 </div>
+
+                {preview && status !== 'complete' && (preview.title || preview.summary) && (
+                    <div className="mt-6 space-y-2">
+                        {preview.title && <h4 className="font-semibold">{preview.title}</h4>}
+                        {preview.summary && <p className="text-sm text-muted-foreground">{preview.summary}</p>}
+                    </div>
+                )}
             </div>
         </motion.div>
     );
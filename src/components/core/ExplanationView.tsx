@@ -19,6 +19,42 @@ import { AnalysisResult } from "@/types";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 
+// Play an audio/mpeg response while it is still arriving (the backend streams it
+// sentence by sentence); browsers without MP3 MediaSource support wait for the whole file.
+async function audioFromResponse(response: Response): Promise<HTMLAudioElement> {
+    if (!response.body || typeof MediaSource === 'undefined' || !MediaSource.isTypeSupported('audio/mpeg')) {
+        const audioBlob = await response.blob();
+        return new Audio(URL.createObjectURL(audioBlob));
+    }
+
+    const mediaSource = new MediaSource();
+    const audio = new Audio(URL.createObjectURL(mediaSource));
+    const reader = response.body.getReader();
+
+    mediaSource.addEventListener('sourceopen', async () => {
+        const sourceBuffer = mediaSource.addSourceBuffer('audio/mpeg');
+        const append = (chunk: Uint8Array) => new Promise<void>((resolve, reject) => {
+            sourceBuffer.addEventListener('updateend', () => resolve(), { once: true });
+            sourceBuffer.addEventListener('error', () => reject(new Error('Audio append failed')), { once: true });
+            sourceBuffer.appendBuffer(chunk);
+        });
+
+        try {
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                await append(value);
+            }
+            mediaSource.endOfStream();
+        } catch (e) {
+            console.error("Audio stream interrupted:", e);
+            if (mediaSource.readyState === 'open') mediaSource.endOfStream('network');
+        }
+    }, { once: true });
+
+    return audio;
+}
+
 interface ExplanationViewProps {
     result: AnalysisResult;
     userLanguage?: string; // Language code from user context
@@ -115,9 +151,7 @@ export function ExplanationView({ result, userLanguage = 'en' }: ExplanationView
 
             if (!response.ok) throw new Error("Murf API failed");
 
-            const audioBlob = await response.blob();
-            const audioUrl = URL.createObjectURL(audioBlob);
-            const audio = new Audio(audioUrl);
+            const audio = await audioFromResponse(response);
 
             audio.onended = () => {
                 setIsSpeaking(false);
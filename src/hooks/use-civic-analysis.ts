@@ -37,12 +37,14 @@ export function useCivicAnalysis() {
     const [status, setStatus] = useState<AnalysisStatus>('idle');
     const [result, setResult] = useState<AnalysisResult | null>(null);
     const [progress, setProgress] = useState(0);
+    const [partialResult, setPartialResult] = useState<Partial<AnalysisResult> | null>(null);
 
     const analyzeDocument = async (input: string | File, userContext: UserContext) => {
         // Reset everything immediately for a "smooth" transition
         setStatus('scanning');
         setProgress(5);
         setResult(null);
+        setPartialResult(null);
 
         console.log("Starting analysis for:", typeof input === 'string' ? "Text input" : input.name);
 
@@ -59,38 +61,97 @@ export function useCivicAnalysis() {
 
             formData.append('user_context', JSON.stringify(userContext));
 
-            // Step 1: Scanning (UI Progress)
-            await new Promise(r => setTimeout(r, 800));
-            setProgress(30);
+            // Step 1: Scanning - progress now comes from the backend's stage events
+            console.log('[FRONTEND] Starting stream to /api/process-document/stream');
 
-            // Step 2: Classification / Processing (Calling Python Backend)
-            setStatus('classifying');
-
-            console.log('[FRONTEND] Starting fetch to /api/process-document');
-
-            // Add timeout to prevent infinite hanging
+            // Abort if the server goes quiet for 60 seconds (every event resets the timer)
             const controller = new AbortController();
-            const timeoutId = setTimeout(() => {
-                console.error('[FRONTEND] Request timeout after 60 seconds');
-                controller.abort();
-            }, 60000); // 60 second timeout
+            let timeoutId = setTimeout(() => controller.abort(), 60000);
+            const resetTimeout = () => {
+                clearTimeout(timeoutId);
+                timeoutId = setTimeout(() => {
+                    console.error('[FRONTEND] No progress from server for 60 seconds');
+                    controller.abort();
+                }, 60000);
+            };
 
-            let response;
+            const handleStreamEvent = (event: string, payload: any) => {
+                switch (event) {
+                    case 'ocr_page':
+                        setProgress(10 + Math.round((40 * payload.page) / Math.max(payload.total, 1)));
+                        break;
+                    case 'ocr_done':
+                    case 'fetch_done':
+                        setProgress(50);
+                        break;
+                    case 'analysis_started':
+                        // Step 2: Classification / Processing
+                        setStatus('classifying');
+                        setProgress(55);
+                        break;
+                    case 'partial':
+                        setStatus('simplifying');
+                        setPartialResult(payload);
+                        setProgress(p => Math.min(90, p + 1));
+                        break;
+                    case 'fields':
+                        setStatus('translating');
+                        setProgress(95);
+                        break;
+                }
+            };
+
+            let apiResult: any = null;
             try {
-                response = await fetch('/api/process-document', {
+                const response = await fetch('/api/process-document/stream', {
                     method: 'POST',
                     body: formData,
                     signal: controller.signal
                 });
 
-                clearTimeout(timeoutId);
                 console.log(`[FRONTEND] Response received: ${response.status} ${response.statusText}`);
 
-                if (!response.ok) {
+                if (!response.ok || !response.body) {
                     const errorData = await response.json();
                     console.error('[FRONTEND] Error response:', errorData);
                     throw new Error(errorData.details || 'Backend processing failed');
                 }
+
+                // Parse the Server-Sent Events stream: frames are "event: x\ndata: {...}\n\n"
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                while (apiResult === null) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    resetTimeout();
+                    buffer += decoder.decode(value, { stream: true });
+
+                    let boundary;
+                    while (apiResult === null && (boundary = buffer.indexOf('\n\n')) !== -1) {
+                        const frame = buffer.slice(0, boundary);
+                        buffer = buffer.slice(boundary + 2);
+                        const event = frame.match(/^event: (.*)$/m)?.[1];
+                        const data = frame.match(/^data: (.*)$/m)?.[1];
+                        if (!event || !data) continue;
+
+                        const payload = JSON.parse(data);
+                        if (event === 'error') {
+                            console.error('[FRONTEND] Error event:', payload);
+                            throw new Error(payload.details || 'Backend processing failed');
+                        }
+                        if (event === 'done') {
+                            apiResult = payload;
+                        } else {
+                            handleStreamEvent(event, payload);
+                        }
+                    }
+                }
+                clearTimeout(timeoutId);
+
+                if (apiResult === null) {
+                    throw new Error('Connection closed before the analysis finished.');
+                }
             } catch (fetchError: any) {
                 clearTimeout(timeoutId);
                 if (fetchError.name === 'AbortError') {
@@ -101,16 +162,6 @@ export function useCivicAnalysis() {
                 throw fetchError;
             }
 
-            const apiResult = await response.json();
-
-            setProgress(70);
-            setStatus('simplifying');
-            await new Promise(r => setTimeout(r, 500));
-
-            setProgress(90);
-            setStatus('translating');
-            await new Promise(r => setTimeout(r, 500));
-
             // Handle different response types from Python backend
             if (apiResult.type === 'identity_block') {
                 setStatus('error');
@@ -168,6 +219,7 @@ export function useCivicAnalysis() {
     const reset = () => {
         setStatus('idle');
         setResult(null);
+        setPartialResult(null);
         setProgress(0);
     };
 
@@ -175,6 +227,7 @@ export function useCivicAnalysis() {
         status,
         result,
         progress,
+        partialResult,
         analyzeDocument,
         reset
     };
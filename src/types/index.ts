@@ -6,11 +6,14 @@ export type DocumentType =
     | 'low_quality'
     | 'unknown';
 
+export type Language = 'en' | 'hi' | 'ta' | 'or' | 'mr' | 'gu';
+
 export interface UserContext {
     age?: string;
     location?: string;
     occupation?: string;
-    language: 'en' | 'hi' | 'ta' | 'or' | 'mr' | 'gu';
+    language: Language;
+    languages?: Language[]; // Extra target languages, returned together in one response
 }
 
 export interface AnalysisResult {
@@ -24,6 +27,8 @@ export interface AnalysisResult {
     trustNote: string; // 7. Source & trust note
     documentType: DocumentType;
     voice_script?: string; // 8. Generated voice script
+    language?: Language; // Language of the fields above
+    translations?: Partial<Record<Language, AnalysisResult>>; // Every requested language, when more than one was asked for
 }
 
 export type AnalysisStatus = 'idle' | 'scanning' | 'classifying' | 'simplifying' | 'translating' | 'complete' | 'error';